@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import settings
+
+
+def normalize_query(user_query: str) -> str:
+    """
+    Menyamakan pertanyaan yang hanya berbeda huruf besar/kecil, spasi, atau tanda baca akhir.
+    """
+    normalized = re.sub(r"\s+", " ", user_query.strip().lower())
+    return normalized.rstrip(" ?!.")
+
+
+def schema_hash(df_schema: dict) -> str:
+    return hashlib.sha256(json.dumps(df_schema, sort_keys=True).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache respons LLM dua tingkat: LRU di memori proses dengan TTL, ditambah
+    tabel Postgres opsional yang dipakai bersama oleh semua worker API.
+
+    Kunci cache adalah hash dari (model, versi template prompt, hash skema,
+    pertanyaan yang sudah dinormalisasi), sehingga perubahan prompt atau skema
+    otomatis menghasilkan entri baru.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persistent: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "writes": 0,
+        }
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, df_schema: dict, user_query: str) -> str:
+        raw = "|".join([model, prompt_version, schema_hash(df_schema), normalize_query(user_query)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+                self.metrics["expirations"] += 1
+
+        if self.persistent:
+            value, expires_at = self._get_persistent(key)
+            if value is not None:
+                self._set_memory(key, value, expires_at)
+                with self._lock:
+                    self.metrics["persistent_hits"] += 1
+                return value
+
+        with self._lock:
+            self.metrics["misses"] += 1
+        return None
+
+    def set(self, key: str, value, kind: str = None, model: str = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        self._set_memory(key, value, expires_at)
+        with self._lock:
+            self.metrics["writes"] += 1
+        if self.persistent:
+            self._set_persistent(key, value, expires_at, kind=kind, model=model)
+
+    async def aget(self, key: str):
+        """
+        Versi async dari `get`; tingkat Postgres dijalankan di thread agar event loop tidak terblokir.
+        """
+        if not self.persistent:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value, kind: str = None, model: str = None) -> None:
+        if not self.persistent:
+            self.set(key, value, kind=kind, model=model)
+            return
+        await asyncio.to_thread(self.set, key, value, kind, model)
+
+    def _set_memory(self, key: str, value, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evictions"] += 1
+
+    def _get_persistent(self, key: str):
+        # Impor di sini agar modul ini tetap bisa dipakai tanpa koneksi database
+        from app.database import SessionLocal
+        from app import models
+
+        db = SessionLocal()
+        try:
+            entry = db.get(models.LLMCacheEntry, key)
+            if entry is None:
+                return None, None
+            if entry.expires_at <= datetime.now(timezone.utc):
+                db.delete(entry)
+                db.commit()
+                with self._lock:
+                    self.metrics["expirations"] += 1
+                return None, None
+            return entry.response, entry.expires_at.timestamp()
+        except Exception as e:
+            # Kegagalan cache tidak boleh menggagalkan request
+            print(f"LLM cache lookup failed: {e}")
+            return None, None
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: str, value, expires_at: float, kind: str = None, model: str = None) -> None:
+        from app.database import SessionLocal
+        from app import models
+
+        db = SessionLocal()
+        try:
+            db.merge(models.LLMCacheEntry(
+                key=key,
+                kind=kind,
+                model=model,
+                response=value,
+                expires_at=datetime.fromtimestamp(expires_at, tz=timezone.utc),
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.persistent,
+                **self.metrics,
+            }
+
+
+llm_cache = LLMResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    persistent=settings.llm_cache_persistent,
+)
@@ -1,13 +1,63 @@
-from openai import OpenAI
+import asyncio
+import random
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIConnectionError, RateLimitError, InternalServerError
 from app.config import settings
 import polars as pl
 import json
-client = OpenAI(api_key=settings.openai_api_key)
+from app.ai.llm_cache import llm_cache
 
-def generate_polars_code(df_schema: dict, user_query: str) -> str:
+# Klien async dengan pool koneksi terbatas. Retry ditangani sendiri di _create_completion
+# agar backoff tidak menahan slot konkurensi.
+client = AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    timeout=settings.llm_timeout_seconds,
+    max_retries=0,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_connections,
+        )
+    ),
+)
+
+# Membatasi jumlah request ke OpenAI yang berjalan bersamaan dalam satu proses
+_llm_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
+# APITimeoutError adalah turunan APIConnectionError
+_RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+LLM_MODEL = "gpt-5-chat-latest"
+
+# Naikkan versi ini setiap kali isi prompt diubah agar entri cache lama tidak dipakai lagi
+POLARS_CODE_PROMPT_VERSION = "polars-code-v1"
+INTENT_PROMPT_VERSION = "intent-v1"
+PLAN_PROMPT_VERSION = "plan-v1"
+
+async def _create_completion(**kwargs):
+    """
+    Memanggil chat completions dengan batas konkurensi dan retry exponential backoff
+    untuk error jaringan, timeout, rate limit, dan error 5xx.
+    """
+    for attempt in range(settings.llm_max_retries + 1):
+        try:
+            async with _llm_semaphore:
+                return await client.chat.completions.create(**kwargs)
+        except _RETRYABLE_ERRORS:
+            if attempt == settings.llm_max_retries:
+                raise
+            delay = settings.llm_retry_backoff_seconds * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+async def generate_polars_code(df_schema: dict, user_query: str) -> str:
     """
     Mengirimkan prompt ke API GPT-5 untuk mengubah pertanyaan pengguna menjadi kode Polars.
+    Hasilnya di-cache berdasarkan skema dan pertanyaan yang sudah dinormalisasi.
     """
+    cache_key = llm_cache.make_key(LLM_MODEL, POLARS_CODE_PROMPT_VERSION, df_schema, user_query)
+    cached_code = await llm_cache.aget(cache_key)
+    if cached_code is not None:
+        return cached_code
     
     # Rekayasa Prompt (Prompt Engineering)
     system_prompt = f"""
@@ -25,8 +75,8 @@ def generate_polars_code(df_schema: dict, user_query: str) -> str:
     If the query cannot be answered with the given schema, return "ERROR: Query cannot be answered."
     """
 
-    response = client.chat.completions.create(
-        model="gpt-5-chat-latest",
+    response = await _create_completion(
+        model=LLM_MODEL,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_query}
@@ -35,12 +85,19 @@ def generate_polars_code(df_schema: dict, user_query: str) -> str:
     )
     
     generated_code = response.choices[0].message.content
+    await llm_cache.aset(cache_key, generated_code, kind="polars_code", model=LLM_MODEL)
     return generated_code
 
-def analyze_user_intent(df_schema: dict, user_query: str) -> dict:
+async def analyze_user_intent(df_schema: dict, user_query: str) -> dict:
     """
     Menggunakan GPT-5 untuk menganalisis niat pengguna.
+    Hasilnya di-cache berdasarkan skema dan pertanyaan yang sudah dinormalisasi.
     """
+    cache_key = llm_cache.make_key(LLM_MODEL, INTENT_PROMPT_VERSION, df_schema, user_query)
+    cached_intent = await llm_cache.aget(cache_key)
+    if cached_intent is not None:
+        return cached_intent
+
     system_prompt = f"""
     You are an expert analytical system. Your job is to analyze a user's query about a dataset and determine their intent.
     The dataset schema is: {df_schema}.
@@ -54,8 +111,8 @@ def analyze_user_intent(df_schema: dict, user_query: str) -> dict:
     User Query: "{user_query}"
     """
 
-    response = client.chat.completions.create(
-        model="gpt-5-chat-latest",
+    response = await _create_completion(
+        model=LLM_MODEL,
         response_format={"type": "json_object"},
         messages=[
             {"role": "system", "content": system_prompt}
@@ -63,4 +120,51 @@ def analyze_user_intent(df_schema: dict, user_query: str) -> dict:
     )
     
     intent_data = json.loads(response.choices[0].message.content)
+    await llm_cache.aset(cache_key, intent_data, kind="intent", model=LLM_MODEL)
     return intent_data
+
+async def plan_query(df_schema: dict, user_query: str) -> dict:
+    """
+    Menggabungkan analisis niat dan pembuatan kode Polars dalam satu panggilan GPT-5.
+    Mengembalikan dict berisi "intent", "variables", dan "polars_code".
+    """
+    cache_key = llm_cache.make_key(LLM_MODEL, PLAN_PROMPT_VERSION, df_schema, user_query)
+    cached_plan = await llm_cache.aget(cache_key)
+    if cached_plan is not None:
+        return cached_plan
+
+    system_prompt = f"""
+    You are an expert analytical system and data analyst who specializes in the Python **Polars** library.
+    Your job is to analyze a user's query about a dataset, determine their intent and, for descriptive queries,
+    write the Polars code that answers it.
+    The dataset schema of the DataFrame 'df' is: {df_schema}.
+
+    Return a JSON object with the following structure:
+    - "intent": Can be "descriptive_analysis" (for queries like 'show', 'describe', 'list') OR "causal_analysis" (for queries asking 'what is the effect of', 'impact of', 'why did X change').
+    - "variables":
+        - If intent is "descriptive_analysis", this should be null.
+        - If intent is "causal_analysis", this should be a JSON object containing "treatment", "outcome", and "common_causes" identified from the query and schema.
+    - "polars_code":
+        - If intent is "descriptive_analysis", a single, executable line of Polars code that operates on 'df' and answers the query.
+          Use Polars syntax only: for grouping and aggregation, use `.group_by('column').agg(...)`, NOT `.groupby()`.
+          Do not include import statements or markdown formatting.
+          Example query: "show total sales per product"
+          Example Polars code for the query: "df.group_by('product').agg(pl.sum('sales'))"
+          If the query cannot be answered with the given schema, use "ERROR: Query cannot be answered."
+        - If intent is "causal_analysis", this should be null.
+
+    User Query: "{user_query}"
+    """
+
+    response = await _create_completion(
+        model=LLM_MODEL,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": system_prompt}
+        ],
+        temperature=0,
+    )
+
+    plan = json.loads(response.choices[0].message.content)
+    await llm_cache.aset(cache_key, plan, kind="plan", model=LLM_MODEL)
+    return plan
@@ -1,45 +1,446 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import polars as pl
-import pandas as pd
+import numpy as np
+from scipy import stats
 from dowhy import CausalModel
 
+from app.config import settings
+from app.analysis.rendering import render_markdown
+
+LINEAR_REGRESSION_METHOD = "backdoor.linear_regression"
+
+# Refuter DoWhy yang dijalankan dalam mode robustness, beserta argumen tambahannya.
+# Setiap refuter lolos jika uji signifikansi DoWhy TIDAK signifikan: efek placebo
+# tidak berbeda dari nol, dan estimasi lain tidak berubah dari estimasi asli.
+REFUTERS = {
+    "placebo_treatment_refuter": {"placebo_type": "permute"},
+    "random_common_cause": {},
+    "data_subset_refuter": {"subset_fraction": 0.8},
+}
+
+_robustness_executor = None
+_robustness_executor_lock = threading.Lock()
+
+def prepare_causal_frame(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    max_rows: int = 0,
+    seed: int = 0
+) -> tuple[pl.DataFrame, float]:
+    """
+    Menyiapkan input estimator: hanya kolom treatment, outcome, dan common causes,
+    dengan baris kosong dibuang sekali. Jika `max_rows` > 0 dan data lebih besar,
+    diambil sampel acak.
+
+    Mengembalikan DataFrame Polars dan fraksi sampling (1.0 jika tidak di-sampling).
+    """
+    columns = list(dict.fromkeys([treatment, outcome, *common_causes]))
+    missing_columns = [col for col in columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Kolom tidak ditemukan: {', '.join(map(str, missing_columns))}")
+
+    projected = df.select(columns).drop_nulls()
+
+    sampling_fraction = 1.0
+    if max_rows and projected.height > max_rows:
+        sampling_fraction = max_rows / projected.height
+        projected = projected.sample(n=max_rows, seed=seed)
+
+    return projected, sampling_fraction
+
+def supports_fast_linear_estimate(df: pl.DataFrame) -> bool:
+    """
+    Estimator cepat hanya menangani kolom numerik/boolean; kolom kategorikal
+    perlu one-hot encoding dari DoWhy.
+    """
+    return all(dtype.is_numeric() or dtype == pl.Boolean for dtype in df.dtypes)
+
+def estimate_linear_effect(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    confidence_level: float = 0.95
+) -> dict:
+    """
+    Menghitung efek backdoor linear (koefisien treatment pada regresi OLS
+    outcome ~ treatment + common causes) dengan least squares NumPy, beserta
+    standard error dan interval kepercayaan. Setara dengan
+    `backdoor.linear_regression` di DoWhy untuk kolom numerik.
+    """
+    regressors = [treatment, *[col for col in common_causes if col != treatment]]
+    X = df.select(regressors).cast(pl.Float64).to_numpy()
+    X = np.column_stack([np.ones(len(X)), X])
+    y = df.get_column(outcome).cast(pl.Float64).to_numpy()
+
+    n_obs, n_params = X.shape
+    if n_obs <= n_params:
+        raise ValueError("Jumlah baris tidak cukup untuk estimasi regresi.")
+
+    beta, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    if rank < n_params:
+        raise ValueError("Treatment dan common causes saling kolinear.")
+
+    residuals = y - X @ beta
+    dof = n_obs - n_params
+    sigma2 = residuals @ residuals / dof
+    # Varians koefisien treatment (indeks 1, setelah intercept)
+    std_error = float(np.sqrt(sigma2 * np.linalg.inv(X.T @ X)[1, 1]))
+    t_critical = stats.t.ppf(0.5 + confidence_level / 2, dof)
+
+    value = float(beta[1])
+    return {
+        "value": value,
+        "std_error": std_error,
+        "ci_lower": value - t_critical * std_error,
+        "ci_upper": value + t_critical * std_error,
+        "confidence_level": confidence_level,
+        "n_obs": n_obs,
+    }
+
+def estimate_with_dowhy(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str = LINEAR_REGRESSION_METHOD
+) -> float:
+    """
+    Estimasi lengkap lewat DoWhy untuk metode yang tidak ditangani jalur cepat.
+    """
+    _, _, estimate = fit_dowhy_model(df, treatment, outcome, common_causes, method_name)
+    return estimate.value
+
+def fit_dowhy_model(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str = LINEAR_REGRESSION_METHOD
+) -> tuple:
+    """
+    Membangun model DoWhy dan mengembalikan tuple (model, estimand, estimate).
+    """
+    # DoWhy bekerja dengan Pandas; konversi berbasis Arrow tidak menyalin data
+    pd_df = df.to_pandas(use_pyarrow_extension_array=True)
+
+    # 1. Membuat model kausal
+    model = CausalModel(
+        data=pd_df,
+        treatment=treatment,
+        outcome=outcome,
+        common_causes=common_causes
+    )
+
+    # 2. Mengidentifikasi estimand (bagaimana cara menghitung efek)
+    identified_estimand = model.identify_effect()
+
+    # 3. Memperkirakan efek kausal
+    estimate = model.estimate_effect(
+        identified_estimand,
+        method_name=method_name
+    )
+    return model, identified_estimand, estimate
+
+def _point_estimate(df: pl.DataFrame, treatment: str, outcome: str, common_causes: list, method_name: str) -> float:
+    if method_name == LINEAR_REGRESSION_METHOD and supports_fast_linear_estimate(df):
+        return estimate_linear_effect(df, treatment, outcome, common_causes)["value"]
+    return estimate_with_dowhy(df, treatment, outcome, common_causes, method_name)
+
+def _run_refuter(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str,
+    refuter: str,
+    num_simulations: int,
+    seed: int
+) -> dict:
+    """
+    Menjalankan satu refuter DoWhy (dipanggil di proses worker).
+    """
+    try:
+        model, identified_estimand, estimate = fit_dowhy_model(df, treatment, outcome, common_causes, method_name)
+        refutation = model.refute_estimate(
+            identified_estimand,
+            estimate,
+            method_name=refuter,
+            num_simulations=num_simulations,
+            random_seed=seed,
+            **REFUTERS[refuter]
+        )
+        significance = refutation.refutation_result or {}
+        p_value = significance.get("p_value")
+        is_significant = significance.get("is_statistically_significant")
+        return {
+            "check": refuter,
+            "new_effect": float(refutation.new_effect),
+            "p_value": float(p_value) if p_value is not None else None,
+            "passed": not is_significant if is_significant is not None else None,
+            "error": None,
+        }
+    except Exception as e:
+        return {"check": refuter, "new_effect": None, "p_value": None, "passed": None, "error": str(e)}
+
+def _run_bootstrap_chunk(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str,
+    seeds: list
+) -> list:
+    """
+    Menghitung estimasi pada sampel bootstrap (resampling dengan pengembalian),
+    satu sampel per seed (dipanggil di proses worker).
+    """
+    estimates = []
+    for seed in seeds:
+        resampled = df.sample(n=df.height, with_replacement=True, seed=seed)
+        try:
+            estimates.append(_point_estimate(resampled, treatment, outcome, common_causes, method_name))
+        except Exception:
+            # Sampel dengan kolom kolinear dilewati
+            continue
+    return estimates
+
+def get_robustness_executor() -> ProcessPoolExecutor:
+    """
+    Pool proses untuk refuter dan bootstrap, dibuat saat pertama kali dibutuhkan.
+    """
+    global _robustness_executor
+    with _robustness_executor_lock:
+        if _robustness_executor is None:
+            _robustness_executor = ProcessPoolExecutor(
+                max_workers=settings.causal_robustness_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _robustness_executor
+
+def shutdown_robustness_executor() -> None:
+    global _robustness_executor
+    with _robustness_executor_lock:
+        if _robustness_executor is not None:
+            _robustness_executor.shutdown(wait=False, cancel_futures=True)
+            _robustness_executor = None
+
+def _discard_broken_robustness_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Melepas pool yang rusak (mis. worker mati karena kehabisan memori) agar
+    `get_robustness_executor` membuat pool baru. Pool yang sudah diganti thread
+    lain tidak disentuh.
+    """
+    global _robustness_executor
+    with _robustness_executor_lock:
+        if _robustness_executor is executor:
+            _robustness_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _run_robustness_tasks(
+    executor: ProcessPoolExecutor,
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str,
+    base_seed: int
+) -> tuple[list, list]:
+    """
+    Mengirim refuter dan sampel bootstrap ke pool, lalu menunggu hasilnya.
+    Mengembalikan tuple (hasil refuter, estimasi bootstrap).
+    """
+    refuter_futures = [
+        executor.submit(
+            _run_refuter, df, treatment, outcome, common_causes, method_name,
+            refuter, settings.causal_refuter_simulations, base_seed + i
+        )
+        for i, refuter in enumerate(REFUTERS)
+    ]
+
+    # Sampel bootstrap dibagi rata ke semua worker
+    bootstrap_seeds = [base_seed + 1000 + i for i in range(settings.causal_bootstrap_samples)]
+    num_chunks = max(1, min(settings.causal_robustness_workers, len(bootstrap_seeds)))
+    bootstrap_futures = [
+        executor.submit(
+            _run_bootstrap_chunk, df, treatment, outcome, common_causes, method_name,
+            bootstrap_seeds[i::num_chunks]
+        )
+        for i in range(num_chunks)
+    ] if bootstrap_seeds else []
+
+    refutations = [future.result() for future in refuter_futures]
+    bootstrap_estimates = [value for future in bootstrap_futures for value in future.result()]
+    return refutations, bootstrap_estimates
+
+def run_robustness_checks(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    estimate: float,
+    method_name: str = LINEAR_REGRESSION_METHOD,
+    confidence_level: float = 0.95
+) -> dict:
+    """
+    Menjalankan refuter DoWhy dan interval kepercayaan bootstrap secara paralel
+    di pool proses. Seed tetap (`causal_robustness_seed`) sehingga hasilnya
+    dapat diulang untuk data yang sama.
+
+    Mengembalikan ringkasan terstruktur: estimasi, hasil tiap refuter, dan
+    interval bootstrap.
+    """
+    base_seed = settings.causal_robustness_seed
+    # Refuter mengulang estimasi berkali-kali; data besar di-sampling dulu
+    robustness_df, _ = prepare_causal_frame(
+        df, treatment, outcome, common_causes,
+        max_rows=settings.causal_robustness_max_rows, seed=base_seed
+    )
+
+    executor = get_robustness_executor()
+    try:
+        refutations, bootstrap_estimates = _run_robustness_tasks(
+            executor, robustness_df, treatment, outcome, common_causes, method_name, base_seed
+        )
+    except BrokenProcessPool:
+        # Pool tidak bisa dipakai lagi setelah worker mati; buat pool baru dan coba sekali lagi
+        _discard_broken_robustness_executor(executor)
+        refutations, bootstrap_estimates = _run_robustness_tasks(
+            get_robustness_executor(), robustness_df, treatment, outcome, common_causes, method_name, base_seed
+        )
+
+    bootstrap = None
+    if bootstrap_estimates:
+        alpha = (1 - confidence_level) / 2
+        bootstrap = {
+            "ci_lower": float(np.quantile(bootstrap_estimates, alpha)),
+            "ci_upper": float(np.quantile(bootstrap_estimates, 1 - alpha)),
+            "std_error": float(np.std(bootstrap_estimates, ddof=1)) if len(bootstrap_estimates) > 1 else None,
+            "confidence_level": confidence_level,
+            "samples": len(bootstrap_estimates),
+        }
+
+    return {
+        "estimate": estimate,
+        "n_obs": robustness_df.height,
+        "refutations": refutations,
+        "bootstrap": bootstrap,
+    }
+
+def robustness_summary_frame(summary: dict) -> pl.DataFrame:
+    """
+    Mengubah ringkasan robustness menjadi tabel (satu baris per pemeriksaan)
+    untuk balasan chat dan slide presentasi.
+    """
+    rows = [
+        {
+            "check": item["check"],
+            "new_effect": item["new_effect"],
+            "p_value": item["p_value"],
+            "passed": item["passed"],
+            "note": item["error"],
+        }
+        for item in summary["refutations"]
+    ]
+    bootstrap = summary.get("bootstrap")
+    if bootstrap:
+        rows.append({
+            "check": "bootstrap",
+            "new_effect": None,
+            "p_value": None,
+            "passed": None,
+            "note": (
+                f"CI {bootstrap['confidence_level'] * 100:.0f}%: "
+                f"[{bootstrap['ci_lower']:.4f}, {bootstrap['ci_upper']:.4f}] "
+                f"dari {bootstrap['samples']} sampel"
+            ),
+        })
+    return pl.DataFrame(rows, schema={
+        "check": pl.String,
+        "new_effect": pl.Float64,
+        "p_value": pl.Float64,
+        "passed": pl.Boolean,
+        "note": pl.String,
+    }).with_columns(pl.col("new_effect", "p_value").round(4))
+
 def estimate_causal_effect(
     df: pl.DataFrame, 
     treatment: str, 
     outcome: str, 
-    common_causes: list
+    common_causes: list,
+    method_name: str = LINEAR_REGRESSION_METHOD
 ) -> str:
     """
     Memperkirakan dampak kausal dari variabel treatment terhadap outcome.
     """
-    # DoWhy bekerja dengan Pandas, jadi kita konversi terlebih dahulu
-    pd_df = df.to_pandas()
+    result_str, _ = analyze_causal_effect(df, treatment, outcome, common_causes, method_name)
+    return result_str
+
+def analyze_causal_effect(
+    df: pl.DataFrame,
+    treatment: str,
+    outcome: str,
+    common_causes: list,
+    method_name: str = LINEAR_REGRESSION_METHOD,
+    robustness: bool = False
+) -> tuple:
+    """
+    Seperti `estimate_causal_effect`, tetapi jika `robustness` aktif juga
+    menjalankan refuter dan bootstrap (lihat `run_robustness_checks`).
+
+    Mengembalikan tuple (balasan teks, ringkasan robustness atau None).
+    """
+    common_causes = common_causes or []
+    robustness_summary = None
 
     try:
-        # 1. Membuat model kausal
-        model = CausalModel(
-            data=pd_df,
-            treatment=treatment,
-            outcome=outcome,
-            common_causes=common_causes
+        # Hanya kolom yang dibutuhkan yang diproses
+        causal_df, sampling_fraction = prepare_causal_frame(
+            df, treatment, outcome, common_causes, max_rows=settings.causal_max_rows
         )
-        
-        # 2. Mengidentifikasi estimand (bagaimana cara menghitung efek)
-        identified_estimand = model.identify_effect()
-        
-        # 3. Memperkirakan efek kausal menggunakan regresi linear
-        estimate = model.estimate_effect(
-            identified_estimand,
-            method_name="backdoor.linear_regression"
-        )
-        
-        # 4. Format hasil menjadi kalimat yang mudah dimengerti
-        causal_estimate = estimate.value
+
+        # Regresi linear dengan kolom numerik dihitung langsung dengan NumPy;
+        # DoWhy hanya dipakai untuk kasus yang tidak bisa ditangani jalur cepat.
+        fast_estimate = None
+        if method_name == LINEAR_REGRESSION_METHOD and supports_fast_linear_estimate(causal_df):
+            fast_estimate = estimate_linear_effect(causal_df, treatment, outcome, common_causes)
+            causal_estimate = fast_estimate["value"]
+        else:
+            causal_estimate = estimate_with_dowhy(causal_df, treatment, outcome, common_causes, method_name)
+
+        # Format hasil menjadi kalimat yang mudah dimengerti
         result_str = (
             f"Analisis Kausal Diperkirakan:\n"
             f"Perubahan pada '{treatment}' secara rata-rata menyebabkan perubahan sebesar "
             f"{causal_estimate:.2f} pada '{outcome}'."
         )
-        return result_str
+        if fast_estimate is not None:
+            result_str += (
+                f"\nStandard error: {fast_estimate['std_error']:.4f}; "
+                f"interval kepercayaan {fast_estimate['confidence_level'] * 100:.0f}%: "
+                f"[{fast_estimate['ci_lower']:.2f}, {fast_estimate['ci_upper']:.2f}]."
+            )
+        if sampling_fraction < 1.0:
+            result_str += (
+                f"\n(Dihitung dari sampel acak {causal_df.height} baris, "
+                f"{sampling_fraction * 100:.1f}% dari data lengkap.)"
+            )
+
+        if robustness:
+            robustness_summary = run_robustness_checks(
+                causal_df, treatment, outcome, common_causes, causal_estimate, method_name
+            )
+            result_str += (
+                f"\n\nUji Robustness ({robustness_summary['n_obs']} baris):\n\n"
+                + render_markdown(robustness_summary_frame(robustness_summary), max_rows=len(REFUTERS) + 1)
+            )
+        return result_str, robustness_summary
 
     except Exception as e:
-        return f"Gagal melakukan analisis kausal: {str(e)}. Pastikan nama kolom sudah benar."
\ No newline at end of file
+        return f"Gagal melakukan analisis kausal: {str(e)}. Pastikan nama kolom sudah benar.", None
\ No newline at end of file
@@ -0,0 +1,111 @@
+import glob
+import os
+import shutil
+import uuid
+
+import polars as pl
+
+# Salinan kolumnar disimpan sebagai Parquet di samping file aslinya
+COLUMNAR_EXTENSION = ".parquet"
+
+
+def columnar_path_for(raw_path: str) -> str:
+    """
+    Menentukan lokasi salinan Parquet untuk sebuah file unggahan.
+    """
+    base, _ = os.path.splitext(raw_path)
+    return base + COLUMNAR_EXTENSION
+
+
+def table_path_for(raw_path: str, index: int) -> str:
+    """
+    Lokasi Parquet untuk tabel tambahan (mis. sheet Excel ke-`index`) dari file unggahan.
+    Tabel pertama memakai `columnar_path_for`.
+    """
+    base, _ = os.path.splitext(raw_path)
+    return f"{base}.table{index}{COLUMNAR_EXTENSION}"
+
+
+def derived_paths(raw_path: str) -> list[str]:
+    """
+    File Parquet yang sudah ditulis dari sebuah file unggahan (tabel utama dan
+    tabel tambahan), mis. untuk dibersihkan setelah ingestion gagal.
+    """
+    base, _ = os.path.splitext(raw_path)
+    candidates = [columnar_path_for(raw_path), *glob.glob(f"{glob.escape(base)}.table*{COLUMNAR_EXTENSION}")]
+    return [path for path in candidates if path != raw_path and os.path.exists(path)]
+
+
+def convert_to_columnar(df: pl.DataFrame, raw_path: str) -> str:
+    """
+    Menulis DataFrame hasil parsing file unggahan sebagai Parquet kanonis
+    dan mengembalikan path-nya.
+    """
+    return write_columnar(df, columnar_path_for(raw_path))
+
+
+def write_columnar(df: pl.DataFrame, columnar_path: str) -> str:
+    df.write_parquet(columnar_path, compression="zstd", statistics=True)
+    return columnar_path
+
+
+def stream_csv_to_columnar(raw_path: str) -> str:
+    """
+    Mengonversi CSV ke Parquet kanonis dengan streaming engine Polars, tanpa
+    memuat seluruh file ke memori. Dipakai untuk file yang lebih besar dari RAM.
+    """
+    columnar_path = columnar_path_for(raw_path)
+    pl.scan_csv(raw_path).sink_parquet(columnar_path, compression="zstd", statistics=True, engine="streaming")
+    return columnar_path
+
+
+def append_to_columnar(columnar_path: str, df: pl.DataFrame) -> None:
+    """
+    Menambahkan baris ke salinan Parquet. File ditulis ulang secara streaming ke
+    file sementara lalu diganti secara atomik, sehingga pembaca tidak pernah
+    melihat file setengah jadi.
+    """
+    tmp_path = f"{columnar_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        pl.concat([pl.scan_parquet(columnar_path), df.lazy()], how="vertical").sink_parquet(
+            tmp_path, compression="zstd", statistics=True, engine="streaming"
+        )
+        os.replace(tmp_path, columnar_path)
+    finally:
+        remove_dataset_files([tmp_path])
+
+
+def copy_columnar(columnar_path: str, dest_raw_path: str) -> str:
+    """
+    Membuat salinan pribadi dari salinan Parquet (copy-on-write sebelum data
+    blob bersama diubah) dan mengembalikan path-nya.
+    """
+    dest_path = columnar_path_for(dest_raw_path)
+    shutil.copyfile(columnar_path, dest_path)
+    return dest_path
+
+
+def remove_dataset_files(paths: list[str]) -> None:
+    """
+    Menghapus file dataset yang tidak lagi direferensikan.
+    """
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def read_columnar(columnar_path: str, columns: list[str] | None = None) -> pl.DataFrame:
+    """
+    Membaca salinan Parquet dengan memory-mapping. Jika `columns` diberikan,
+    hanya kolom tersebut yang dibaca dari disk.
+    """
+    return pl.read_parquet(columnar_path, columns=columns, memory_map=True)
+
+
+def read_columnar_schema(columnar_path: str) -> dict:
+    """
+    Mengambil skema dari metadata Parquet tanpa membaca datanya.
+    """
+    return {col: str(dtype) for col, dtype in pl.read_parquet_schema(columnar_path).items()}
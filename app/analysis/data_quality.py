@@ -1,71 +1,445 @@
+import math
+import time
+from datetime import date, datetime
+
+import numpy as np
 import polars as pl
+from scipy.stats import norm
+
+from app.analysis.query_engine import scan_data_file
+from app.analysis.quality_checks import (
+    ZScoreCheck,
+    build_health_report,
+    compute_check_stats,
+    row_hash_expr,
+    run_quality_checks,
+)
+from app.analysis.sketches import HASH_SCHEME, HyperLogLog, KLLSketch, hash_series
+
+# Format `Notebook.health_stats`; presisi HLL lebih kecil agar JSON tetap ringkas (~1.6% galat).
+# Versi 2: HyperLogLog memakai hash stabil (`hash_series`) alih-alih pl.Series.hash()
+# Versi 3: HyperLogLog hash baris (`row_hll`) untuk memperkirakan baris duplikat
+HEALTH_STATS_VERSION = 3
+HEALTH_STATS_HLL_PRECISION = 12
+# Baris duplikat = jumlah baris - baris unik, jadi galat HLL baris dibuat lebih kecil (~0.8%)
+HEALTH_STATS_ROW_HLL_PRECISION = 14
 
 def generate_health_report(df: pl.DataFrame) -> dict:
     """
     Menganalisis DataFrame Polars dan menghasilkan laporan kualitas data yang komprehensif,
     termasuk deteksi anomali dasar.
+
+    Pemeriksaan diambil dari registry `quality_checks`; ekspresi semua pemeriksaan
+    digabung sehingga data hanya di-scan dua kali (statistik dasar, lalu outlier).
+    """
+    return run_quality_checks(df)
+
+def _is_temporal(dtype) -> bool:
+    return dtype == pl.Date or dtype == pl.Datetime
+
+def _new_column_stats(col_name: str, dtype) -> dict:
+    return {
+        "name": col_name,
+        "dtype": str(dtype),
+        "null_count": 0,
+        "hll": HyperLogLog(precision=HEALTH_STATS_HLL_PRECISION),
+        # Momen (jumlah, rata-rata, M2) untuk rata-rata/standar deviasi yang bisa digabung
+        "moments": [0, 0.0, 0.0] if dtype.is_numeric() else None,
+        "kll": KLLSketch() if dtype.is_numeric() else None,
+        "min": None,
+        "max": None,
+    }
+
+def _merge_moments(a: list, b: list) -> list:
+    # Algoritma paralel Chan untuk rata-rata dan varians
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return [0, 0.0, 0.0]
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta * delta * n_a * n_b / n
+    return [n, mean, m2]
+
+def _merge_extreme(current, value, pick):
+    if value is None:
+        return current
+    return value if current is None else pick(current, value)
+
+def collect_health_stats(batches, columns: list) -> dict:
+    """
+    Mengakumulasi statistik per kolom yang bisa digabung dari iterator batch:
+    jumlah baris dan nilai kosong (eksak), HyperLogLog, KLL, momen, serta min/max.
+    HyperLogLog hash baris (`row_hll`) dipakai untuk memperkirakan baris duplikat.
+    """
+    columns_stats = [_new_column_stats(col_name, dtype) for col_name, dtype in columns]
+    num_rows = 0
+    row_hash = row_hash_expr(columns)
+    row_hll = HyperLogLog(precision=HEALTH_STATS_ROW_HLL_PRECISION) if row_hash is not None else None
+
+    for batch in batches:
+        num_rows += batch.height
+        if row_hll is not None:
+            row_hll.update_hashes(hash_series(batch.select(row_hash).to_series()))
+        null_counts = batch.null_count().row(0)
+        for (col_name, dtype), stats, null_count in zip(columns, columns_stats, null_counts):
+            series = batch.get_column(col_name)
+            stats["null_count"] += null_count
+            # Hash nilai kosong ikut dihitung, sama seperti n_unique()
+            stats["hll"].update_hashes(hash_series(series))
+            if stats["kll"] is not None:
+                values = series.drop_nulls().cast(pl.Float64)
+                stats["kll"].update(values.to_numpy())
+                values = values.drop_nans()
+                if values.len() > 0:
+                    batch_moments = [values.len(), values.mean(), float(((values - values.mean()) ** 2).sum())]
+                    stats["moments"] = _merge_moments(stats["moments"], batch_moments)
+            elif _is_temporal(dtype):
+                stats["min"] = _merge_extreme(stats["min"], series.min(), min)
+                stats["max"] = _merge_extreme(stats["max"], series.max(), max)
+
+    return {"num_rows": num_rows, "columns": columns_stats, "row_hll": row_hll}
+
+def compute_health_stats(data, batch_size: int = 100_000) -> dict:
+    """
+    Statistik yang bisa digabung dari DataFrame atau file data (dibaca per batch).
+    """
+    if isinstance(data, pl.DataFrame):
+        columns = list(data.schema.items())
+        batches = data.iter_slices(batch_size)
+    else:
+        lazy_df = scan_data_file(data)
+        columns = list(lazy_df.collect_schema().items())
+        batches = lazy_df.collect_batches(chunk_size=batch_size, engine="streaming")
+    return collect_health_stats(batches, columns)
+
+def merge_health_stats(base: dict, update: dict) -> dict:
+    """
+    Menggabungkan statistik data lama dengan statistik batch baru (kolom dicocokkan
+    berdasarkan nama). Tidak ada data lama yang perlu dibaca ulang.
+    """
+    update_columns = {stats["name"]: stats for stats in update["columns"]}
+    for stats in base["columns"]:
+        other = update_columns.get(stats["name"])
+        if other is None:
+            # Kolom tidak ada di batch baru: seluruh baris baru dianggap kosong
+            stats["null_count"] += update["num_rows"]
+            continue
+        stats["null_count"] += other["null_count"]
+        stats["hll"].merge(other["hll"])
+        if stats["kll"] is not None and other["kll"] is not None:
+            stats["kll"].merge(other["kll"])
+            stats["moments"] = _merge_moments(stats["moments"], other["moments"])
+        stats["min"] = _merge_extreme(stats["min"], other["min"], min)
+        stats["max"] = _merge_extreme(stats["max"], other["max"], max)
+    if base.get("row_hll") is not None and update.get("row_hll") is not None:
+        base["row_hll"].merge(update["row_hll"])
+    else:
+        base["row_hll"] = None
+    base["num_rows"] += update["num_rows"]
+    return base
+
+def health_stats_to_json(health_stats: dict) -> dict:
+    """
+    Bentuk JSON untuk kolom `Notebook.health_stats`.
+    """
+    columns = []
+    for stats in health_stats["columns"]:
+        columns.append({
+            **stats,
+            "hll": stats["hll"].to_dict(),
+            "kll": stats["kll"].to_dict() if stats["kll"] is not None else None,
+            "min": stats["min"].isoformat() if stats["min"] is not None else None,
+            "max": stats["max"].isoformat() if stats["max"] is not None else None,
+        })
+    row_hll = health_stats.get("row_hll")
+    return {
+        "version": HEALTH_STATS_VERSION,
+        "num_rows": health_stats["num_rows"],
+        "columns": columns,
+        "row_hll": row_hll.to_dict() if row_hll is not None else None,
+    }
+
+def health_stats_compatible(data: dict) -> bool:
+    """
+    Apakah `Notebook.health_stats` tersimpan bisa digabung dengan statistik baru.
+    Statistik versi lama, atau yang sketch-nya dibuat dengan skema hash lain
+    (mis. sebelum upgrade Polars), harus dihitung ulang dari seluruh data.
+    """
+    if not data or data.get("version") != HEALTH_STATS_VERSION:
+        return False
+    sketches = [stats["hll"] for stats in data["columns"]]
+    if data.get("row_hll") is not None:
+        sketches.append(data["row_hll"])
+    return all(sketch.get("hash_scheme") == HASH_SCHEME for sketch in sketches)
+
+def health_stats_from_json(data: dict) -> dict:
+    def parse_temporal(value, dtype):
+        if value is None:
+            return None
+        return date.fromisoformat(value) if dtype == "Date" else datetime.fromisoformat(value)
+
+    columns = []
+    for stats in data["columns"]:
+        columns.append({
+            **stats,
+            "hll": HyperLogLog.from_dict(stats["hll"]),
+            "kll": KLLSketch.from_dict(stats["kll"]) if stats["kll"] is not None else None,
+            "min": parse_temporal(stats["min"], stats["dtype"]),
+            "max": parse_temporal(stats["max"], stats["dtype"]),
+        })
+    row_hll = data.get("row_hll")
+    return {
+        "num_rows": data["num_rows"],
+        "columns": columns,
+        "row_hll": HyperLogLog.from_dict(row_hll) if row_hll is not None else None,
+    }
+
+def _frame_stats_from_health_stats(health_stats: dict) -> dict:
+    """
+    Statistik tingkat dataset dari sketch: jumlah baris (eksak) dan perkiraan
+    baris unik dari HyperLogLog hash baris, beserta galatnya (~95%).
+    """
+    num_rows = health_stats["num_rows"]
+    frame_stats = {"num_rows": num_rows}
+    row_hll = health_stats.get("row_hll")
+    if row_hll is not None:
+        distinct_rows = min(row_hll.estimate(), num_rows)
+        frame_stats["distinct_rows"] = distinct_rows
+        frame_stats["distinct_rows_margin"] = math.ceil(2 * 1.04 / math.sqrt(len(row_hll.registers)) * distinct_rows)
+    return frame_stats
+
+def _check_stats_from_health_stats(health_stats: dict, include_outliers: bool) -> list:
+    """
+    Mengubah statistik yang bisa digabung menjadi statistik untuk registry
+    pemeriksaan. Jika `include_outliers`, jumlah outlier diperkirakan dari
+    rank KLL sehingga data tidak perlu di-scan.
     """
-    report = {"columns": []}
-    num_rows = len(df)
-
-    for col_name in df.columns:
-        col_series = df[col_name]
-        col_dtype = str(col_series.dtype)
-        warnings = []
-        
-        # Inisialisasi dictionary untuk anomali
-        anomaly_report = { "detected": False, "count": 0, "method": None }
-
-        # 1. Cek nilai kosong (missing values)
-        missing_count = col_series.is_null().sum()
-        missing_percentage = (missing_count / num_rows) * 100 if num_rows > 0 else 0
-
-        # 2. Cek tipe data campuran (mixed data types)
-        if col_dtype == 'Object':
-            warnings.append("Tipe data campuran terdeteksi.")
-
-        # 3. Cek kardinalitas tinggi (high-cardinality)
-        if col_series.dtype in [pl.Utf8, pl.Object]:
-            unique_count = col_series.n_unique()
-            if num_rows > 0 and (unique_count / num_rows) > 0.9:
-                warnings.append(f"Kardinalitas tinggi ({unique_count} nilai unik).")
-
-        # 4. Cek varians rendah (low-variance)
-        if col_series.n_unique() == 1:
-            warnings.append("Varians rendah (semua nilai sama).")
-        
-        # --- 5. DETEKSI ANOMALI BARU ---
-        # Lakukan hanya untuk kolom numerik
-        if col_series.dtype in pl.NUMERIC_DTYPES:
-            # Pastikan kolom tidak kosong untuk perhitungan kuantil
-            if not col_series.is_null().all():
-                q1 = col_series.quantile(0.25)
-                q3 = col_series.quantile(0.75)
-                if q1 is not None and q3 is not None:
-                    iqr = q3 - q1
-                    lower_bound = q1 - 1.5 * iqr
-                    upper_bound = q3 + 1.5 * iqr
-                    
-                    # Hitung jumlah outliers
-                    outliers_count = df.filter(
-                        (col_series < lower_bound) | (col_series > upper_bound)
-                    ).height
-                    
-                    if outliers_count > 0:
-                        anomaly_report["detected"] = True
-                        anomaly_report["count"] = outliers_count
-                        anomaly_report["method"] = "IQR"
-        
-        column_report = {
-            "name": col_name,
-            "dtype": col_dtype,
-            "missing_values": {
-                "count": missing_count,
-                "percentage": round(missing_percentage, 2)
-            },
-            "warnings": warnings,
-            "anomaly_report": anomaly_report # <-- Tambahkan hasil deteksi anomali
-        }
-        report["columns"].append(column_report)
-        
-    return report
\ No newline at end of file
+    check_stats = []
+    for stats in health_stats["columns"]:
+        entry = {"null_count": stats["null_count"], "n_unique": stats["hll"].estimate()}
+        kll = stats["kll"]
+        if kll is not None and kll.count > 0:
+            q1, q3 = kll.quantile(0.25), kll.quantile(0.75)
+            entry.update({"q1": q1, "q3": q3})
+            n, mean, m2 = stats["moments"]
+            if n > 0:
+                entry["mean"] = mean
+                entry["std"] = math.sqrt(m2 / (n - 1)) if n > 1 else None
+            if include_outliers:
+                iqr = q3 - q1
+                # Outlier adalah nilai yang benar-benar di luar batas (sama seperti
+                # pemeriksaan eksak), jadi ekor atas dihitung dari rank inklusif
+                outside = kll.rank(q1 - 1.5 * iqr) + (1 - kll.rank(q3 + 1.5 * iqr, inclusive=True))
+                entry["iqr_outliers"] = int(round(outside * kll.count))
+                if entry.get("std"):
+                    threshold = ZScoreCheck.threshold * entry["std"]
+                    outside = kll.rank(mean - threshold) + (1 - kll.rank(mean + threshold, inclusive=True))
+                    entry["zscore_outliers"] = int(round(outside * kll.count))
+        if stats["min"] is not None:
+            entry.update({"min": stats["min"], "max": stats["max"]})
+        check_stats.append(entry)
+    return check_stats
+
+def _columns_from_health_stats(health_stats: dict, schema) -> list:
+    return [(stats["name"], schema[stats["name"]]) for stats in health_stats["columns"]]
+
+def health_report_from_stats(health_stats: dict, schema) -> dict:
+    """
+    Menyusun health report hanya dari statistik yang bisa digabung (tanpa scan data),
+    mis. setelah batch baru ditambahkan. Semua field berbasis sketch ditandai `approximate`,
+    termasuk baris duplikat (dari HyperLogLog hash baris).
+    """
+    columns = _columns_from_health_stats(health_stats, schema)
+    check_stats = _check_stats_from_health_stats(health_stats, include_outliers=True)
+    num_rows = health_stats["num_rows"]
+    report = build_health_report(
+        columns, check_stats, _frame_stats_from_health_stats(health_stats), num_rows, approximate=True
+    )
+    report["approximate"] = True
+    return report
+
+def generate_streaming_health_report(filepath: str, batch_size: int = 100_000, health_stats: dict = None) -> dict:
+    """
+    Versi out-of-core dari `generate_health_report` untuk file yang lebih besar dari RAM.
+
+    File di-scan per batch (`scan_csv`/`scan_parquet`); tiap kolom menyimpan jumlah
+    nilai kosong (eksak), HyperLogLog untuk jumlah nilai unik, dan KLL untuk kuartil.
+    Baris duplikat diperkirakan dari HyperLogLog hash baris.
+    Statistik lanjutan pemeriksaan (mis. jumlah outlier IQR) lalu dihitung dengan satu
+    pass streaming. Bentuk laporan sama, dengan field perkiraan ditandai `approximate`.
+
+    `health_stats` hasil `compute_health_stats` dapat diberikan agar pass pertama dilewati.
+    """
+    lazy_df = scan_data_file(filepath)
+    schema = lazy_df.collect_schema()
+    if health_stats is None:
+        health_stats = compute_health_stats(filepath, batch_size)
+    if not health_stats["columns"]:
+        report = build_health_report([], [], {"num_rows": health_stats["num_rows"]}, health_stats["num_rows"], approximate=True)
+        report["approximate"] = True
+        return report
+
+    columns = _columns_from_health_stats(health_stats, schema)
+    num_rows = health_stats["num_rows"]
+    column_stats, frame_stats = compute_check_stats(
+        lazy_df, columns,
+        initial_stats=(
+            _check_stats_from_health_stats(health_stats, include_outliers=False),
+            _frame_stats_from_health_stats(health_stats)
+        ),
+        engine="streaming"
+    )
+    report = build_health_report(columns, column_stats, frame_stats, num_rows, approximate=True)
+    report["approximate"] = True
+    return report
+
+def reservoir_sample(
+    lazy_df: pl.LazyFrame,
+    sample_size: int,
+    time_budget_seconds: float,
+    batch_size: int = 50_000,
+    seed: int = 0
+) -> tuple:
+    """
+    Reservoir sampling (Algorithm R, divektorisasi per batch) dari LazyFrame.
+    Pembacaan berhenti saat `time_budget_seconds` habis, sehingga sampel mungkin
+    hanya mewakili bagian awal file.
+
+    Mengembalikan tuple (sampel, jumlah baris yang sudah dibaca).
+    """
+    rng = np.random.default_rng(seed)
+    deadline = time.monotonic() + time_budget_seconds
+    reservoir = None
+    rows_seen = 0
+
+    for batch in lazy_df.collect_batches(chunk_size=batch_size, engine="streaming"):
+        if reservoir is None:
+            reservoir = batch.clear()
+
+        # Isi reservoir sampai penuh
+        free_slots = sample_size - reservoir.height
+        if free_slots > 0:
+            reservoir = pl.concat([reservoir, batch.head(free_slots)])
+            rows_seen += min(free_slots, batch.height)
+            batch = batch.slice(free_slots)
+
+        if batch.height > 0:
+            # Baris ke-t (0-based) menggantikan slot acak dengan peluang k/(t+1)
+            positions = np.arange(rows_seen, rows_seen + batch.height)
+            slots = rng.integers(0, positions + 1)
+            accepted = np.flatnonzero(slots < sample_size)
+            if len(accepted):
+                # Jika satu slot diganti beberapa kali, yang terakhir berlaku
+                accepted_slots = slots[accepted]
+                _, last = np.unique(accepted_slots[::-1], return_index=True)
+                keep_rows = accepted[::-1][last]
+                replaced = np.zeros(reservoir.height, dtype=bool)
+                replaced[slots[keep_rows]] = True
+                reservoir = pl.concat([
+                    reservoir.filter(pl.Series(~replaced)),
+                    batch[keep_rows.tolist()],
+                ])
+            rows_seen += batch.height
+
+        if time.monotonic() >= deadline:
+            break
+
+    if reservoir is None:
+        reservoir = lazy_df.head(0).collect()
+    return reservoir, rows_seen
+
+def _wilson_interval(successes: int, trials: int, z: float = 1.96) -> tuple:
+    """
+    Interval kepercayaan Wilson untuk proporsi.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+# Statistik pemeriksaan berupa jumlah baris, diskalakan dari sampel ke seluruh data
+_SAMPLE_COUNT_STATS = ("null_count", "iqr_outliers", "zscore_outliers")
+
+def _scale_sample_stats(stats: dict, singletons: int, n: int, total_rows: int) -> dict:
+    scale = total_rows / n
+    scaled = dict(stats)
+    for stat in _SAMPLE_COUNT_STATS:
+        if scaled.get(stat) is not None:
+            scaled[stat] = round(scaled[stat] * scale)
+    if scaled.get("n_unique") is not None:
+        # Nilai yang muncul sekali di sampel diekstrapolasi ke seluruh data, nilai
+        # yang berulang dianggap sudah terwakili (kolom ID ~ total_rows, kolom
+        # kategori tetap jumlah kategorinya)
+        repeated = scaled["n_unique"] - singletons
+        scaled["n_unique"] = min(total_rows, round(repeated + singletons * scale))
+    return scaled
+
+def generate_sampled_health_report(
+    filepath: str,
+    sample_size: int,
+    time_budget_seconds: float,
+    confidence_level: float = 0.95
+) -> dict:
+    """
+    Laporan kesehatan sementara (`provisional`) dari reservoir sample.
+
+    Semua jumlah (nilai kosong, outlier IQR dan z-score, nilai unik, baris duplikat)
+    diperkirakan untuk jumlah baris penuh. Interval kepercayaan Wilson untuk nilai kosong
+    dan anomali dinyatakan dalam jumlah baris, sama seperti field `count`. Bentuk
+    laporan sama dengan `generate_health_report`.
+    """
+    lazy_df = scan_data_file(filepath)
+    total_rows = lazy_df.select(pl.len()).collect().item()
+    sample, rows_scanned = reservoir_sample(lazy_df, sample_size, time_budget_seconds)
+    n = sample.height
+    if n == 0:
+        report = generate_health_report(sample)
+    else:
+        columns = list(sample.schema.items())
+        column_stats, frame_stats = compute_check_stats(sample, columns)
+        singletons = sample.select([
+            (pl.col(col_name).unique_counts() == 1).sum() for col_name, _ in columns
+        ]).row(0) if columns else ()
+
+        scaled_column_stats = [
+            _scale_sample_stats(stats, column_singletons, n, total_rows)
+            for stats, column_singletons in zip(column_stats, singletons)
+        ]
+        scaled_frame_stats = {**frame_stats, "num_rows": total_rows}
+        if frame_stats.get("distinct_rows") is not None:
+            # Sampel seragam atas `rows_scanned` baris pertama (bisa kurang dari total jika
+            # waktu habis). Pasangan duplikat hanya terlihat jika keduanya masuk sampel
+            # (peluang f^2); hasilnya lalu diskalakan linear ke seluruh baris.
+            fraction = n / rows_scanned
+            scanned_duplicates = min(rows_scanned - 1, (n - frame_stats["distinct_rows"]) / (fraction * fraction))
+            duplicates = min(total_rows - 1, round(scanned_duplicates * total_rows / rows_scanned))
+            scaled_frame_stats["distinct_rows"] = total_rows - duplicates
+        report = build_health_report(columns, scaled_column_stats, scaled_frame_stats, total_rows, approximate=True)
+
+    z = float(norm.ppf(0.5 + confidence_level / 2))
+    for column_report, stats in zip(report["columns"], column_stats if n else []):
+        missing = column_report["missing_values"]
+        lower, upper = _wilson_interval(stats.get("null_count") or 0, n, z)
+        missing["approximate"] = True
+        missing["confidence_interval"] = [math.floor(lower * total_rows), math.ceil(upper * total_rows)]
+
+        anomaly = column_report["anomaly_report"]
+        if anomaly["method"] is not None:
+            lower, upper = _wilson_interval(stats.get("iqr_outliers") or 0, n, z)
+            anomaly["confidence_interval"] = [math.floor(lower * total_rows), math.ceil(upper * total_rows)]
+
+    report.update({
+        "provisional": True,
+        "approximate": True,
+        "sample_rows": n,
+        "rows_scanned": rows_scanned,
+        "total_rows": total_rows,
+        "confidence_level": confidence_level,
+        "confidence_interval_unit": "rows",
+    })
+    return report
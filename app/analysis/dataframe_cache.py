@@ -0,0 +1,133 @@
+import os
+import threading
+from collections import OrderedDict
+
+import polars as pl
+
+from app.config import settings
+from app.analysis.columnar_store import COLUMNAR_EXTENSION, read_columnar
+
+
+def read_data_file(filepath: str) -> pl.DataFrame:
+    """
+    Membaca file data (Parquet, CSV, atau Excel) menjadi DataFrame Polars.
+    """
+    if filepath.endswith(COLUMNAR_EXTENSION):
+        return read_columnar(filepath)
+    elif filepath.endswith('.csv'):
+        return pl.read_csv(filepath)
+    elif filepath.endswith(('.xlsx', '.xls')):
+        return pl.read_excel(filepath)
+    raise ValueError("Format file tidak didukung untuk analisis.")
+
+
+class DataFrameCache:
+    """
+    Cache LRU untuk DataFrame Polars yang sudah di-parse, berlaku untuk satu proses.
+
+    Kunci cache adalah path file beserta mtime dan ukurannya, sehingga file yang
+    berubah di disk otomatis dianggap sebagai entri baru. Total ukuran DataFrame
+    yang disimpan dibatasi oleh `max_bytes`; entri yang paling lama tidak dipakai
+    akan dikeluarkan lebih dulu.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple[pl.DataFrame, int]]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        # Satu lock per path agar request paralel untuk file yang sama tidak mem-parse dua kali
+        self._load_locks: dict[str, threading.Lock] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(filepath: str) -> tuple:
+        stat = os.stat(filepath)
+        return (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, df: pl.DataFrame) -> None:
+        size = int(df.estimated_size())
+        if size > self.max_bytes:
+            # DataFrame lebih besar dari seluruh anggaran, tidak disimpan
+            return
+
+        with self._lock:
+            # Buang versi lama dari file yang sama (mtime/ukuran berbeda)
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._remove(old_key)
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (df, size)
+            self._current_bytes += size
+
+            while self._current_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: tuple) -> None:
+        _, size = self._entries.pop(key)
+        self._current_bytes -= size
+
+    def get_or_load(self, filepath: str, loader=read_data_file) -> pl.DataFrame:
+        """
+        Mengembalikan DataFrame dari cache, atau membacanya dengan `loader` jika belum ada.
+        """
+        key = self.make_key(filepath)
+        df = self.get(key)
+        if df is not None:
+            return df
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key[0], threading.Lock())
+
+        with load_lock:
+            # Cek ulang: request lain mungkin sudah selesai memuat file ini
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+
+            df = loader(filepath)
+            self.put(key, df)
+            return df
+
+    def invalidate(self, filepath: str) -> None:
+        path = os.path.abspath(filepath)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Satu instance cache untuk seluruh proses
+dataframe_cache = DataFrameCache(max_bytes=settings.dataframe_cache_max_bytes)
@@ -0,0 +1,192 @@
+import io
+import multiprocessing
+import threading
+from collections import OrderedDict
+
+import polars as pl
+
+from app.config import settings
+
+
+class SandboxError(Exception):
+    """Kesalahan saat menjalankan kode di worker sandbox."""
+
+
+class SandboxTimeoutError(SandboxError):
+    """Eksekusi kode melebihi batas waktu dan worker-nya dihentikan."""
+
+
+def _apply_memory_limit(memory_limit_bytes: int) -> None:
+    if memory_limit_bytes <= 0:
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    except (ImportError, ValueError, OSError):
+        # Platform tanpa dukungan rlimit (mis. Windows): jalan tanpa batas memori
+        pass
+
+
+def _worker_main(conn, memory_limit_bytes: int) -> None:
+    """
+    Loop utama proses worker. Setiap worker punya `dataframe_cache` sendiri,
+    sehingga notebook yang baru dipakai tetap termuat di memori worker tersebut.
+    """
+    _apply_memory_limit(memory_limit_bytes)
+    from app.analysis.query_engine import run_polars_query
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        try:
+            result = run_polars_query(job["filepath"], job["polars_code"], lazy=job["lazy"], streaming=job["streaming"])
+            if isinstance(result, pl.Series):
+                result = result.to_frame()
+            if isinstance(result, pl.DataFrame):
+                # Hasil dikirim sebagai buffer Arrow IPC agar tidak perlu di-pickle per baris
+                buffer = io.BytesIO()
+                result.write_ipc(buffer)
+                conn.send(("arrow", buffer.getvalue()))
+            else:
+                conn.send(("text", str(result)))
+        except MemoryError:
+            conn.send(("error", "Eksekusi kode melebihi batas memori worker."))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_bytes: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_limit_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # Path notebook yang kemungkinan masih ada di cache worker ini (urutan LRU)
+        self.recent_paths: "OrderedDict[str, None]" = OrderedDict()
+
+    def remember(self, filepath: str, max_paths: int = 8) -> None:
+        self.recent_paths[filepath] = None
+        self.recent_paths.move_to_end(filepath)
+        while len(self.recent_paths) > max_paths:
+            self.recent_paths.popitem(last=False)
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Kumpulan proses worker yang sudah berjalan untuk mengeksekusi kode Polars hasil LLM.
+
+    Kode dijalankan di luar proses API dengan namespace terbatas, batas waktu per
+    job, dan batas memori per worker. Job untuk notebook yang sama diarahkan ke
+    worker yang terakhir memuatnya agar DataFrame-nya tidak dibaca ulang.
+    """
+
+    def __init__(self, size: int, timeout_seconds: float, memory_limit_bytes: int):
+        self.size = size
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        # 'spawn' dipakai karena fork dari proses yang sudah menjalankan thread Polars bisa deadlock
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: list[_Worker] = []
+        self._all: list[_Worker] = []
+        self._condition = threading.Condition()
+        self._started = False
+
+    def start(self) -> None:
+        with self._condition:
+            if self._started:
+                return
+            for _ in range(self.size):
+                worker = _Worker(self._ctx, self.memory_limit_bytes)
+                self._all.append(worker)
+                self._idle.append(worker)
+            self._started = True
+
+    def shutdown(self) -> None:
+        with self._condition:
+            for worker in self._all:
+                worker.stop()
+            self._all.clear()
+            self._idle.clear()
+            self._started = False
+
+    def _acquire(self, filepath: str) -> _Worker:
+        with self._condition:
+            while not self._idle:
+                self._condition.wait()
+            for worker in self._idle:
+                if filepath in worker.recent_paths:
+                    self._idle.remove(worker)
+                    return worker
+            return self._idle.pop()
+
+    def _release(self, worker: _Worker) -> None:
+        with self._condition:
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        new_worker = _Worker(self._ctx, self.memory_limit_bytes)
+        with self._condition:
+            self._all.remove(worker)
+            self._all.append(new_worker)
+        return new_worker
+
+    def run(self, filepath: str, polars_code: str, lazy: bool = True, streaming: bool = False, timeout: float = None):
+        """
+        Menjalankan kode di salah satu worker dan mengembalikan DataFrame (dari
+        buffer Arrow IPC) atau string. Memunculkan SandboxTimeoutError jika
+        melebihi batas waktu, atau SandboxError jika kode gagal.
+        """
+        self.start()
+        timeout = timeout or self.timeout_seconds
+        worker = self._acquire(filepath)
+        try:
+            worker.conn.send({"filepath": filepath, "polars_code": polars_code, "lazy": lazy, "streaming": streaming})
+            if not worker.conn.poll(timeout):
+                # Worker tidak bisa diinterupsi dengan aman, jadi dihentikan dan diganti
+                worker = self._replace(worker)
+                raise SandboxTimeoutError(f"Eksekusi kode melebihi batas waktu {timeout} detik.")
+            kind, payload = worker.conn.recv()
+            if kind != "error":
+                worker.remember(filepath)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            # Proses worker mati, mis. dihentikan OS karena kehabisan memori
+            worker = self._replace(worker)
+            raise SandboxError("Worker eksekusi berhenti secara tidak terduga.")
+        finally:
+            self._release(worker)
+
+        if kind == "error":
+            raise SandboxError(payload)
+        if kind == "arrow":
+            return pl.read_ipc(io.BytesIO(payload))
+        return payload
+
+
+sandbox_pool = SandboxPool(
+    size=settings.sandbox_workers,
+    timeout_seconds=settings.sandbox_timeout_seconds,
+    memory_limit_bytes=settings.sandbox_memory_limit_bytes,
+)
@@ -0,0 +1,110 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import polars as pl
+
+from app.analysis.columnar_store import (
+    columnar_path_for,
+    convert_to_columnar,
+    read_columnar,
+    stream_csv_to_columnar,
+    table_path_for,
+    write_columnar,
+)
+from app.analysis.data_quality import (
+    compute_health_stats,
+    generate_health_report,
+    generate_streaming_health_report,
+)
+from app.analysis.readers import (
+    read_excel_sheets,
+    read_table,
+    stream_compressed_csv_to_parquet,
+    stream_ndjson_to_parquet,
+)
+from app.config import settings
+
+# Tahapan ingestion, sesuai urutan eksekusinya
+INGESTION_STAGES = ("store", "parse_convert", "profile")
+
+
+def parse_and_convert(file_path: str, file_format: str, size_bytes: int) -> tuple[str, int, dict | None]:
+    """
+    Tahap parse/convert: menulis salinan Parquet kanonis dari file unggahan.
+    CSV besar, CSV terkompresi, dan NDJSON dikonversi secara streaming tanpa
+    dimuat seluruhnya ke memori. Setiap sheet Excel menjadi tabel tersendiri.
+
+    Mengembalikan (columnar_path tabel utama, jumlah baris tabel utama,
+    {nama_tabel: path Parquet} atau None jika hanya ada satu tabel).
+    """
+    columnar_path = columnar_path_for(file_path)
+    if file_format == 'csv' and size_bytes > settings.health_report_streaming_threshold_bytes:
+        stream_csv_to_columnar(file_path)
+        # Jumlah baris diambil dari metadata Parquet
+        return columnar_path, pl.scan_parquet(columnar_path).select(pl.len()).collect().item(), None
+    if file_format in ('csv.gz', 'csv.zst'):
+        return columnar_path, stream_compressed_csv_to_parquet(file_path, columnar_path, file_format), None
+    if file_format == 'ndjson':
+        return columnar_path, stream_ndjson_to_parquet(file_path, columnar_path), None
+
+    if file_format == 'xlsx':
+        sheets = read_excel_sheets(file_path)
+        if not sheets:
+            raise ValueError("Workbook tidak memiliki sheet berisi data.")
+        tables = {}
+        for index, (sheet_name, df) in enumerate(sheets.items()):
+            tables[sheet_name] = write_columnar(df, columnar_path if index == 0 else table_path_for(file_path, index))
+        first_sheet = next(iter(sheets.values()))
+        return columnar_path, first_sheet.height, tables if len(tables) > 1 else None
+
+    df = read_table(file_path, file_format)
+    return convert_to_columnar(df, file_path), df.height, None
+
+
+def profile_columnar(columnar_path: str) -> tuple[dict, dict]:
+    """
+    Tahap profile: menghitung statistik yang bisa digabung dan health report
+    eksak dari salinan Parquet. Mengembalikan (health_report, health_stats).
+    """
+    health_stats = compute_health_stats(columnar_path, batch_size=settings.health_report_batch_rows)
+    if os.path.getsize(columnar_path) > settings.health_report_streaming_threshold_bytes:
+        health_report = generate_streaming_health_report(
+            columnar_path, batch_size=settings.health_report_batch_rows, health_stats=health_stats
+        )
+    else:
+        health_report = generate_health_report(read_columnar(columnar_path))
+    return health_report, health_stats
+
+
+def stage_record(started_at: datetime, duration_seconds: float, status: str = "done", error: str = None, **details) -> dict:
+    """
+    Bentuk JSON satu tahap ingestion untuk disimpan di progress job.
+    """
+    record = {
+        "status": status,
+        "started_at": started_at.isoformat(),
+        "duration_seconds": round(duration_seconds, 3),
+        **details,
+    }
+    if error is not None:
+        record["error"] = error
+    return record
+
+
+@contextmanager
+def timed_stage(on_finish):
+    """
+    Mengukur durasi sebuah tahap dan memanggil `on_finish(record)` saat selesai
+    atau gagal. Pengecualian tetap diteruskan ke pemanggil.
+    """
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    details = {}
+    try:
+        yield details
+    except Exception as e:
+        on_finish(stage_record(started_at, time.perf_counter() - start, status="failed", error=str(e), **details))
+        raise
+    on_finish(stage_record(started_at, time.perf_counter() - start, **details))
@@ -0,0 +1,369 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from app import crud, models
+from app.database import SessionLocal
+from app.analysis import query_service
+from app.analysis.columnar_store import derived_paths, remove_dataset_files
+from app.analysis.data_quality import generate_sampled_health_report, health_stats_to_json
+from app.analysis.ingestion import parse_and_convert, profile_columnar, timed_stage
+from app.analysis.readers import detect_format
+from app.config import settings
+from app.upload.sessions import assemble_upload_session, remove_upload_session_files
+
+# Pemetaan jenis job -> fungsi handler(db, job) yang mengembalikan hasil (JSON)
+JOB_HANDLERS = {}
+
+
+def job_handler(kind: str):
+    """
+    Dekorator untuk mendaftarkan handler sebuah jenis job.
+    """
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def report_progress(db, job: models.AnalysisJob, **progress) -> None:
+    """
+    Memperbarui kolom progress job agar bisa dipantau lewat endpoint status.
+    """
+    job.progress = {**(job.progress or {}), **progress}
+    db.commit()
+
+
+@job_handler("causal_analysis")
+@job_handler("descriptive_analysis")
+def run_analysis_job(db, job: models.AnalysisJob) -> dict:
+    """
+    Menjalankan analisis yang sudah direncanakan saat job dikirim, lalu
+    menyimpan jawabannya ke riwayat percakapan notebook.
+    """
+    payload = job.payload
+    absolute_file_path, is_columnar = query_service.notebook_data_path(job.notebook, payload.get("table"))
+
+    report_progress(db, job, stage="running_analysis")
+    reply, structured_result = query_service.run_planned_analysis(
+        absolute_file_path,
+        is_columnar,
+        payload["df_schema"],
+        payload["intent"],
+        payload.get("variables"),
+        payload.get("polars_code"),
+        payload.get("response_format", "markdown"),
+        payload.get("robustness", False),
+        job.notebook.content_hash,
+    )
+
+    report_progress(db, job, stage="saving_conversation")
+    crud.create_conversation(
+        db=db,
+        notebook_id=job.notebook_id,
+        user_query=payload["query"],
+        ai_response=reply
+    )
+    return {"reply": reply, "result": structured_result}
+
+
+def _record_stage(db, job: models.AnalysisJob, name: str):
+    def on_finish(record: dict) -> None:
+        stages = {**(job.progress or {}).get("stages", {}), name: record}
+        report_progress(db, job, stages=stages)
+    return on_finish
+
+
+def _store_upload_session(db, job: models.AnalysisJob, notebook: models.Notebook) -> dict:
+    """
+    Tahap store untuk unggahan resumable: potongan sesi digabung ke `notebook.filepath`.
+    Hash file utuh disimpan di payload job sehingga percobaan ulang melewati tahap ini.
+    """
+    payload = job.payload
+    upload_session = crud.get_upload_session_by_id(db, payload["upload_session_id"])
+    report_progress(db, job, stage="store")
+    try:
+        with timed_stage(_record_stage(db, job, "store")) as details:
+            upload_stats = assemble_upload_session(upload_session, notebook.filepath)
+            details["size_bytes"] = upload_stats.size_bytes
+            details["chunks"] = upload_session.total_chunks
+    except Exception:
+        # Sesi dibuka kembali agar klien bisa mengirim ulang potongan dan mencoba lagi
+        db.rollback()
+        crud.reopen_upload_session(db, upload_session.id)
+        raise
+
+    job.payload = {**payload, "content_hash": upload_stats.content_hash, "size_bytes": upload_stats.size_bytes}
+    db.commit()
+    crud.transition_upload_session(db, upload_session.id, "finalizing", "completed")
+    remove_upload_session_files(upload_session.id)
+    return job.payload
+
+
+@job_handler("ingest")
+def run_ingest_job(db, job: models.AnalysisJob) -> dict:
+    """
+    Menjalankan tahap ingestion: store (hanya untuk unggahan resumable, potongan
+    digabung), parse/convert ke Parquet, lalu profile (health report). Hasilnya
+    didaftarkan sebagai blob dan notebook ditandai 'ready'. Waktu dan error setiap
+    tahap dicatat di `job.progress["stages"]`.
+    """
+    notebook = job.notebook
+    payload = job.payload
+    file_path = notebook.filepath
+    # Setelah blob didaftarkan, file Parquet hasil ingestion ini menjadi milik blob
+    registered = False
+
+    try:
+        crud.update_notebook_ingestion_status(db, notebook, "processing")
+        if "content_hash" not in payload:
+            payload = _store_upload_session(db, job, notebook)
+        content_hash = payload["content_hash"]
+
+        # Unggahan lain dengan isi yang sama mungkin sudah selesai diproses; blob
+        # dikunci sampai notebook ini tercatat sebagai referensinya
+        blob = crud.lock_dataset_blob(db, content_hash)
+        if blob is None:
+            report_progress(db, job, stage="parse_convert")
+            with timed_stage(_record_stage(db, job, "parse_convert")) as details:
+                columnar_path, num_rows, tables = parse_and_convert(
+                    file_path, detect_format(payload["filename"]), payload["size_bytes"]
+                )
+                details["rows"] = num_rows
+                if tables:
+                    details["tables"] = list(tables)
+
+            report_progress(db, job, stage="profile")
+            with timed_stage(_record_stage(db, job, "profile")):
+                if settings.health_report_progressive and num_rows > settings.health_report_sample_rows:
+                    # Laporan sementara dari sampel sudah bisa ditampilkan selama laporan eksak dihitung
+                    crud.update_notebook_health_report(
+                        db, notebook,
+                        generate_sampled_health_report(
+                            columnar_path,
+                            sample_size=settings.health_report_sample_rows,
+                            time_budget_seconds=settings.health_report_time_budget_seconds
+                        ),
+                        status="provisional"
+                    )
+                health_report, health_stats = profile_columnar(columnar_path)
+
+            while blob is None:
+                blob = crud.create_dataset_blob(
+                    db,
+                    content_hash=content_hash,
+                    filepath=file_path,
+                    columnar_path=columnar_path,
+                    size_bytes=payload["size_bytes"],
+                    health_report=health_report,
+                    health_stats=health_stats_to_json(health_stats),
+                    tables=tables
+                )
+                registered = blob is not None
+                if blob is None:
+                    # Unggahan paralel dengan isi yang sama sudah mendaftarkan blob lebih dulu;
+                    # jika blob itu sudah dihapus lagi, hasil ingestion ini yang didaftarkan
+                    blob = crud.lock_dataset_blob(db, content_hash)
+                    if blob is not None:
+                        remove_dataset_files([columnar_path, *(tables or {}).values()])
+
+        blob_filepath = blob.filepath
+        crud.attach_notebook_to_blob(db, notebook, blob)
+        if blob_filepath != file_path:
+            # Isi file sudah tersimpan di blob; salinan ini dihapus setelah referensinya di-commit
+            remove_dataset_files([file_path])
+    except Exception:
+        db.rollback()
+        if not registered:
+            # Output parse/convert yang belum tercatat di mana pun tidak akan terhapus
+            # oleh DELETE notebook (columnar_path belum diisi)
+            remove_dataset_files(derived_paths(file_path))
+        crud.update_notebook_ingestion_status(db, notebook, "failed")
+        raise
+
+    report_progress(db, job, stage="ready")
+    return {"health_report_version": notebook.health_report_version}
+
+
+class JobWorkerPool:
+    """
+    Thread worker yang mengambil job dari tabel `analysis_jobs`.
+
+    Job diklaim dengan `SELECT ... FOR UPDATE SKIP LOCKED`, sehingga beberapa
+    proses API bisa menjalankan pool masing-masing tanpa mengambil job yang sama.
+
+    Selama job berjalan, `heartbeat_at` diperbarui setiap `heartbeat_interval`.
+    Job 'running' yang heartbeat-nya lebih tua dari `lease_seconds` (proses worker
+    mati atau di-restart) dikembalikan ke antrean saat startup dan secara berkala,
+    atau ditandai 'failed' setelah `max_attempts` percobaan.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        poll_interval: float,
+        lease_seconds: float,
+        heartbeat_interval: float,
+        max_attempts: int,
+    ):
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.max_attempts = max_attempts
+        self._threads: list[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        # Job yang ditinggalkan proses sebelumnya dikembalikan ke antrean sebelum worker mulai
+        self._requeue_expired_jobs()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"analysis-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._reaper_loop, name="analysis-job-reaper", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads.clear()
+
+    def notify(self) -> None:
+        """
+        Membangunkan worker segera setelah job baru dibuat, tanpa menunggu interval polling.
+        """
+        self._wakeup.set()
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            if not self._run_next_job():
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _reaper_loop(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 2):
+            self._requeue_expired_jobs()
+
+    def _requeue_expired_jobs(self) -> None:
+        db = SessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            expired_jobs = (
+                db.query(models.AnalysisJob)
+                .filter(
+                    models.AnalysisJob.status == "running",
+                    func.coalesce(models.AnalysisJob.heartbeat_at, models.AnalysisJob.started_at)
+                    < now - timedelta(seconds=self.lease_seconds),
+                )
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            requeued = False
+            for job in expired_jobs:
+                if job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = f"Worker berhenti saat menjalankan job ({job.attempts} percobaan)."
+                    job.finished_at = now
+                    if job.kind == "ingest" and job.notebook is not None:
+                        job.notebook.ingestion_status = "failed"
+                else:
+                    job.status = "queued"
+                    requeued = True
+            db.commit()
+            if requeued:
+                self.notify()
+        except Exception as e:
+            print(f"Analysis job reaper error: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self, job_id: int, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_interval):
+            db = SessionLocal()
+            try:
+                db.query(models.AnalysisJob).filter(
+                    models.AnalysisJob.id == job_id, models.AnalysisJob.status == "running"
+                ).update({"heartbeat_at": datetime.now(timezone.utc)}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                print(f"Analysis job heartbeat error: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+    @staticmethod
+    def _claim_next_job(db):
+        job = (
+            db.query(models.AnalysisJob)
+            .filter(models.AnalysisJob.status == "queued")
+            .order_by(models.AnalysisJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+        now = datetime.now(timezone.utc)
+        job.status = "running"
+        job.started_at = now
+        job.claimed_at = now
+        job.heartbeat_at = now
+        job.attempts = (job.attempts or 0) + 1
+        db.commit()
+        return job
+
+    def _run_next_job(self) -> bool:
+        db = SessionLocal()
+        try:
+            job = self._claim_next_job(db)
+            if job is None:
+                return False
+
+            heartbeat_stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat_loop, args=(job.id, heartbeat_stop),
+                name=f"analysis-job-heartbeat-{job.id}", daemon=True
+            )
+            heartbeat.start()
+            try:
+                handler = JOB_HANDLERS.get(job.kind)
+                if handler is None:
+                    raise ValueError(f"Jenis job tidak dikenal: {job.kind}")
+                job.result = handler(db, job)
+                job.status = "succeeded"
+            except Exception as e:
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                heartbeat_stop.set()
+                heartbeat.join()
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            return True
+        except Exception as e:
+            # Kesalahan database tidak boleh menghentikan thread worker
+            print(f"Analysis job worker error: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+
+job_worker_pool = JobWorkerPool(
+    num_workers=settings.analysis_job_workers,
+    poll_interval=settings.analysis_job_poll_seconds,
+    lease_seconds=settings.analysis_job_lease_seconds,
+    heartbeat_interval=settings.analysis_job_heartbeat_seconds,
+    max_attempts=settings.analysis_job_max_attempts,
+)
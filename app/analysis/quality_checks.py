@@ -0,0 +1,390 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+
+import polars as pl
+
+# Daftar pemeriksaan kualitas data yang aktif, dijalankan sesuai urutan pendaftaran
+QUALITY_CHECKS: list["QualityCheck"] = []
+
+
+def register_check(cls):
+    """
+    Dekorator kelas untuk mendaftarkan pemeriksaan baru ke `QUALITY_CHECKS`.
+    """
+    QUALITY_CHECKS.append(cls())
+    return cls
+
+
+class QualityCheck(ABC):
+    """
+    Pemeriksaan per kolom. Setiap pemeriksaan mendeklarasikan statistik yang
+    dibutuhkan sebagai ekspresi Polars bernama; engine menggabungkan ekspresi
+    semua pemeriksaan (nama yang sama hanya dihitung sekali) ke dalam satu `select`.
+
+    `follow_up_expressions` dipakai untuk statistik yang bergantung pada hasil
+    scan pertama (mis. jumlah outlier setelah kuartil diketahui).
+    """
+    name = ""
+
+    def applies_to(self, dtype) -> bool:
+        return True
+
+    def expressions(self, col: pl.Expr, dtype) -> dict:
+        return {}
+
+    def follow_up_expressions(self, col: pl.Expr, dtype, stats: dict) -> dict:
+        return {}
+
+    @abstractmethod
+    def evaluate(self, column_report: dict, dtype, stats: dict, num_rows: int, approximate: bool = False) -> None:
+        ...
+
+
+class FrameQualityCheck(QualityCheck):
+    """
+    Pemeriksaan tingkat dataset (mis. baris duplikat). Ekspresinya ikut digabung
+    ke `select` yang sama dengan pemeriksaan per kolom.
+    """
+
+    def expressions(self, columns: list) -> dict:
+        return {}
+
+    def follow_up_expressions(self, columns: list, stats: dict) -> dict:
+        return {}
+
+    @abstractmethod
+    def evaluate(self, report: dict, stats: dict, num_rows: int, approximate: bool = False) -> None:
+        ...
+
+
+@register_check
+class MissingValuesCheck(QualityCheck):
+    name = "missing_values"
+
+    def expressions(self, col, dtype):
+        return {"null_count": col.null_count()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        missing_count = stats.get("null_count")
+        if missing_count is None:
+            return
+        missing_percentage = (missing_count / num_rows) * 100 if num_rows > 0 else 0
+        column_report["missing_values"] = {
+            "count": missing_count,
+            "percentage": round(missing_percentage, 2)
+        }
+
+
+@register_check
+class MixedTypeCheck(QualityCheck):
+    name = "mixed_type"
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        if str(dtype) == 'Object':
+            column_report["warnings"].append("Tipe data campuran terdeteksi.")
+
+
+@register_check
+class HighCardinalityCheck(QualityCheck):
+    name = "high_cardinality"
+
+    def applies_to(self, dtype):
+        return dtype in [pl.Utf8, pl.Object]
+
+    def expressions(self, col, dtype):
+        return {"n_unique": col.n_unique()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        unique_count = stats.get("n_unique")
+        if unique_count is not None and num_rows > 0 and (unique_count / num_rows) > 0.9:
+            prefix = "~" if approximate else ""
+            column_report["warnings"].append(f"Kardinalitas tinggi ({prefix}{unique_count} nilai unik).")
+
+
+@register_check
+class LowVarianceCheck(QualityCheck):
+    name = "low_variance"
+
+    def expressions(self, col, dtype):
+        return {"n_unique": col.n_unique()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        if stats.get("n_unique") == 1:
+            column_report["warnings"].append("Varians rendah (semua nilai sama).")
+
+
+@register_check
+class IQRAnomalyCheck(QualityCheck):
+    name = "iqr_anomaly"
+
+    def applies_to(self, dtype):
+        return dtype.is_numeric()
+
+    def expressions(self, col, dtype):
+        return {"q1": col.quantile(0.25), "q3": col.quantile(0.75)}
+
+    def follow_up_expressions(self, col, dtype, stats):
+        q1, q3 = stats.get("q1"), stats.get("q3")
+        if q1 is None or q3 is None:
+            return {}
+        iqr = q3 - q1
+        return {"iqr_outliers": ((col < q1 - 1.5 * iqr) | (col > q3 + 1.5 * iqr)).sum()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        outliers_count = stats.get("iqr_outliers") or 0
+        if outliers_count > 0:
+            column_report["anomaly_report"].update({
+                "detected": True,
+                "count": outliers_count,
+                "method": "IQR"
+            })
+
+
+@register_check
+class ZScoreCheck(QualityCheck):
+    name = "zscore"
+    threshold = 3.0
+
+    def applies_to(self, dtype):
+        return dtype.is_numeric()
+
+    def expressions(self, col, dtype):
+        return {"mean": col.mean(), "std": col.std()}
+
+    def follow_up_expressions(self, col, dtype, stats):
+        mean, std = stats.get("mean"), stats.get("std")
+        if mean is None or not std:
+            return {}
+        return {"zscore_outliers": (((col - mean) / std).abs() > self.threshold).sum()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        outliers_count = stats.get("zscore_outliers") or 0
+        if outliers_count > 0:
+            column_report["warnings"].append(
+                f"{outliers_count} nilai dengan |z-score| > {self.threshold:g}."
+            )
+
+
+@register_check
+class DateRangeCheck(QualityCheck):
+    name = "date_range"
+    earliest_plausible = date(1900, 1, 1)
+    max_days_in_future = 365
+
+    def applies_to(self, dtype):
+        return dtype == pl.Date or dtype == pl.Datetime
+
+    def expressions(self, col, dtype):
+        return {"min": col.min(), "max": col.max()}
+
+    def evaluate(self, column_report, dtype, stats, num_rows, approximate=False):
+        min_value, max_value = stats.get("min"), stats.get("max")
+        if isinstance(min_value, datetime):
+            min_value = min_value.date()
+        if isinstance(max_value, datetime):
+            max_value = max_value.date()
+        if min_value is not None and min_value < self.earliest_plausible:
+            column_report["warnings"].append(f"Tanggal sebelum {self.earliest_plausible.year} terdeteksi (min: {min_value}).")
+        latest_plausible = date.today() + timedelta(days=self.max_days_in_future)
+        if max_value is not None and max_value > latest_plausible:
+            column_report["warnings"].append(f"Tanggal jauh di masa depan terdeteksi (maks: {max_value}).")
+
+
+# Pengali ganjil untuk menggabungkan hash per kolom menjadi hash baris
+_ROW_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def row_hash_expr(columns: list) -> pl.Expr | None:
+    """
+    Hash 64-bit per baris, digabung dari hash setiap kolom. Jauh lebih murah daripada
+    `pl.struct(pl.all())` untuk file lebar; peluang tabrakan hash 64-bit dapat
+    diabaikan untuk menghitung baris unik. None jika ada kolom yang tidak bisa di-hash.
+    """
+    if not columns or any(dtype == pl.Object for _, dtype in columns):
+        return None
+    multiplier = pl.lit(_ROW_HASH_MULTIPLIER, dtype=pl.UInt64)
+    expr = None
+    for col_name, _ in columns:
+        col_hash = pl.col(col_name).hash()
+        expr = col_hash if expr is None else (expr * multiplier) ^ col_hash
+    return expr
+
+
+@register_check
+class DuplicateRowsCheck(FrameQualityCheck):
+    """
+    Jumlah baris duplikat. Jika `distinct_rows` berasal dari sketch HyperLogLog,
+    `distinct_rows_margin` (galat ~95%) ikut diberikan dan duplikat hanya
+    diperingatkan jika melebihi galat tersebut.
+    """
+    name = "duplicate_rows"
+
+    def expressions(self, columns):
+        row_hash = row_hash_expr(columns)
+        return {} if row_hash is None else {"distinct_rows": row_hash.n_unique()}
+
+    def evaluate(self, report, stats, num_rows, approximate=False):
+        distinct_rows = stats.get("distinct_rows")
+        if distinct_rows is None:
+            # Bentuk laporan tetap sama meskipun duplikat tidak bisa dihitung
+            report["duplicate_rows"] = {"count": None, "available": False}
+            return
+        duplicate_count = max(num_rows - distinct_rows, 0)
+        entry = {"count": duplicate_count}
+        detected = duplicate_count > 0
+        if approximate:
+            entry["approximate"] = True
+            margin = stats.get("distinct_rows_margin")
+            if margin is not None:
+                entry["confidence_interval"] = [
+                    max(duplicate_count - margin, 0), min(duplicate_count + margin, max(num_rows - 1, 0))
+                ]
+                detected = duplicate_count > margin
+        report["duplicate_rows"] = entry
+        if detected:
+            prefix = "Sekitar " if approximate else ""
+            report.setdefault("warnings", []).append(f"{prefix}{duplicate_count} baris duplikat terdeteksi.")
+
+
+def _merge_expressions(target: dict, expressions: dict) -> None:
+    # Statistik dengan nama yang sama (mis. n_unique) cukup dihitung sekali
+    for stat, expr in expressions.items():
+        target.setdefault(stat, expr)
+
+
+def _collect_merged(data, column_exprs: list, frame_exprs: dict, engine: str) -> tuple:
+    """
+    Menjalankan semua ekspresi dalam satu `select`. Polars mengevaluasi
+    ekspresi-ekspresi tersebut secara paralel di thread pool-nya.
+
+    DataFrame di memori dievaluasi langsung (eager): untuk ribuan ekspresi,
+    perencanaan query lazy jauh lebih mahal daripada perhitungannya sendiri.
+    """
+    exprs = [
+        expr.alias(f"{i}:{stat}")
+        for i, col_exprs in enumerate(column_exprs)
+        for stat, expr in col_exprs.items()
+    ]
+    exprs += [expr.alias(f"frame:{stat}") for stat, expr in frame_exprs.items()]
+
+    column_stats = [{} for _ in column_exprs]
+    frame_stats = {}
+    if not exprs:
+        return column_stats, frame_stats
+
+    if isinstance(data, pl.DataFrame):
+        row = data.select(exprs).row(0, named=True)
+    else:
+        row = data.select(exprs).collect(engine=engine).row(0, named=True)
+    for alias, value in row.items():
+        scope, stat = alias.split(":", 1)
+        if scope == "frame":
+            frame_stats[stat] = value
+        else:
+            column_stats[int(scope)][stat] = value
+    return column_stats, frame_stats
+
+
+def compute_check_stats(
+    data,
+    columns: list,
+    checks: list = None,
+    initial_stats: tuple = None,
+    engine: str = "auto"
+) -> tuple:
+    """
+    Menghitung statistik yang dibutuhkan semua pemeriksaan terhadap `data`
+    (DataFrame atau LazyFrame) dalam paling banyak dua scan:
+    scan pertama untuk semua `expressions`, scan kedua untuk `follow_up_expressions`.
+
+    `initial_stats` (column_stats, frame_stats) dapat diberikan untuk melewati scan
+    pertama, mis. jika statistik sudah diperkirakan dari sketch.
+    """
+    checks = QUALITY_CHECKS if checks is None else checks
+    column_checks = [c for c in checks if not isinstance(c, FrameQualityCheck)]
+    frame_checks = [c for c in checks if isinstance(c, FrameQualityCheck)]
+
+    if initial_stats is None:
+        column_exprs = []
+        for col_name, dtype in columns:
+            col_exprs = {}
+            for check in column_checks:
+                if check.applies_to(dtype):
+                    _merge_expressions(col_exprs, check.expressions(pl.col(col_name), dtype))
+            column_exprs.append(col_exprs)
+        frame_exprs = {"num_rows": pl.len()}
+        for check in frame_checks:
+            _merge_expressions(frame_exprs, check.expressions(columns))
+        column_stats, frame_stats = _collect_merged(data, column_exprs, frame_exprs, engine)
+    else:
+        column_stats, frame_stats = initial_stats
+
+    follow_up_column_exprs = []
+    for (col_name, dtype), stats in zip(columns, column_stats):
+        col_exprs = {}
+        for check in column_checks:
+            if check.applies_to(dtype):
+                _merge_expressions(col_exprs, check.follow_up_expressions(pl.col(col_name), dtype, stats))
+        follow_up_column_exprs.append(col_exprs)
+    follow_up_frame_exprs = {}
+    for check in frame_checks:
+        _merge_expressions(follow_up_frame_exprs, check.follow_up_expressions(columns, frame_stats))
+
+    follow_up_column_stats, follow_up_frame_stats = _collect_merged(
+        data, follow_up_column_exprs, follow_up_frame_exprs, engine
+    )
+    for stats, follow_up in zip(column_stats, follow_up_column_stats):
+        stats.update(follow_up)
+    frame_stats.update(follow_up_frame_stats)
+    return column_stats, frame_stats
+
+
+def build_health_report(
+    columns: list,
+    column_stats: list,
+    frame_stats: dict,
+    num_rows: int,
+    checks: list = None,
+    approximate: bool = False
+) -> dict:
+    """
+    Menyusun health report dari statistik yang sudah dihitung. Pemeriksaan yang
+    statistiknya tidak tersedia dilewati.
+    """
+    checks = QUALITY_CHECKS if checks is None else checks
+    report = {"columns": []}
+
+    for (col_name, dtype), stats in zip(columns, column_stats):
+        column_report = {
+            "name": col_name,
+            "dtype": str(dtype),
+            "missing_values": {"count": 0, "percentage": 0},
+            "warnings": [],
+            "anomaly_report": { "detected": False, "count": 0, "method": None }
+        }
+        for check in checks:
+            if not isinstance(check, FrameQualityCheck) and check.applies_to(dtype):
+                check.evaluate(column_report, dtype, stats, num_rows, approximate)
+
+        if approximate:
+            # Jumlah nilai kosong tetap eksak; batas IQR dan kardinalitas dari sketch
+            column_report["missing_values"]["approximate"] = False
+            column_report["anomaly_report"]["approximate"] = True
+            if "n_unique" in stats:
+                column_report["unique_count"] = {"value": stats["n_unique"], "approximate": True}
+        report["columns"].append(column_report)
+
+    for check in checks:
+        if isinstance(check, FrameQualityCheck):
+            check.evaluate(report, frame_stats, num_rows, approximate)
+    return report
+
+
+def run_quality_checks(df, checks: list = None) -> dict:
+    """
+    Menjalankan semua pemeriksaan terdaftar terhadap DataFrame atau LazyFrame
+    dan mengembalikan health report.
+    """
+    columns = list(df.collect_schema().items())
+    column_stats, frame_stats = compute_check_stats(df, columns, checks)
+    return build_health_report(columns, column_stats, frame_stats, frame_stats["num_rows"], checks)
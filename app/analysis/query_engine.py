@@ -0,0 +1,86 @@
+import builtins
+
+import polars as pl
+from polars.lazyframe.group_by import LazyGroupBy
+
+from app.analysis.columnar_store import COLUMNAR_EXTENSION
+from app.analysis.dataframe_cache import dataframe_cache
+
+# Builtins yang boleh dipakai oleh kode hasil LLM; open, __import__, eval, dll. tidak tersedia
+SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in (
+        "abs", "all", "any", "bool", "dict", "enumerate", "float", "int", "len", "list",
+        "max", "min", "range", "round", "set", "sorted", "str", "sum", "tuple", "zip",
+    )
+}
+
+
+def scan_data_file(filepath: str) -> pl.LazyFrame:
+    """
+    Membuka file data sebagai LazyFrame tanpa membaca isinya.
+    Hanya Parquet dan CSV yang bisa di-scan; format lain memunculkan ValueError.
+    """
+    if filepath.endswith(COLUMNAR_EXTENSION):
+        return pl.scan_parquet(filepath)
+    elif filepath.endswith('.csv'):
+        return pl.scan_csv(filepath)
+    raise ValueError("Format file tidak mendukung eksekusi lazy.")
+
+
+def execute_polars_code(polars_code: str, df, streaming: bool = False):
+    """
+    Mengevaluasi kode Polars hasil LLM terhadap `df` (DataFrame atau LazyFrame).
+
+    Jika hasilnya LazyFrame, query di-collect di sini sehingga optimizer Polars
+    bisa menerapkan projection dan predicate pushdown ke pembacaan file.
+    """
+    # Kode hanya melihat 'pl', 'df', dan builtins yang aman. Akses atribut dunder
+    # diblokir agar kode tidak bisa keluar dari namespace lewat __class__/__globals__.
+    if "__" in polars_code:
+        raise ValueError("Kode yang dihasilkan mengandung konstruksi yang tidak diizinkan.")
+    result = eval(polars_code, {"__builtins__": SAFE_BUILTINS, "pl": pl, "df": df})
+
+    if isinstance(result, pl.LazyFrame):
+        result = result.collect(engine="streaming" if streaming else "auto")
+    return result
+
+
+def _is_lazy_incompatible(error: Exception) -> bool:
+    """
+    Apakah kesalahan berasal dari kode yang hanya berlaku untuk DataFrame eager
+    (mis. `df.height`, `df["kolom"]`, `df.to_dummies()`), bukan kesalahan kode itu sendiri.
+    """
+    if isinstance(error, pl.exceptions.InvalidOperationError):
+        return True
+    if isinstance(error, AttributeError):
+        return isinstance(error.obj, (pl.LazyFrame, LazyGroupBy))
+    if isinstance(error, TypeError):
+        return "LazyFrame" in str(error)
+    return False
+
+
+def run_polars_query(filepath: str, polars_code: str, lazy: bool = True, streaming: bool = False):
+    """
+    Menjalankan kode Polars terhadap file data notebook.
+
+    Mode lazy dicoba lebih dulu. Kode hanya dijalankan ulang terhadap DataFrame
+    dari cache proses jika format file tidak bisa di-scan atau kode memakai API
+    khusus DataFrame eager; kesalahan lain (kolom tidak ada, kehabisan memori,
+    dll.) langsung diteruskan agar batas memori mode lazy tetap berlaku.
+    """
+    if lazy:
+        try:
+            lazy_df = scan_data_file(filepath)
+        except ValueError:
+            lazy_df = None
+        if lazy_df is not None:
+            try:
+                # 'df' berupa LazyFrame: hanya kolom dan baris yang dipakai kode yang dibaca dari disk
+                return execute_polars_code(polars_code, lazy_df, streaming=streaming)
+            except Exception as e:
+                if not _is_lazy_incompatible(e):
+                    raise
+                print(f"Lazy execution failed, falling back to eager DataFrame: {e}")
+
+    return execute_polars_code(polars_code, dataframe_cache.get_or_load(filepath))
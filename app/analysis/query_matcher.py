@@ -0,0 +1,110 @@
+import re
+import threading
+from typing import Optional
+
+
+class QueryMatcher:
+    """
+    Pencocok query deterministik untuk pertanyaan yang sering muncul.
+
+    Pola yang dikenali langsung dikompilasi menjadi kode Polars tanpa memanggil LLM,
+    lalu dijalankan lewat jalur eksekusi yang sama dengan kode hasil LLM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.served_without_llm = 0
+        self.pattern_counts: dict[str, int] = {}
+        self._rules = [
+            ("describe", re.compile(r"^(describe|deskripsikan|ringkasan statistik|summary|statistik( deskriptif)?)$"), self._describe),
+            ("head", re.compile(r"^(show |tampilkan |tunjukkan )?(head|first|top|awal)( (?P<n>\d+))?( rows| baris)?$"), self._head),
+            ("head", re.compile(r"^(show |tampilkan |tunjukkan )?(?P<n>\d+) (rows|baris)( pertama| first)?$"), self._head),
+            ("tail", re.compile(r"^(show |tampilkan |tunjukkan )?(tail|last|akhir)( (?P<n>\d+))?( rows| baris)?$"), self._tail),
+            ("row_count", re.compile(r"^(row count|count rows|how many rows|jumlah baris|berapa (jumlah )?baris)$"), self._row_count),
+            ("columns", re.compile(r"^(columns|list columns|show columns|column names|daftar kolom|kolom apa saja|tampilkan kolom)$"), self._columns),
+            ("null_counts", re.compile(r"^(null counts?|missing values|count nulls|nilai kosong|jumlah nilai kosong)$"), self._null_counts),
+            ("group_sum", re.compile(
+                r"^(show |tampilkan |tunjukkan )?(total|sum( of)?|jumlah) (?P<value>[\w ]+?) (per|by|berdasarkan|untuk setiap|tiap) (?P<group>[\w ]+)$"
+            ), self._group_sum),
+        ]
+
+    @staticmethod
+    def normalize(user_query: str) -> str:
+        normalized = re.sub(r"\s+", " ", user_query.strip().lower())
+        return normalized.rstrip(" ?!.")
+
+    def match(self, user_query: str, df_schema: dict) -> Optional[str]:
+        """
+        Mengembalikan kode Polars untuk query yang dikenali, atau None jika query
+        harus diteruskan ke LLM.
+        """
+        normalized = self.normalize(user_query)
+        for name, pattern, compile_fn in self._rules:
+            found = pattern.match(normalized)
+            if not found:
+                continue
+            polars_code = compile_fn(found, df_schema)
+            if polars_code is None:
+                continue
+            if "__" in polars_code:
+                # Nama kolom dengan '__' selalu ditolak `execute_polars_code` (pemblokiran
+                # dunder); serahkan ke LLM alih-alih mengembalikan kode yang pasti gagal
+                return None
+            with self._lock:
+                self.served_without_llm += 1
+                self.pattern_counts[name] = self.pattern_counts.get(name, 0) + 1
+            return polars_code
+        return None
+
+    @staticmethod
+    def _resolve_column(name: str, df_schema: dict) -> Optional[str]:
+        # Nama kolom dicocokkan tanpa membedakan huruf besar/kecil; spasi boleh ditulis sebagai '_'
+        candidates = {name.strip(), name.strip().replace(" ", "_")}
+        for col in df_schema:
+            if col.lower() in candidates:
+                return col
+        return None
+
+    @staticmethod
+    def _describe(found, df_schema) -> str:
+        return "df.describe()"
+
+    @staticmethod
+    def _head(found, df_schema) -> str:
+        return f"df.head({int(found.group('n') or 5)})"
+
+    @staticmethod
+    def _tail(found, df_schema) -> str:
+        return f"df.tail({int(found.group('n') or 5)})"
+
+    @staticmethod
+    def _row_count(found, df_schema) -> str:
+        return "df.select(pl.len().alias('row_count'))"
+
+    @staticmethod
+    def _columns(found, df_schema) -> str:
+        names = list(df_schema)
+        dtypes = [df_schema[name] for name in names]
+        return f"pl.DataFrame({{'column': {names!r}, 'dtype': {dtypes!r}}})"
+
+    @staticmethod
+    def _null_counts(found, df_schema) -> str:
+        return "df.null_count()"
+
+    def _group_sum(self, found, df_schema) -> Optional[str]:
+        value_col = self._resolve_column(found.group("value"), df_schema)
+        group_col = self._resolve_column(found.group("group"), df_schema)
+        if value_col is None or group_col is None:
+            # Nama kolom tidak ada di skema; biarkan LLM yang menafsirkan
+            return None
+        return f"df.group_by({group_col!r}).agg(pl.sum({value_col!r})).sort({group_col!r})"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "served_without_llm": self.served_without_llm,
+                "patterns": dict(self.pattern_counts),
+            }
+
+
+query_matcher = QueryMatcher()
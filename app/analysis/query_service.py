@@ -0,0 +1,187 @@
+import os
+
+from fastapi import HTTPException
+import polars as pl
+
+from app.ai import llm_service
+from app.analysis import causal_service
+from app.analysis.dataframe_cache import dataframe_cache
+from app.analysis.columnar_store import read_columnar, read_columnar_schema
+from app.analysis.query_engine import run_polars_query
+from app.analysis.query_matcher import query_matcher
+from app.analysis.result_cache import result_cache, dataset_version
+from app.analysis.rendering import render_markdown, to_structured_result
+from app.analysis.executor import sandbox_pool
+from app.config import settings
+
+UNKNOWN_INTENT_REPLY = "Maaf, saya tidak yakin dengan niat analisis Anda. Coba ajukan pertanyaan deskriptif ('tunjukkan...') atau kausal ('apa dampak dari...')."
+
+
+def notebook_data_path(notebook, table: str = None) -> tuple[str, bool]:
+    """
+    Mengembalikan path absolut file data notebook dan apakah file itu salinan Parquet.
+    Notebook lama tanpa salinan kolumnar masih membaca file aslinya.
+
+    `table` memilih tabel lain dari `notebook.tables` (mis. sheet Excel selain yang pertama).
+    """
+    if notebook.ingestion_status != "ready":
+        raise HTTPException(status_code=409, detail="Data notebook masih diproses atau gagal diproses.")
+    if table is not None:
+        tables = notebook.tables or {}
+        if table not in tables:
+            raise HTTPException(status_code=404, detail=f"Tabel '{table}' tidak ditemukan di notebook ini.")
+        return os.path.abspath(tables[table]), True
+    is_columnar = bool(notebook.columnar_path)
+    return os.path.abspath(notebook.columnar_path or notebook.filepath), is_columnar
+
+
+def load_notebook_df(absolute_file_path: str) -> pl.DataFrame:
+    # DataFrame disimpan di cache proses sehingga pertanyaan lanjutan tidak mem-parse ulang file.
+    try:
+        return dataframe_cache.get_or_load(absolute_file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gagal membaca file data: {str(e)}")
+
+
+def read_notebook_schema(absolute_file_path: str, is_columnar: bool) -> dict:
+    # Untuk Parquet, skema dibaca dari metadata tanpa memuat datanya.
+    if is_columnar:
+        try:
+            return read_columnar_schema(absolute_file_path)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Gagal membaca file data: {str(e)}")
+    return {col: str(dtype) for col, dtype in load_notebook_df(absolute_file_path).schema.items()}
+
+
+def run_causal_analysis(
+    absolute_file_path: str,
+    is_columnar: bool,
+    df_schema: dict,
+    variables: dict,
+    robustness: bool = False,
+    response_format: str = "markdown"
+) -> tuple:
+    """
+    Mengembalikan balasan teks dan, jika mode robustness aktif dengan format
+    'json'/'arrow', tabel hasil uji robustness sebagai hasil terstruktur.
+    """
+    if is_columnar:
+        # Hanya baca kolom yang dibutuhkan model kausal
+        causal_columns = [variables.get("treatment"), variables.get("outcome"), *(variables.get("common_causes") or [])]
+        causal_columns = [c for c in dict.fromkeys(causal_columns) if c in df_schema]
+        df = read_columnar(absolute_file_path, columns=causal_columns)
+    else:
+        df = load_notebook_df(absolute_file_path)
+    reply, robustness_summary = causal_service.analyze_causal_effect(
+        df=df,
+        treatment=variables.get("treatment"),
+        outcome=variables.get("outcome"),
+        common_causes=variables.get("common_causes", []),
+        robustness=robustness
+    )
+    structured = None
+    if robustness_summary is not None and response_format != "markdown":
+        structured = to_structured_result(
+            causal_service.robustness_summary_frame(robustness_summary),
+            response_format, max_rows=settings.query_result_max_rows
+        )
+    return reply, structured
+
+
+def run_descriptive_analysis(
+    absolute_file_path: str, polars_code: str, response_format: str, content_hash: str = None
+) -> tuple:
+    """
+    Mengembalikan balasan markdown dan, untuk format 'json'/'arrow', hasil terstruktur.
+    """
+    try:
+        # Kode yang sama terhadap isi file yang sama tidak dihitung ulang
+        cache_key = result_cache.make_key(dataset_version(absolute_file_path, content_hash), polars_code)
+        result = result_cache.get(cache_key)
+        if result is None:
+            result = execute_generated_code(absolute_file_path, polars_code)
+            result_cache.put(cache_key, result)
+        
+        if isinstance(result, pl.DataFrame):
+            reply = render_markdown(result, max_rows=settings.query_result_max_rows)
+            structured = None
+            if response_format != "markdown":
+                structured = to_structured_result(result, response_format, max_rows=settings.query_result_max_rows)
+            return reply, structured
+        return str(result), None
+    except Exception as e:
+        return f"Error executing generated code: {e}", None
+
+
+def execute_generated_code(absolute_file_path: str, polars_code: str):
+    if settings.sandbox_enabled:
+        # Dijalankan di worker terpisah dengan batas waktu dan memori
+        return sandbox_pool.run(
+            absolute_file_path, polars_code,
+            lazy=settings.lazy_query_engine, streaming=settings.lazy_streaming_engine
+        )
+    return run_polars_query(
+        absolute_file_path, polars_code,
+        lazy=settings.lazy_query_engine, streaming=settings.lazy_streaming_engine
+    )
+
+
+async def plan_analysis(df_schema: dict, user_query: str) -> tuple:
+    """
+    Menentukan niat, variabel kausal, dan kode Polars untuk sebuah pertanyaan.
+    Mengembalikan tuple (intent, variables, polars_code).
+    """
+    # Query umum (describe, head, jumlah baris, ...) langsung dikompilasi ke Polars tanpa LLM
+    matched_code = query_matcher.match(user_query, df_schema)
+    if matched_code is not None:
+        return "descriptive_analysis", None, matched_code
+
+    # Selain itu, panggil LLM untuk memahami niat pengguna. Planner gabungan mengembalikan niat
+    # dan kode Polars sekaligus; jika gagal, kembali ke dua panggilan terpisah.
+    plan = None
+    if settings.llm_single_call_planner:
+        try:
+            plan = await llm_service.plan_query(df_schema=df_schema, user_query=user_query)
+        except Exception as e:
+            print(f"Query planner failed, falling back to separate LLM calls: {e}")
+
+    if plan and plan.get("intent") in ("descriptive_analysis", "causal_analysis"):
+        intent = plan.get("intent")
+        variables = plan.get("variables")
+        polars_code = plan.get("polars_code")
+    else:
+        intent_data = await llm_service.analyze_user_intent(df_schema=df_schema, user_query=user_query)
+        intent = intent_data.get("intent")
+        variables = intent_data.get("variables")
+        polars_code = None
+
+    if intent == "descriptive_analysis" and (not isinstance(polars_code, str) or not polars_code.strip()):
+        polars_code = await llm_service.generate_polars_code(df_schema=df_schema, user_query=user_query)
+    return intent, variables, polars_code
+
+
+def run_planned_analysis(
+    absolute_file_path: str,
+    is_columnar: bool,
+    df_schema: dict,
+    intent: str,
+    variables: dict,
+    polars_code: str,
+    response_format: str = "markdown",
+    robustness: bool = False,
+    content_hash: str = None
+) -> tuple:
+    """
+    Menjalankan analisis sesuai niat hasil `plan_analysis` (bagian yang berat: Polars/DoWhy).
+    `content_hash` notebook (jika ada) dipakai sebagai kunci cache hasil query.
+    Mengembalikan tuple (balasan markdown, hasil terstruktur atau None).
+    """
+    if intent == "causal_analysis" and variables:
+        return run_causal_analysis(absolute_file_path, is_columnar, df_schema, variables, robustness, response_format)
+    elif intent == "descriptive_analysis":
+        if "ERROR:" in polars_code:
+            return polars_code, None
+        return run_descriptive_analysis(absolute_file_path, polars_code, response_format, content_hash)
+    return UNKNOWN_INTENT_REPLY, None
@@ -0,0 +1,122 @@
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from app.config import settings
+
+# Engine calamine (paket fastexcel, Rust) jauh lebih cepat dari openpyxl;
+# openpyxl hanya dipakai jika fastexcel tidak terpasang.
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("fastexcel") else "openpyxl"
+
+# Akhiran nama file -> format; yang lebih panjang dicek lebih dulu
+_FORMAT_SUFFIXES = (
+    (".csv.gz", "csv.gz"),
+    (".csv.gzip", "csv.gz"),
+    (".csv.zst", "csv.zst"),
+    (".csv.zstd", "csv.zst"),
+    (".ndjson", "ndjson"),
+    (".jsonl", "ndjson"),
+    (".csv", "csv"),
+    (".xlsx", "xlsx"),
+    (".json", "json"),
+)
+SUPPORTED_FORMATS = tuple(dict.fromkeys(fmt for _, fmt in _FORMAT_SUFFIXES))
+
+# Codec pyarrow untuk CSV terkompresi
+_CSV_CODECS = {"csv.gz": "gzip", "csv.zst": "zstd"}
+
+
+def detect_format(filename: str) -> str | None:
+    """
+    Menentukan format file dari namanya, mis. 'data.csv.gz' -> 'csv.gz'.
+    Mengembalikan None untuk format yang tidak didukung.
+    """
+    name = filename.lower()
+    for suffix, file_format in _FORMAT_SUFFIXES:
+        if name.endswith(suffix):
+            return file_format
+    return None
+
+
+def excel_sheet_names(file_path: str) -> list[str]:
+    if EXCEL_ENGINE == "calamine":
+        import fastexcel
+        return fastexcel.read_excel(file_path).sheet_names
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def read_excel_sheets(file_path: str, max_workers: int = None) -> dict[str, pl.DataFrame]:
+    """
+    Membaca semua sheet workbook menjadi tabel terpisah {nama_sheet: DataFrame},
+    sesuai urutan sheet. Dengan calamine, setiap sheet di-parse paralel di thread
+    terpisah; openpyxl membaca semua sheet dalam satu kali buka workbook.
+    Sheet kosong dilewati.
+    """
+    if EXCEL_ENGINE != "calamine":
+        sheets = pl.read_excel(file_path, sheet_id=0, engine="openpyxl", raise_if_empty=False)
+        return {name: df for name, df in sheets.items() if df.width > 0}
+
+    sheet_names = excel_sheet_names(file_path)
+    max_workers = max_workers or settings.excel_reader_workers
+
+    def read_sheet(sheet_name: str) -> pl.DataFrame:
+        return pl.read_excel(file_path, sheet_name=sheet_name, engine="calamine", raise_if_empty=False)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sheet_names)) or 1) as pool:
+        frames = list(pool.map(read_sheet, sheet_names))
+    return {name: df for name, df in zip(sheet_names, frames) if df.width > 0}
+
+
+def stream_compressed_csv_to_parquet(file_path: str, dest_path: str, file_format: str) -> int:
+    """
+    Mengonversi CSV terkompresi (gzip/zstd) ke Parquet per blok: data
+    didekompresi di memori secara bertahap, tanpa file CSV sementara di disk.
+    Tipe kolom ditentukan dari blok pertama. Mengembalikan jumlah baris.
+    """
+    read_options = pa_csv.ReadOptions(block_size=settings.compressed_csv_block_bytes)
+    num_rows = 0
+    with pa.CompressedInputStream(pa.OSFile(file_path, "rb"), _CSV_CODECS[file_format]) as source:
+        reader = pa_csv.open_csv(source, read_options=read_options)
+        with pq.ParquetWriter(dest_path, reader.schema, compression="zstd", write_statistics=True) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                num_rows += batch.num_rows
+    return num_rows
+
+
+def stream_ndjson_to_parquet(file_path: str, dest_path: str) -> int:
+    """
+    Mengonversi NDJSON (satu objek JSON per baris) ke Parquet dengan streaming
+    engine Polars, tanpa memuat seluruh file ke memori. Mengembalikan jumlah baris.
+    """
+    pl.scan_ndjson(file_path).sink_parquet(dest_path, compression="zstd", statistics=True, engine="streaming")
+    return pl.scan_parquet(dest_path).select(pl.len()).collect().item()
+
+
+def read_table(file_path: str, file_format: str) -> pl.DataFrame:
+    """
+    Membaca file menjadi satu DataFrame di memori (untuk Excel: sheet pertama).
+    Dipakai untuk file kecil, mis. data tambahan pada endpoint append.
+    """
+    if file_format == 'csv':
+        return pl.read_csv(file_path)
+    elif file_format in _CSV_CODECS:
+        with pa.CompressedInputStream(pa.OSFile(file_path, "rb"), _CSV_CODECS[file_format]) as source:
+            return pl.from_arrow(pa_csv.read_csv(source))
+    elif file_format == 'xlsx':
+        return pl.read_excel(file_path, engine=EXCEL_ENGINE)
+    elif file_format == 'json':
+        # read_json dari Polars bisa secara otomatis meratakan struktur
+        return pl.read_json(file_path)
+    elif file_format == 'ndjson':
+        return pl.read_ndjson(file_path)
+    raise ValueError("Format file tidak didukung.")
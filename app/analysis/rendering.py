@@ -0,0 +1,54 @@
+import base64
+import io
+import json
+
+import polars as pl
+
+
+def _format_cell(value) -> str:
+    if value is None:
+        return ""
+    # Karakter '|' dan baris baru akan merusak tabel markdown
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_markdown(df: pl.DataFrame, max_rows: int) -> str:
+    """
+    Membuat tabel markdown langsung dari DataFrame Polars, dibatasi `max_rows` baris.
+    Hanya baris yang ditampilkan yang dikonversi ke string.
+    """
+    total_rows = df.height
+    shown = df.head(max_rows)
+
+    lines = [
+        "| " + " | ".join(_format_cell(col) for col in shown.columns) + " |",
+        "|" + "|".join(" --- " for _ in shown.columns) + "|",
+    ]
+    for row in shown.iter_rows():
+        lines.append("| " + " | ".join(_format_cell(value) for value in row) + " |")
+
+    if total_rows > max_rows:
+        lines.append("")
+        lines.append(f"_Menampilkan {max_rows} dari {total_rows} baris._")
+    return "\n".join(lines)
+
+
+def to_structured_result(df: pl.DataFrame, response_format: str, max_rows: int) -> dict:
+    """
+    Mengubah DataFrame menjadi hasil terstruktur untuk `schemas.QueryResult`:
+    kolom bertipe ditambah baris JSON ("json") atau buffer Arrow IPC base64 ("arrow").
+    """
+    shown = df.head(max_rows)
+    result = {
+        "columns": [{"name": name, "dtype": str(dtype)} for name, dtype in shown.schema.items()],
+        "total_rows": df.height,
+        "truncated": df.height > max_rows,
+    }
+    if response_format == "arrow":
+        buffer = io.BytesIO()
+        shown.write_ipc(buffer)
+        result["arrow_ipc"] = base64.b64encode(buffer.getvalue()).decode()
+    else:
+        # Lewat write_json agar tanggal/waktu langsung menjadi string yang aman untuk JSON
+        result["rows"] = json.loads(shown.write_json())
+    return result
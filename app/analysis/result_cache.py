@@ -0,0 +1,113 @@
+import ast
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import polars as pl
+
+from app.config import settings
+
+def dataset_version(filepath: str, content_hash: str | None = None) -> str:
+    """
+    Penanda versi isi dataset untuk kunci cache, tanpa membaca file.
+
+    Notebook yang memakai blob memiliki `content_hash` (SHA-256 unggahan, dihitung
+    sekali saat upload); salinan Parquet blob tidak pernah diubah karena append
+    selalu menyalinnya lebih dulu. Nama file ikut dipakai karena satu unggahan bisa
+    memiliki beberapa tabel. Notebook lain memakai path, mtime, dan ukuran file,
+    yang berubah setiap kali file ditulis ulang.
+    """
+    if content_hash:
+        return f"sha256:{content_hash}:{os.path.basename(filepath)}"
+    stat = os.stat(filepath)
+    return f"file:{os.path.abspath(filepath)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def normalize_polars_code(polars_code: str) -> str:
+    """
+    Menormalkan kode Polars lewat AST sehingga perbedaan spasi atau jenis kutip
+    tidak menghasilkan kunci cache yang berbeda.
+    """
+    try:
+        return ast.dump(ast.parse(polars_code.strip(), mode="eval"))
+    except SyntaxError:
+        return re.sub(r"\s+", " ", polars_code.strip())
+
+
+class QueryResultCache:
+    """
+    Cache hasil eksekusi kode Polars, dikunci dengan hash isi dataset dan kode
+    yang sudah dinormalisasi. DataFrame disimpan sebagai buffer Arrow IPC dan
+    total ukurannya dibatasi oleh `max_bytes` (LRU).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple[str, object, int]]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(version: str, polars_code: str) -> tuple:
+        return (version, normalize_polars_code(polars_code))
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            kind, payload, _ = entry
+
+        if kind == "arrow":
+            return pl.read_ipc(io.BytesIO(payload))
+        return payload
+
+    def put(self, key: tuple, result) -> None:
+        if isinstance(result, pl.DataFrame):
+            buffer = io.BytesIO()
+            result.write_ipc(buffer)
+            kind, payload = "arrow", buffer.getvalue()
+            size = len(payload)
+        else:
+            kind, payload = "text", str(result)
+            size = len(payload.encode())
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)[2]
+            self._entries[key] = (kind, payload, size)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+result_cache = QueryResultCache(max_bytes=settings.result_cache_max_bytes)
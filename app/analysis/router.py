@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import polars as pl
 
 from app import crud, schemas
 from app.database import get_db
 from app.auth.oauth2 import get_current_user
-from app.ai import llm_service # <-- Impor layanan baru
-from app.analysis import causal_service # <-- Impor service baru
-import os
+from app.ai.llm_cache import llm_cache
+from app.analysis import query_service
+from app.analysis.dataframe_cache import dataframe_cache
+from app.analysis.jobs import job_worker_pool
+from app.analysis.query_matcher import query_matcher
+from app.analysis.result_cache import result_cache
 import json
 router = APIRouter(
     prefix="/api/v1/analysis",
@@ -15,7 +18,7 @@ router = APIRouter(
 )
 
 @router.post("/query", response_model=schemas.QueryResponse)
-def handle_query(
+async def handle_query(
     query_request: schemas.QueryRequest, 
     db: Session = Depends(get_db), 
     current_user: schemas.UserOut = Depends(get_current_user)
@@ -23,6 +26,9 @@ def handle_query(
     """
     Menerima query, membaca file data, meneruskannya ke LLM untuk menghasilkan
     kode Polars, mengeksekusi kode tersebut, dan mengembalikan hasilnya.
+
+    Panggilan LLM berjalan secara async; hanya pekerjaan Polars/DoWhy dan akses
+    database yang dipindahkan ke threadpool agar event loop tidak terblokir.
     """
     notebook_id = query_request.notebookId
     
@@ -30,70 +36,127 @@ def handle_query(
         raise HTTPException(status_code=400, detail="Notebook ID diperlukan untuk analisis.")
 
     # 1. Mengambil detail notebook dari database untuk mendapatkan path file
-    notebook = crud.get_notebook(db, notebook_id=notebook_id, owner_id=current_user.id)
+    notebook = await run_in_threadpool(crud.get_notebook, db, notebook_id=notebook_id, owner_id=current_user.id)
     if not notebook:
         raise HTTPException(status_code=404, detail="Notebook tidak ditemukan.")
     print(f"Notebook found: {notebook.filename} at {notebook.filepath}")
-    absolute_file_path = os.path.abspath(notebook.filepath)
-    # 2. Membaca file data (CSV atau Excel) menggunakan Polars
-    try:
-        if notebook.filepath.endswith('.csv'):
-            df = pl.read_csv(absolute_file_path)
-        elif notebook.filepath.endswith(('.xlsx', '.xls')):
-            df = pl.read_excel(absolute_file_path)
-        else:
-            raise HTTPException(status_code=400, detail="Format file tidak didukung untuk analisis.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gagal membaca file data: {str(e)}")
+    absolute_file_path, is_columnar = query_service.notebook_data_path(notebook, query_request.table)
+
+    # 2. Dapatkan skema DataFrame untuk dikirim ke LLM.
+    df_schema = await run_in_threadpool(query_service.read_notebook_schema, absolute_file_path, is_columnar)
 
     # 3. Analisis niat pengguna dan jalankan logika yang sesuai
-    # Dapatkan skema DataFrame untuk dikirim ke LLM
-    df_schema = {col: str(dtype) for col, dtype in df.schema.items()}
-    user_query = query_request.query
-    
-    # Panggil LLM untuk memahami niat pengguna
-    intent_data = llm_service.analyze_user_intent(df_schema=df_schema, user_query=user_query)
-    intent = intent_data.get("intent")
-    variables = intent_data.get("variables")
-
-    ai_reply_str = ""
-
-    # Jalankan logika berdasarkan niat
-    if intent == "causal_analysis" and variables:
-        # Panggil service analisis kausal
-        ai_reply_str = causal_service.estimate_causal_effect(
-            df=df,
-            treatment=variables.get("treatment"),
-            outcome=variables.get("outcome"),
-            common_causes=variables.get("common_causes", [])
-        )
-    elif intent == "descriptive_analysis":
-        # Logika yang sudah ada untuk analisis deskriptif
-        polars_code = llm_service.generate_polars_code(df_schema=df_schema, user_query=user_query)
-        if "ERROR:" in polars_code:
-            ai_reply_str = polars_code
-        else:
-            try:
-                # Peringatan: eval() bisa berbahaya. Di lingkungan produksi,
-                # ini harus dijalankan dalam sandbox yang sangat terbatas.
-                # Variabel 'df' tersedia dalam scope eval().
-                result = eval(polars_code)
-                
-                if isinstance(result, pl.DataFrame):
-                    ai_reply_str = result.to_pandas().to_markdown(index=False)
-                else:
-                    ai_reply_str = str(result)
-            except Exception as e:
-                ai_reply_str = f"Error executing generated code: {e}"
-    else:
-        ai_reply_str = "Maaf, saya tidak yakin dengan niat analisis Anda. Coba ajukan pertanyaan deskriptif ('tunjukkan...') atau kausal ('apa dampak dari...')."
+    intent, variables, polars_code = await query_service.plan_analysis(df_schema, query_request.query)
+
+    # Pekerjaan Polars/DoWhy dijalankan di threadpool
+    ai_reply_str, structured_result = await run_in_threadpool(
+        query_service.run_planned_analysis,
+        absolute_file_path, is_columnar, df_schema, intent, variables, polars_code,
+        query_request.response_format, query_request.robustness, notebook.content_hash
+    )
 
     # Simpan percakapan ke database
-    crud.create_conversation(
+    await run_in_threadpool(
+        crud.create_conversation,
         db=db,
         notebook_id=notebook_id,
         user_query=query_request.query,
         ai_response=ai_reply_str
     )
 
-    return {"reply": ai_reply_str}
\ No newline at end of file
+    return {"reply": ai_reply_str, "result": structured_result}
+
+
+def _get_authorized_job(db: Session, job_id: int, current_user: schemas.UserOut):
+    job = crud.get_analysis_job(db, job_id=job_id)
+    if not job or not crud.get_notebook(db, notebook_id=job.notebook_id, owner_id=current_user.id):
+        raise HTTPException(status_code=404, detail="Job analisis tidak ditemukan.")
+    return job
+
+
+@router.post("/jobs", response_model=schemas.AnalysisJobOut, status_code=202)
+async def submit_analysis_job(
+    query_request: schemas.QueryRequest,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Sama seperti /query, tetapi analisis dijalankan di latar belakang.
+    Perencanaan (LLM) dilakukan sekarang; eksekusi dilakukan oleh worker job
+    dan statusnya dapat dipantau lewat GET /jobs/{job_id}.
+    """
+    notebook_id = query_request.notebookId
+    if not notebook_id:
+        raise HTTPException(status_code=400, detail="Notebook ID diperlukan untuk analisis.")
+
+    notebook = await run_in_threadpool(crud.get_notebook, db, notebook_id=notebook_id, owner_id=current_user.id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan.")
+    absolute_file_path, is_columnar = query_service.notebook_data_path(notebook, query_request.table)
+
+    df_schema = await run_in_threadpool(query_service.read_notebook_schema, absolute_file_path, is_columnar)
+    intent, variables, polars_code = await query_service.plan_analysis(df_schema, query_request.query)
+
+    payload = {
+        "query": query_request.query,
+        "intent": intent,
+        "variables": variables,
+        "polars_code": polars_code,
+        "df_schema": df_schema,
+        "response_format": query_request.response_format,
+        "robustness": query_request.robustness,
+        "table": query_request.table,
+    }
+    kind = "causal_analysis" if intent == "causal_analysis" else "descriptive_analysis"
+    job = await run_in_threadpool(crud.create_analysis_job, db, notebook_id=notebook_id, kind=kind, payload=payload)
+    job_worker_pool.notify()
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.AnalysisJobOut)
+def get_analysis_job_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Mengembalikan status dan progres job analisis.
+    """
+    return _get_authorized_job(db, job_id, current_user)
+
+
+@router.get("/jobs/{job_id}/result", response_model=schemas.AnalysisJobResult)
+def get_analysis_job_result(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Mengembalikan hasil job analisis yang sudah selesai.
+    """
+    job = _get_authorized_job(db, job_id, current_user)
+    if job.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="Job analisis belum selesai.")
+
+    result = job.result or {}
+    return {
+        "id": job.id,
+        "status": job.status,
+        "reply": result.get("reply"),
+        "result": result.get("result"),
+        "error": job.error,
+    }
+
+
+@router.get("/cache/stats")
+def get_cache_stats(current_user: schemas.UserOut = Depends(get_current_user)):
+    """
+    Mengembalikan statistik cache DataFrame, cache respons LLM, cache hasil query
+    (hit, miss, eviction, pemakaian memori), dan jumlah query yang dilayani tanpa LLM.
+    """
+    return {
+        "dataframe_cache": dataframe_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "query_matcher": query_matcher.stats(),
+    }
@@ -0,0 +1,269 @@
+import base64
+import math
+import platform
+import zlib
+
+import numpy as np
+import polars as pl
+
+# Skema hash untuk HyperLogLog. Register yang tersimpan di database hanya boleh digabung
+# dengan register dari skema yang sama; ubah jika `hash_series` berubah. Hash teks memakai
+# `pl.Series.hash()` yang hanya dijamin stabil dalam satu versi Polars (dan arsitektur CPU),
+# sehingga keduanya ikut dicatat: setelah upgrade, statistik tersimpan dihitung ulang.
+HASH_SCHEME = f"splitmix64+polars-{pl.__version__}-{platform.machine()}"
+
+# Hash tetap untuk nilai kosong (dihitung sebagai satu nilai unik, sama seperti n_unique())
+_NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _encode_array(values: np.ndarray) -> str:
+    return base64.b64encode(zlib.compress(values.tobytes())).decode()
+
+
+def _decode_array(encoded: str, dtype) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(base64.b64decode(encoded)), dtype=dtype).copy()
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    # Finalizer SplitMix64: mengacak bit 64-bit secara deterministik (tidak bergantung versi library)
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def hash_series(series: pl.Series) -> np.ndarray:
+    """
+    Hash 64-bit untuk nilai `series` (nilai kosong ikut dihitung sebagai satu
+    nilai). Nilai duplikat tidak dibuang lebih dulu: HyperLogLog tidak terpengaruh
+    duplikat, dan `unique()` jauh lebih mahal daripada hash-nya.
+
+    Nilai numerik dan temporal di-hash dari representasi 64-bit-nya dengan SplitMix64
+    (sama di semua versi library); tipe lain di-hash dari teksnya dengan
+    `pl.Series.hash()`, yang hanya stabil dalam satu versi Polars (lihat `HASH_SCHEME`).
+    """
+    values = series.drop_nulls()
+    dtype = series.dtype
+    if dtype.is_float():
+        # -0.0 dan 0.0 dianggap nilai yang sama
+        bits = (values.cast(pl.Float64).to_numpy() + 0.0).view(np.uint64)
+        hashes = _splitmix64(bits)
+    elif dtype.is_integer() or dtype.is_temporal() or dtype == pl.Boolean:
+        physical = values.to_physical()
+        if physical.dtype == pl.UInt64:
+            bits = physical.to_numpy()
+        else:
+            bits = physical.cast(pl.Int64).to_numpy().view(np.uint64)
+        hashes = _splitmix64(bits)
+    else:
+        try:
+            texts = values.cast(pl.String)
+        except pl.exceptions.PolarsError:
+            texts = values
+        hashes = texts.hash().to_numpy()
+    if series.null_count() > 0:
+        hashes = np.append(hashes, _NULL_HASH)
+    return hashes
+
+
+def _ertl_sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _ertl_tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """
+    Sketch HyperLogLog untuk memperkirakan jumlah nilai unik dengan memori tetap
+    (2^precision register). Sketch dari batch yang berbeda dapat digabung dengan `merge`.
+    """
+
+    def __init__(self, precision: int = 14, hash_scheme: str = HASH_SCHEME):
+        self.precision = precision
+        self.hash_scheme = hash_scheme
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Menambahkan nilai yang sudah di-hash ke 64-bit dengan `hash_series`.
+        """
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Bit sentinel menjamin nilai tidak nol sehingga rank maksimum 64 - p + 1
+        remaining = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (64 - np.floor(np.log2(remaining.astype(np.float64)))).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Presisi HyperLogLog berbeda.")
+        if other.hash_scheme != self.hash_scheme:
+            raise ValueError("Skema hash HyperLogLog berbeda.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimator "improved raw" dari Ertl (2017), dihitung dari histogram register.
+        Tidak bias di seluruh rentang kardinalitas, termasuk peralihan antara linear
+        counting dan estimator HLL klasik (sekitar 2.5m-5m) yang biasnya bisa beberapa persen.
+        """
+        m = len(self.registers)
+        q = 64 - self.precision
+        counts = np.bincount(self.registers, minlength=q + 2)
+        z = m * _ertl_tau(1 - counts[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + counts[k])
+        z += m * _ertl_sigma(counts[0] / m)
+        return int(round(m * m / (2 * math.log(2) * z)))
+
+    def to_dict(self) -> dict:
+        """
+        Bentuk JSON sketch (register dikompresi) agar bisa disimpan di database.
+        """
+        return {
+            "precision": self.precision,
+            "hash_scheme": self.hash_scheme,
+            "registers": _encode_array(self.registers),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        # Sketch lama tanpa `hash_scheme` memakai pl.Series.hash() dan tidak bisa digabung
+        sketch = cls(precision=data["precision"], hash_scheme=data.get("hash_scheme"))
+        sketch.registers = _decode_array(data["registers"], np.uint8)
+        return sketch
+
+
+class KLLSketch:
+    """
+    Sketch kuantil KLL: menyimpan sampel berbobot di beberapa level "compactor".
+    Saat sebuah level penuh, isinya diurutkan dan separuhnya (selang-seling)
+    dinaikkan ke level berikutnya dengan bobot dua kali lipat.
+
+    Galat peringkat sekitar O(1/k); sketch dari batch yang berbeda dapat digabung.
+    """
+
+    def __init__(self, k: int = 400, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Menambahkan satu batch nilai numerik (nilai kosong/NaN diabaikan).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        batch_min, batch_max = float(values.min()), float(values.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        if other.count == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Jumlah ganjil: satu item tetap di level ini
+                leftover = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                offset = int(self._rng.integers(2))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = leftover
+            level += 1
+
+    def rank(self, value: float, inclusive: bool = False) -> float:
+        """
+        Perkiraan proporsi nilai yang lebih kecil dari `value`, atau yang lebih
+        kecil atau sama dengan `value` jika `inclusive`.
+        """
+        if self.count == 0:
+            return 0.0
+        total = 0.0
+        below = 0.0
+        for level, items in enumerate(self.levels):
+            weight = 2.0 ** level
+            total += weight * len(items)
+            below += weight * np.count_nonzero(items <= value if inclusive else items < value)
+        return below / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "levels": [_encode_array(items.astype(np.float64)) for items in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.levels = [_decode_array(items, np.float64) for items in data["levels"]] or [np.empty(0)]
+        return sketch
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2.0 ** level) for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        return float(items[order][min(position, len(items) - 1)])
@@ -1,45 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import polars as pl
-from typing import Dict, Any
 
-router = APIRouter()
+from app.analysis.data_quality import generate_health_report
+from app.analysis.readers import EXCEL_ENGINE
+from app.config import settings
 
-MAX_FILE_SIZE_MB = 100
-MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+router = APIRouter()
 
-def generate_health_report(df: pl.DataFrame) -> Dict[str, Any]:
-    """
-    Menganalisis DataFrame Polars dan menghasilkan laporan kesehatan data.
-    Untuk MVP, ini akan memeriksa nilai yang hilang dan tipe data campuran.
-    """
-    report = {"columns": []}
-    for col_name in df.columns:
-        col_series = df[col_name]
-        
-        # 1. Cek Nilai yang Hilang (Missing Values)
-        missing_count = col_series.is_null().sum()
-        missing_percentage = (missing_count / len(df)) * 100
-        
-        # 2. Cek Tipe Data Campuran (Mixed Data Types)
-        # Di Polars, tipe 'Object' sering menunjukkan data campuran.
-        is_mixed_type = col_series.dtype == pl.Object
-        
-        column_report = {
-            "name": col_name,
-            "dtype": str(col_series.dtype),
-            "missing_values": {
-                "count": missing_count,
-                "percentage": round(missing_percentage, 2)
-            },
-            "warnings": []
-        }
-        
-        if is_mixed_type:
-            column_report["warnings"].append("Tipe data campuran terdeteksi.")
-            
-        report["columns"].append(column_report)
-        
-    return report
+MAX_FILE_SIZE_BYTES = settings.upload_max_bytes
+MAX_FILE_SIZE_MB = MAX_FILE_SIZE_BYTES // (1024 * 1024)
 
 
 @router.post("/upload", tags=["Data Ingestion"])
@@ -48,8 +17,10 @@ async def upload_data_file(file: UploadFile = File(...)):
     Endpoint untuk mengunggah dan memproses file data (CSV atau XLSX).
     Ini akan melakukan parsing awal dan memicu analisis Data Health Report.
     """
-    # ... (Validasi ukuran dan tipe file tetap sama) ...
-    
+    # Validasi ukuran: file di atas batas ditolak sebelum di-parsing
+    if file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Ukuran file melebihi batas {MAX_FILE_SIZE_MB} MB.")
+
     file_extension = file.filename.split('.')[-1].lower()
 
     try:
@@ -57,7 +28,7 @@ async def upload_data_file(file: UploadFile = File(...)):
             df = pl.read_csv(file.file)
         elif file_extension == "xlsx":
             # Membaca sheet pertama secara default sesuai target MVP
-            df = pl.read_excel(file.file, engine='openpyxl')
+            df = pl.read_excel(file.file, engine=EXCEL_ENGINE)
 
         # Hasilkan laporan kesehatan dari DataFrame
         health_report = generate_health_report(df)
@@ -18,6 +18,98 @@ class Settings(BaseSettings):
     encryption_key: str
     
     openai_api_key: str
+
+    # Batas memori (byte) untuk cache DataFrame per proses di /analysis/query
+    dataframe_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+
+    # Eksekusi kode Polars hasil LLM terhadap LazyFrame (scan_parquet/scan_csv)
+    lazy_query_engine: bool = True
+    # Gunakan streaming engine Polars saat collect (untuk data lebih besar dari RAM)
+    lazy_streaming_engine: bool = False
+
+    # Batas memori (byte) untuk cache hasil query (Arrow IPC) per proses
+    result_cache_max_bytes: int = 512 * 1024 * 1024
+
+    # Unggahan file: batas ukuran dan ukuran potongan saat ditulis ke disk
+    upload_max_bytes: int = 100 * 1024 * 1024
+    upload_chunk_bytes: int = 1024 * 1024
+
+    # Pembaca file: thread untuk parsing sheet Excel paralel dan ukuran blok
+    # dekompresi CSV gzip/zstd (tipe kolom ditentukan dari blok pertama)
+    excel_reader_workers: int = 4
+    compressed_csv_block_bytes: int = 16 * 1024 * 1024
+
+    # Unggahan resumable (sesi + potongan bernomor) untuk dataset berukuran GB
+    upload_session_max_bytes: int = 20 * 1024 * 1024 * 1024
+    upload_session_max_chunk_bytes: int = 64 * 1024 * 1024
+    upload_session_ttl_hours: int = 24
+    # Interval penghapusan sesi kedaluwarsa beserta potongannya di disk
+    upload_session_reap_interval_seconds: float = 3600.0
+
+    # File unggahan di atas ukuran ini dikonversi dan diprofilkan secara streaming
+    # (laporan kesehatan memakai sketch perkiraan, bukan statistik eksak)
+    health_report_streaming_threshold_bytes: int = 512 * 1024 * 1024
+    health_report_batch_rows: int = 100_000
+    # Mode progresif: upload langsung mengembalikan laporan sementara dari reservoir
+    # sample (dibatasi waktu), laporan eksak dihitung job di latar belakang
+    health_report_progressive: bool = True
+    health_report_sample_rows: int = 100_000
+    health_report_time_budget_seconds: float = 2.0
+
+    # Jumlah baris maksimum hasil query yang dikembalikan ke frontend
+    query_result_max_rows: int = 1000
+
+    # Jumlah baris maksimum untuk analisis kausal; data lebih besar di-sampling (0 = tanpa batas)
+    causal_max_rows: int = 1_000_000
+
+    # Mode robustness analisis kausal: refuter DoWhy dan bootstrap dijalankan paralel di pool proses
+    causal_robustness_workers: int = 4
+    causal_robustness_seed: int = 42
+    # Refuter mengulang estimasi berkali-kali; data di atas batas ini di-sampling
+    causal_robustness_max_rows: int = 100_000
+    causal_refuter_simulations: int = 50
+    causal_bootstrap_samples: int = 200
+
+    # Pool koneksi ke database eksternal (DataSourceConnection), satu pool per sumber data
+    datasource_pool_max_connections: int = 5
+    datasource_pool_idle_seconds: float = 300.0
+    datasource_pool_max_lifetime_seconds: float = 1800.0
+    datasource_pool_health_check_seconds: float = 30.0
+    datasource_pool_acquire_timeout_seconds: float = 10.0
+    datasource_connect_timeout_seconds: int = 10
+    # Interval pembersihan pool/koneksi yang menganggur
+    datasource_pool_sweep_interval_seconds: float = 60.0
+
+    # Worker latar belakang untuk job analisis yang berat
+    analysis_job_workers: int = 2
+    analysis_job_poll_seconds: float = 2.0
+    # Job 'running' tanpa heartbeat selama lease dianggap ditinggalkan (mis. proses worker
+    # mati) dan dikembalikan ke antrean, paling banyak `analysis_job_max_attempts` kali
+    analysis_job_lease_seconds: float = 300.0
+    analysis_job_heartbeat_seconds: float = 30.0
+    analysis_job_max_attempts: int = 3
+
+    # Worker proses terpisah untuk mengeksekusi kode Polars hasil LLM
+    sandbox_enabled: bool = True
+    sandbox_workers: int = 2
+    sandbox_timeout_seconds: float = 30.0
+    sandbox_memory_limit_bytes: int = 4 * 1024 * 1024 * 1024
+
+    # Cache respons LLM (klasifikasi niat dan pembuatan kode Polars)
+    llm_cache_max_entries: int = 10000
+    llm_cache_ttl_seconds: int = 24 * 60 * 60
+    # Simpan juga di tabel Postgres agar bisa dipakai bersama antar worker
+    llm_cache_persistent: bool = False
+
+    # Satu panggilan LLM untuk niat + kode Polars; jika False memakai dua panggilan terpisah
+    llm_single_call_planner: bool = True
+
+    # Klien OpenAI async: timeout, retry, dan batas koneksi/konkurensi per proses
+    llm_timeout_seconds: float = 60.0
+    llm_max_retries: int = 3
+    llm_retry_backoff_seconds: float = 0.5
+    llm_max_connections: int = 32
+    llm_max_concurrency: int = 16
     
     class Config:
         env_file = ".env" # Specifies the file to load variables from
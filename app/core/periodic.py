@@ -0,0 +1,38 @@
+import threading
+
+
+class PeriodicTask:
+    """
+    Menjalankan `fn()` di thread latar belakang: sekali saat `start()`, lalu
+    setiap `interval` detik sampai `shutdown()`. Kesalahan dicatat dan tidak
+    menghentikan thread.
+    """
+
+    def __init__(self, name: str, interval: float, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.fn()
+            except Exception as e:
+                print(f"Periodic task {self.name} error: {e}")
+            if self._stop.wait(self.interval):
+                break
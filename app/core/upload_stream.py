@@ -0,0 +1,247 @@
+import hashlib
+import os
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Ruang untuk header bagian dan field non-file di body multipart, di luar batas ukuran file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadStats:
+    """
+    Ringkasan file yang disimpan oleh `save_stream` atau `assemble_chunks`.
+    """
+
+    def __init__(self, path: str, size_bytes: int, content_hash: str, rows: int | None):
+        self.path = path
+        self.size_bytes = size_bytes
+        self.content_hash = content_hash
+        # Jumlah baris data (tanpa header), hanya dihitung untuk CSV
+        self.rows = rows
+
+    def to_dict(self) -> dict:
+        return {"size_bytes": self.size_bytes, "content_hash": self.content_hash, "rows": self.rows}
+
+
+class _StreamCounter:
+    """
+    Menghitung hash SHA-256, jumlah byte, dan jumlah baris dari potongan-potongan
+    file secara berurutan, tanpa menyimpan isinya.
+    """
+
+    def __init__(self, count_rows: bool = False):
+        self.digest = hashlib.sha256()
+        self.size_bytes = 0
+        self.count_rows = count_rows
+        self.newline_count = 0
+        self.last_byte = b""
+
+    def update(self, chunk: bytes) -> None:
+        self.size_bytes += len(chunk)
+        self.digest.update(chunk)
+        if self.count_rows and chunk:
+            self.newline_count += chunk.count(b"\n")
+            self.last_byte = chunk[-1:]
+
+    def stats(self, path: str) -> UploadStats:
+        rows = None
+        if self.count_rows:
+            # Baris terakhir tanpa newline tetap dihitung; baris pertama adalah header
+            line_count = self.newline_count + (1 if self.size_bytes and self.last_byte != b"\n" else 0)
+            rows = max(line_count - 1, 0)
+        return UploadStats(path, self.size_bytes, self.digest.hexdigest(), rows)
+
+
+def _size_limit_error(max_bytes: int) -> HTTPException:
+    limit = f"{max_bytes // (1024 * 1024)} MB" if max_bytes >= 1024 * 1024 else f"{max_bytes} byte"
+    return HTTPException(status_code=413, detail=f"Ukuran file melebihi batas {limit}.")
+
+
+def reject_oversized_request(content_length: str | None, max_bytes: int) -> None:
+    """
+    Menolak request lebih awal berdasarkan header Content-Length, sebelum isinya dibaca.
+    """
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _size_limit_error(max_bytes)
+
+
+async def save_stream(
+    chunks: AsyncIterator[bytes],
+    dest_path: str,
+    max_bytes: int,
+    count_rows: bool = False
+) -> UploadStats:
+    """
+    Menulis potongan-potongan dari `chunks` ke `dest_path` sambil menghitung hash
+    SHA-256, jumlah byte, dan (untuk CSV) jumlah baris. File tidak perlu dibaca
+    ulang setelah disimpan.
+
+    Jika ukuran melebihi `max_bytes`, penulisan dihentikan, file sebagian dihapus,
+    dan HTTP 413 dikembalikan.
+    """
+    counter = _StreamCounter(count_rows)
+
+    f = await run_in_threadpool(open, dest_path, "wb")
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if counter.size_bytes + len(chunk) > max_bytes:
+                raise _size_limit_error(max_bytes)
+            counter.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    await run_in_threadpool(f.close)
+    return counter.stats(dest_path)
+
+
+class MultipartFileStream:
+    """
+    Membaca satu field file dari body `multipart/form-data` langsung dari
+    `request.stream()`. Berbeda dengan `UploadFile` (body di-spool seluruhnya ke
+    file sementara oleh parser form sebelum handler berjalan), isi file diteruskan
+    per potongan ke `save_stream` dan body yang melebihi `max_bytes` ditolak
+    saat itu juga, termasuk request chunked tanpa Content-Length.
+    """
+
+    def __init__(self, request: Request, field_name: str, max_bytes: int):
+        content_type, params = parse_options_header(request.headers.get("content-type"))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Request harus berupa multipart/form-data.")
+        self.field_name = field_name.encode()
+        self.max_bytes = max_bytes
+        self.filename = None
+        self._body = request.stream()
+        self._body_bytes = 0
+        self._body_finished = False
+        self._pending: list[bytes] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_field = False
+        self._field_finished = False
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        if self.filename is None and options.get(b"name") == self.field_name and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_field = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._pending.append(bytes(data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_finished = True
+
+    async def _feed(self) -> bool:
+        """
+        Meneruskan potongan body berikutnya ke parser. False jika body sudah habis.
+        """
+        if self._body_finished:
+            return False
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            chunk = b""
+        if not chunk:
+            self._body_finished = True
+            return False
+        self._body_bytes += len(chunk)
+        if self._body_bytes > self.max_bytes + MULTIPART_OVERHEAD_BYTES:
+            raise _size_limit_error(self.max_bytes)
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(status_code=400, detail="Body multipart tidak valid.")
+        return True
+
+    async def open(self) -> str:
+        """
+        Membaca body sampai header field file ditemukan dan mengembalikan nama filenya.
+        """
+        while self.filename is None:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail=f"File tidak ditemukan pada field '{self.field_name.decode()}'.")
+        return self.filename
+
+    async def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Isi file per potongan berukuran sekitar `chunk_size`. Sisa body setelah
+        field file tidak dibaca.
+        """
+        buffer = bytearray()
+        while True:
+            for data in self._pending:
+                buffer += data
+            self._pending.clear()
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+            if self._field_finished:
+                break
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail="Body multipart terpotong.")
+        if buffer:
+            yield bytes(buffer)
+
+
+def assemble_chunks(
+    part_paths: list[str],
+    dest_path: str,
+    count_rows: bool = False,
+    buffer_size: int = 1024 * 1024
+) -> UploadStats:
+    """
+    Menggabungkan potongan unggahan (sesuai urutan `part_paths`) menjadi satu file,
+    sambil menghitung hash dan jumlah baris file utuh dalam satu kali baca.
+    """
+    counter = _StreamCounter(count_rows)
+    try:
+        with open(dest_path, "wb") as out:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    while True:
+                        buffer = part.read(buffer_size)
+                        if not buffer:
+                            break
+                        counter.update(buffer)
+                        out.write(buffer)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return counter.stats(dest_path)
@@ -1,5 +1,6 @@
 # In telnovia-analytics-backend/app/crud.py
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from . import models, schemas
 from .auth import utils
@@ -16,18 +17,186 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-def create_notebook(db: Session, filename: str, filepath: str, owner_id: int, health_report: dict):
+def create_notebook(
+    db: Session,
+    filename: str,
+    filepath: str,
+    owner_id: int,
+    health_report: dict,
+    columnar_path: str = None,
+    health_report_status: str = "final",
+    health_stats: dict = None,
+    content_hash: str = None,
+    blob: models.DatasetBlob = None,
+    ingestion_status: str = "ready",
+    tables: dict = None
+):
+    if blob is not None:
+        # Notebook menambah referensi ke blob dalam transaksi yang sama
+        blob.ref_count = models.DatasetBlob.ref_count + 1
     db_notebook = models.Notebook(
         filename=filename, 
         filepath=filepath, 
+        columnar_path=columnar_path,
+        tables=tables,
+        content_hash=content_hash,
         owner_id=owner_id,
-        health_report=health_report
+        health_report=health_report,
+        health_report_status=health_report_status,
+        health_stats=health_stats,
+        ingestion_status=ingestion_status
     )
     db.add(db_notebook)
     db.commit()
     db.refresh(db_notebook)
     return db_notebook
 
+def update_notebook_health_report(
+    db: Session,
+    notebook: models.Notebook,
+    health_report: dict,
+    status: str = "final",
+    health_stats: dict = None
+):
+    notebook.health_report = health_report
+    notebook.health_report_status = status
+    notebook.health_report_version = (notebook.health_report_version or 1) + 1
+    if health_stats is not None:
+        notebook.health_stats = health_stats
+    db.commit()
+    db.refresh(notebook)
+    return notebook
+
+def update_notebook_ingestion_status(db: Session, notebook: models.Notebook, status: str):
+    notebook.ingestion_status = status
+    db.commit()
+    db.refresh(notebook)
+    return notebook
+
+def attach_notebook_to_blob(db: Session, notebook: models.Notebook, blob: models.DatasetBlob):
+    """
+    Menyelesaikan ingestion: notebook memakai file dan health report blob,
+    ref_count blob dinaikkan, dan notebook ditandai 'ready'.
+    """
+    blob.ref_count = models.DatasetBlob.ref_count + 1
+    notebook.filepath = blob.filepath
+    notebook.columnar_path = blob.columnar_path
+    notebook.tables = blob.tables
+    notebook.content_hash = blob.content_hash
+    notebook.health_report = blob.health_report
+    notebook.health_report_status = blob.health_report_status
+    notebook.health_report_version = (notebook.health_report_version or 1) + 1
+    notebook.health_stats = blob.health_stats
+    notebook.ingestion_status = "ready"
+    db.commit()
+    db.refresh(notebook)
+    return notebook
+
+def lock_dataset_blob(db: Session, content_hash: str):
+    """
+    Mengunci baris blob (`SELECT ... FOR UPDATE`) sampai transaksi selesai, agar
+    blob tidak dihapus `release_dataset_blob` sebelum referensi baru di-commit.
+    Mengembalikan None jika blob tidak ada (atau baru saja dihapus).
+    """
+    return (
+        db.query(models.DatasetBlob)
+        .filter(models.DatasetBlob.content_hash == content_hash)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+
+def create_dataset_blob(
+    db: Session,
+    content_hash: str,
+    filepath: str,
+    columnar_path: str,
+    size_bytes: int,
+    health_report: dict,
+    health_report_status: str = "final",
+    health_stats: dict = None,
+    tables: dict = None
+):
+    """
+    Mendaftarkan blob baru (ref_count 0; dinaikkan oleh `create_notebook`).
+    Mengembalikan None jika unggahan lain dengan hash yang sama sudah lebih dulu terdaftar.
+    """
+    db_blob = models.DatasetBlob(
+        content_hash=content_hash,
+        filepath=filepath,
+        columnar_path=columnar_path,
+        tables=tables,
+        size_bytes=size_bytes,
+        health_report=health_report,
+        health_report_status=health_report_status,
+        health_stats=health_stats
+    )
+    db.add(db_blob)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.refresh(db_blob)
+    return db_blob
+
+def release_dataset_blob(db: Session, content_hash: str) -> list[str]:
+    """
+    Mengurangi ref_count blob (tanpa commit). Jika tidak ada lagi notebook yang
+    memakainya, baris blob dihapus dan path file-nya dikembalikan untuk dihapus
+    setelah commit.
+    """
+    blob = (
+        db.query(models.DatasetBlob)
+        .filter(models.DatasetBlob.content_hash == content_hash)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if blob is None:
+        return []
+    blob.ref_count -= 1
+    if blob.ref_count > 0:
+        return []
+    paths = [path for path in (blob.filepath, blob.columnar_path, *(blob.tables or {}).values()) if path]
+    db.delete(blob)
+    return paths
+
+def detach_notebook_from_blob(db: Session, notebook: models.Notebook, private_path: str) -> list[str]:
+    """
+    Memindahkan notebook ke salinan data pribadinya (sebelum datanya diubah),
+    lalu melepas referensi ke blob (tanpa commit). Mengembalikan path file yang
+    tidak lagi dipakai, untuk dihapus setelah commit.
+    """
+    orphaned_paths = release_dataset_blob(db, notebook.content_hash)
+    notebook.filepath = private_path
+    notebook.columnar_path = private_path
+    # Hanya tabel utama yang disalin; tabel lain tetap milik blob
+    notebook.tables = None
+    notebook.content_hash = None
+    db.flush()
+    return orphaned_paths
+
+def delete_notebook(db: Session, notebook: models.Notebook) -> list[str]:
+    """
+    Menghapus notebook beserta percakapan dan job-nya, lalu melepas referensi
+    ke blob. Mengembalikan path file yang tidak lagi dipakai.
+    """
+    if notebook.content_hash:
+        orphaned_paths = release_dataset_blob(db, notebook.content_hash)
+    else:
+        # File notebook tanpa blob hanya dipakai notebook ini
+        orphaned_paths = list(dict.fromkeys(
+            p for p in (notebook.filepath, notebook.columnar_path, *(notebook.tables or {}).values()) if p
+        ))
+    db.query(models.Conversation).filter(models.Conversation.notebook_id == notebook.id).delete()
+    db.query(models.AnalysisJob).filter(models.AnalysisJob.notebook_id == notebook.id).delete()
+    db.query(models.UploadSession).filter(models.UploadSession.notebook_id == notebook.id).update(
+        {"notebook_id": None}, synchronize_session=False
+    )
+    db.delete(notebook)
+    db.commit()
+    return orphaned_paths
 
 # Modifikasi `Notebook` untuk tidak memerlukan file
 def create_notebook_from_db(db: Session, conn: models.DataSourceConnection, owner_id: int):
@@ -46,6 +215,19 @@ def create_notebook_from_db(db: Session, conn: models.DataSourceConnection, owne
 
 def get_notebook(db: Session, notebook_id: int, owner_id: int):
     return db.query(models.Notebook).filter(models.Notebook.id == notebook_id, models.Notebook.owner_id == owner_id).first()
+
+def lock_notebook(db: Session, notebook_id: int):
+    """
+    Mengunci baris notebook (`SELECT ... FOR UPDATE`) sampai transaksi selesai dan
+    memuat ulang nilainya, agar perubahan data notebook tidak saling menimpa.
+    """
+    return (
+        db.query(models.Notebook)
+        .filter(models.Notebook.id == notebook_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
 def get_notebooks_by_owner(db: Session, owner_id: int):
     return db.query(models.Notebook).filter(models.Notebook.owner_id == owner_id).all()
 def create_conversation(db: Session, notebook_id: int, user_query: str, ai_response: str):
@@ -59,6 +241,114 @@ def create_conversation(db: Session, notebook_id: int, user_query: str, ai_respo
     db.refresh(db_conversation)
     return db_conversation
 
+def create_analysis_job(db: Session, notebook_id: int, kind: str, payload: dict, progress: dict = None):
+    db_job = models.AnalysisJob(
+        notebook_id=notebook_id,
+        kind=kind,
+        status="queued",
+        payload=payload,
+        progress=progress
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_analysis_job(db: Session, job_id: int):
+    return db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).first()
+
+def get_latest_analysis_job(db: Session, notebook_id: int, kind: str):
+    return (
+        db.query(models.AnalysisJob)
+        .filter(models.AnalysisJob.notebook_id == notebook_id, models.AnalysisJob.kind == kind)
+        .order_by(models.AnalysisJob.id.desc())
+        .first()
+    )
+
+def create_upload_session(
+    db: Session,
+    session_id: str,
+    owner_id: int,
+    session_data: schemas.UploadSessionCreate,
+    filename: str,
+    total_chunks: int,
+    expires_at
+):
+    db_session = models.UploadSession(
+        id=session_id,
+        owner_id=owner_id,
+        filename=filename,
+        total_size=session_data.total_size,
+        chunk_size=session_data.chunk_size,
+        total_chunks=total_chunks,
+        expected_sha256=session_data.sha256.lower() if session_data.sha256 else None,
+        expires_at=expires_at
+    )
+    db.add(db_session)
+    db.commit()
+    db.refresh(db_session)
+    return db_session
+
+def get_upload_session(db: Session, session_id: str, owner_id: int):
+    return db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id, models.UploadSession.owner_id == owner_id
+    ).first()
+
+def get_upload_session_by_id(db: Session, session_id: str):
+    return db.query(models.UploadSession).filter(models.UploadSession.id == session_id).first()
+
+def get_upload_chunks(db: Session, session_id: str):
+    return (
+        db.query(models.UploadChunk)
+        .filter(models.UploadChunk.session_id == session_id)
+        .order_by(models.UploadChunk.index)
+        .all()
+    )
+
+def save_upload_chunk(db: Session, session_id: str, index: int, size_bytes: int, sha256: str):
+    # Potongan yang dikirim ulang menggantikan catatan sebelumnya
+    db_chunk = db.merge(models.UploadChunk(session_id=session_id, index=index, size_bytes=size_bytes, sha256=sha256))
+    db.commit()
+    return db_chunk
+
+def transition_upload_session(db: Session, session_id: str, from_status: str, to_status: str, notebook_id: int = None) -> bool:
+    """
+    Mengubah status sesi secara atomik hanya jika statusnya masih `from_status`,
+    sehingga finalisasi yang dikirim bersamaan hanya dijalankan sekali.
+    """
+    values = {"status": to_status}
+    if notebook_id is not None:
+        values["notebook_id"] = notebook_id
+    updated = db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id, models.UploadSession.status == from_status
+    ).update(values, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+def set_upload_session_notebook(db: Session, session_id: str, notebook_id: int):
+    db.query(models.UploadSession).filter(models.UploadSession.id == session_id).update(
+        {"notebook_id": notebook_id}, synchronize_session=False
+    )
+    db.commit()
+
+def reopen_upload_session(db: Session, session_id: str) -> bool:
+    """
+    Membuka kembali sesi yang gagal digabung agar klien bisa mengirim ulang
+    potongan dan memfinalisasi lagi.
+    """
+    updated = db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id, models.UploadSession.status == "finalizing"
+    ).update({"status": "open", "notebook_id": None}, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+def get_expired_upload_sessions(db: Session, now):
+    return db.query(models.UploadSession).filter(models.UploadSession.expires_at < now).all()
+
+def delete_upload_session(db: Session, upload_session: models.UploadSession):
+    db.delete(upload_session)
+    db.commit()
+
 def get_notebook_by_token(db: Session, token: str):
     return db.query(models.Notebook).filter(models.Notebook.shareable_token == token).first()
 
@@ -0,0 +1,224 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from app import models
+from app.config import settings
+from app.core.security import decrypt_password
+
+
+class _SourcePool:
+    """
+    Pool koneksi untuk satu DataSourceConnection. Password hasil dekripsi hanya
+    disimpan di memori (di dalam pool psycopg2) selama pool hidup.
+    """
+
+    def __init__(self, source: models.DataSourceConnection, max_connections: int, connect_timeout: int):
+        self.fingerprint = _fingerprint(source)
+        self.pool = ThreadedConnectionPool(
+            0,
+            max_connections,
+            host=source.host,
+            port=source.port,
+            dbname=source.dbname,
+            user=source.username,
+            password=decrypt_password(source.encrypted_password),
+            connect_timeout=connect_timeout,
+        )
+        # psycopg2 hanya menyimpan `minconn` koneksi menganggur dan menutup sisanya saat
+        # dikembalikan. minconn dinaikkan setelah inisialisasi agar koneksi dibuka saat
+        # dibutuhkan saja, tetapi semuanya tetap disimpan untuk dipakai ulang.
+        self.pool.minconn = max_connections
+        # getconn() psycopg2 langsung gagal saat pool penuh; semaphore membuat pemanggil menunggu
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        # Pool yang diganti saat masih dipakai ditutup setelah peminjam terakhir selesai
+        self.retired = False
+        # id(koneksi) -> (waktu dibuat, waktu terakhir dikembalikan ke pool, waktu health check terakhir)
+        self.connection_times: dict[int, list[float]] = {}
+
+
+def _fingerprint(source: models.DataSourceConnection) -> tuple:
+    # Pool dibuat ulang jika detail koneksi atau password berubah
+    return (source.host, source.port, source.dbname, source.username, source.encrypted_password)
+
+
+class DataSourcePoolManager:
+    """
+    Pool koneksi psycopg2 per sumber data eksternal, dengan kunci
+    `DataSourceConnection.id`.
+
+    - Setiap pool dibatasi `max_connections`; pemanggil menunggu hingga
+      `acquire_timeout` detik jika semua koneksi sedang dipakai.
+    - Koneksi yang lebih tua dari `max_lifetime` atau menganggur lebih lama dari
+      `idle_timeout` ditutup saat diambil; koneksi yang sudah menganggur lebih
+      dari `health_check_interval` diperiksa dengan `SELECT 1` sebelum dipakai.
+    - Pool yang tidak dipakai selama `idle_timeout` ditutup seluruhnya.
+    - `close_idle()` menjalankan pembersihan yang sama tanpa menunggu request
+      berikutnya. Pool otomatis dibuat ulang jika detail koneksi berubah.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        idle_timeout: float,
+        max_lifetime: float,
+        health_check_interval: float,
+        acquire_timeout: float,
+        connect_timeout: int,
+    ):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self._pools: dict[int, _SourcePool] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, source: models.DataSourceConnection) -> _SourcePool:
+        with self._lock:
+            self._close_idle_pools()
+            source_pool = self._pools.get(source.id)
+            if source_pool is not None and source_pool.fingerprint != _fingerprint(source):
+                self._close_pool(source.id)
+                source_pool = None
+            if source_pool is None:
+                source_pool = _SourcePool(source, self.max_connections, self.connect_timeout)
+                self._pools[source.id] = source_pool
+            source_pool.in_use += 1
+            return source_pool
+
+    def _close_idle_pools(self) -> None:
+        now = time.monotonic()
+        for source_id, source_pool in list(self._pools.items()):
+            if source_pool.in_use == 0 and now - source_pool.last_used > self.idle_timeout:
+                self._close_pool(source_id)
+
+    def _close_pool(self, source_id: int) -> None:
+        source_pool = self._pools.pop(source_id, None)
+        if source_pool is None:
+            return
+        if source_pool.in_use == 0:
+            source_pool.pool.closeall()
+        else:
+            source_pool.retired = True
+
+    def _is_usable(self, source_pool: _SourcePool, conn) -> bool:
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        created_at, returned_at, checked_at = source_pool.connection_times[id(conn)]
+        if now - created_at > self.max_lifetime or now - returned_at > self.idle_timeout:
+            return False
+        if now - checked_at > self.health_check_interval:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+            source_pool.connection_times[id(conn)][2] = now
+        return True
+
+    def _checkout(self, source_pool: _SourcePool):
+        # Koneksi lama/rusak dibuang; paling banyak sebanyak isi pool sebelum membuat koneksi baru
+        for _ in range(self.max_connections + 1):
+            conn = source_pool.pool.getconn()
+            if id(conn) not in source_pool.connection_times:
+                now = time.monotonic()
+                source_pool.connection_times[id(conn)] = [now, now, now]
+                return conn
+            if self._is_usable(source_pool, conn):
+                return conn
+            source_pool.connection_times.pop(id(conn), None)
+            source_pool.pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Tidak bisa mendapatkan koneksi yang sehat dari pool.")
+
+    @contextmanager
+    def connection(self, source: models.DataSourceConnection):
+        """
+        Meminjam koneksi ke sumber data eksternal dan mengembalikannya ke pool
+        setelah blok `with` selesai. Transaksi yang belum selesai di-rollback
+        oleh pool psycopg2.
+        """
+        source_pool = self._get_pool(source)
+        try:
+            if not source_pool.slots.acquire(timeout=self.acquire_timeout):
+                raise psycopg2.OperationalError("Semua koneksi ke sumber data sedang dipakai.")
+            try:
+                conn = self._checkout(source_pool)
+                broken = False
+                try:
+                    yield conn
+                except psycopg2.OperationalError:
+                    # Koneksi terputus di tengah jalan tidak dikembalikan ke pool
+                    broken = True
+                    raise
+                finally:
+                    if broken or conn.closed:
+                        source_pool.connection_times.pop(id(conn), None)
+                    else:
+                        source_pool.connection_times[id(conn)][1] = time.monotonic()
+                    source_pool.pool.putconn(conn, close=broken or bool(conn.closed))
+            finally:
+                source_pool.slots.release()
+        finally:
+            with self._lock:
+                source_pool.in_use -= 1
+                source_pool.last_used = time.monotonic()
+                if source_pool.retired and source_pool.in_use == 0:
+                    source_pool.pool.closeall()
+
+    def check(self, source: models.DataSourceConnection) -> None:
+        """
+        Memastikan sumber data bisa dihubungi (memakai koneksi dari pool).
+        """
+        with self.connection(source) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+
+    def close_idle(self) -> None:
+        """
+        Menutup pool yang menganggur lebih dari `idle_timeout`, serta koneksi
+        menganggur yang sudah melewati `idle_timeout`/`max_lifetime` di pool
+        yang masih dipakai. Dipanggil berkala (lihat `main.py`) agar koneksi ke
+        sumber data tidak tertahan saat tidak ada request.
+        """
+        with self._lock:
+            self._close_idle_pools()
+            source_pools = list(self._pools.values())
+        now = time.monotonic()
+        for source_pool in source_pools:
+            pool = source_pool.pool
+            # psycopg2 tidak punya API untuk menutup satu koneksi menganggur; daftar
+            # koneksi menganggurnya (`_pool`) diubah di bawah lock pool itu sendiri
+            with pool._lock:
+                if pool.closed:
+                    continue
+                for conn in list(pool._pool):
+                    created_at, returned_at, _ = source_pool.connection_times.get(id(conn), (now, now, now))
+                    if conn.closed or now - created_at > self.max_lifetime or now - returned_at > self.idle_timeout:
+                        pool._pool.remove(conn)
+                        source_pool.connection_times.pop(id(conn), None)
+                        conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for source_id in list(self._pools):
+                self._close_pool(source_id)
+
+
+datasource_pools = DataSourcePoolManager(
+    max_connections=settings.datasource_pool_max_connections,
+    idle_timeout=settings.datasource_pool_idle_seconds,
+    max_lifetime=settings.datasource_pool_max_lifetime_seconds,
+    health_check_interval=settings.datasource_pool_health_check_seconds,
+    acquire_timeout=settings.datasource_pool_acquire_timeout_seconds,
+    connect_timeout=settings.datasource_connect_timeout_seconds,
+)
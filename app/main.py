@@ -12,6 +12,14 @@ from app.presentation.router import router as presentation_router
 from app.sharing.router import router as sharing_router
 from app.datasources.router import router as datasources_router
 from app.teams.router import router as teams_router
+from app.upload.router import router as upload_router
+from app.analysis.executor import sandbox_pool
+from app.analysis.jobs import job_worker_pool
+from app.analysis.causal_service import shutdown_robustness_executor
+from app.datasources.pools import datasource_pools
+from app.upload.sessions import reap_expired_upload_sessions
+from app.core.periodic import PeriodicTask
+from app.config import settings
 
 # Membuat tabel di database (jika belum ada) saat aplikasi dimulai
 # Disarankan untuk mengelola skema database menggunakan Alembic di lingkungan produksi.
@@ -44,6 +52,58 @@ app.include_router(presentation_router)
 app.include_router(sharing_router) 
 app.include_router(datasources_router)
 app.include_router(teams_router)
+app.include_router(upload_router)
+
+@app.on_event("startup")
+def start_sandbox_pool():
+    # Worker dijalankan saat startup agar request pertama tidak menunggu proses baru
+    if settings.sandbox_enabled:
+        sandbox_pool.start()
+
+@app.on_event("shutdown")
+def stop_sandbox_pool():
+    sandbox_pool.shutdown()
+
+@app.on_event("startup")
+def start_job_workers():
+    job_worker_pool.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_worker_pool.shutdown()
+    shutdown_robustness_executor()
+
+# Koneksi menganggur ke sumber data ditutup berkala, tidak hanya saat pool dipakai lagi
+datasource_pool_sweeper = PeriodicTask(
+    "datasource-pool-sweeper",
+    settings.datasource_pool_sweep_interval_seconds,
+    datasource_pools.close_idle,
+)
+
+@app.on_event("startup")
+def start_datasource_pool_sweeper():
+    datasource_pool_sweeper.start()
+
+@app.on_event("shutdown")
+def close_datasource_pools():
+    datasource_pool_sweeper.shutdown()
+    datasource_pools.close_all()
+
+# Sesi unggahan yang ditinggalkan dihapus saat startup lalu secara berkala
+upload_session_reaper = PeriodicTask(
+    "upload-session-reaper",
+    settings.upload_session_reap_interval_seconds,
+    reap_expired_upload_sessions,
+)
+
+@app.on_event("startup")
+def start_upload_session_reaper():
+    upload_session_reaper.start()
+
+@app.on_event("shutdown")
+def stop_upload_session_reaper():
+    upload_session_reaper.shutdown()
+
 @app.get("/")
 def read_root():
     """
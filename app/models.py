@@ -1,7 +1,8 @@
 # In telnovia-analytics-backend/app/models.py
 import enum
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Text, Boolean, Enum # <-- Impor Enum
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, JSON, Text, Boolean, Enum, DateTime # <-- Impor Enum
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from .database import Base
 
 # Definisikan Enum untuk peran agar konsisten
@@ -42,8 +43,27 @@ class Notebook(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
-    filepath = Column(String, unique=True)
+    # Beberapa notebook bisa berbagi file yang sama lewat DatasetBlob
+    filepath = Column(String)
+    # SHA-256 dari isi file unggahan, dihitung saat file di-stream ke disk.
+    # Selama terisi, data notebook dibaca dari DatasetBlob dengan hash ini.
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Salinan Parquet dari file unggahan, dipakai untuk semua pembacaan berikutnya
+    columnar_path = Column(String, nullable=True)
+    # {nama_tabel: path Parquet} untuk file dengan beberapa tabel (mis. sheet Excel);
+    # columnar_path selalu tabel pertama
+    tables = Column(JSON, nullable=True)
     health_report = Column(JSON, nullable=True)
+    # 'provisional' selama laporan eksak masih dihitung di latar belakang, lalu 'final'.
+    # 'approximate' jika laporan disusun dari sketch `health_stats` (setelah append).
+    # Versi naik setiap kali health_report diganti sehingga frontend bisa polling.
+    health_report_status = Column(String, server_default="final", nullable=False)
+    health_report_version = Column(Integer, server_default="1", nullable=False)
+    # Statistik per kolom yang bisa digabung (hitungan, sketch, min/max) untuk
+    # memperbarui health_report saat data ditambahkan tanpa scan ulang
+    health_stats = Column(JSON, nullable=True)
+    # 'pending' -> 'processing' -> 'ready' / 'failed'; data baru bisa dianalisis saat 'ready'
+    ingestion_status = Column(String, server_default="ready", nullable=False)
     shareable_token = Column(String, unique=True, index=True, nullable=True)
     is_public = Column(Boolean, server_default="false", nullable=False)
 
@@ -51,6 +71,7 @@ class Notebook(Base):
     team_id = Column(Integer, ForeignKey("teams.id"))
     team = relationship("Team", back_populates="notebooks")
     conversations = relationship("Conversation", back_populates="notebook")
+    analysis_jobs = relationship("AnalysisJob", back_populates="notebook")
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -75,4 +96,87 @@ class DataSourceConnection(Base):
     
     # Ganti owner_id menjadi team_id
     team_id = Column(Integer, ForeignKey("teams.id"))
-    team = relationship("Team", back_populates="data_source_connections")
\ No newline at end of file
+    team = relationship("Team", back_populates="data_source_connections")
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+
+    # Hash SHA-256 dari (model, versi prompt, hash skema, pertanyaan ternormalisasi)
+    key = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    response = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class AnalysisJob(Base):
+    # Tabel antrean lokal untuk analisis berat yang dijalankan worker di latar belakang
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    notebook_id = Column(Integer, ForeignKey("notebooks.id"), index=True)
+    kind = Column(String, nullable=False)
+    # queued -> running -> succeeded / failed; job running yang lease-nya habis dikembalikan ke queued
+    status = Column(String, nullable=False, server_default="queued", index=True)
+    payload = Column(JSON, nullable=True)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Lease worker: diperbarui berkala selama job berjalan
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, server_default="0", nullable=False)
+
+    notebook = relationship("Notebook", back_populates="analysis_jobs")
+
+class DatasetBlob(Base):
+    # File unggahan yang dialamatkan berdasarkan isi (SHA-256). Unggahan ulang
+    # dengan isi yang sama memakai salinan kolumnar dan health report yang sudah ada.
+    __tablename__ = "dataset_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    filepath = Column(String, nullable=False)
+    columnar_path = Column(String, nullable=True)
+    tables = Column(JSON, nullable=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    health_report = Column(JSON, nullable=True)
+    health_report_status = Column(String, server_default="final", nullable=False)
+    health_stats = Column(JSON, nullable=True)
+    # Jumlah notebook yang memakai blob ini; file dihapus saat mencapai 0
+    ref_count = Column(Integer, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class UploadSession(Base):
+    # Sesi unggahan bertahap (resumable): file dikirim sebagai potongan bernomor
+    # yang bisa diunggah paralel dan diulang, lalu digabung saat finalisasi.
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    filename = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+    # SHA-256 file utuh dari klien (opsional), diverifikasi saat finalisasi
+    expected_sha256 = Column(String(64), nullable=True)
+    # open -> finalizing (potongan digabung job ingestion) -> completed; kembali ke open
+    # jika penggabungan gagal
+    status = Column(String, nullable=False, server_default="open")
+    notebook_id = Column(Integer, ForeignKey("notebooks.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    notebook = relationship("Notebook")
+    chunks = relationship("UploadChunk", back_populates="session", cascade="all, delete-orphan")
+
+class UploadChunk(Base):
+    __tablename__ = "upload_chunks"
+
+    session_id = Column(String(36), ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+
+    session = relationship("UploadSession", back_populates="chunks")
@@ -1,10 +1,9 @@
 import os
-import shutil
 import uuid
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 import json # <-- Impor library json
-import psycopg2 # Library untuk terhubung ke Postgres
 import polars as pl
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -12,8 +11,31 @@ from pydantic import BaseModel
 from app.database import get_db
 from app.auth.oauth2 import get_current_user
 from app import crud, schemas
-from app.analysis.data_quality import generate_health_report
-from app.core.security import decrypt_password
+from app.analysis.data_quality import (
+    compute_health_stats,
+    health_report_from_stats,
+    health_stats_compatible,
+    health_stats_from_json,
+    health_stats_to_json,
+    merge_health_stats,
+)
+from app.analysis.ingestion import timed_stage
+from app.analysis.readers import detect_format, read_table
+from app.analysis.columnar_store import (
+    append_to_columnar,
+    copy_columnar,
+    remove_dataset_files,
+)
+from app.config import settings
+from app.datasources.pools import datasource_pools
+from app.core.upload_stream import (
+    MULTIPART_OVERHEAD_BYTES,
+    MultipartFileStream,
+    UploadStats,
+    reject_oversized_request,
+    save_stream,
+)
+from app.notebooks.service import create_notebook_from_upload
 
 router = APIRouter(
     prefix="/api/v1",
@@ -40,82 +62,95 @@ def create_notebook_from_db_connection(
     if not db_conn:
         raise HTTPException(status_code=404, detail="Koneksi database tidak ditemukan.")
 
-    # Dekripsi password dan coba hubungkan untuk memvalidasi koneksi
+    # Validasi koneksi memakai pool sumber data; koneksi yang berhasil dipakai ulang
+    # dan password hasil dekripsi disimpan di memori oleh pool
     try:
-        password = decrypt_password(db_conn.encrypted_password)
-        conn = psycopg2.connect(
-            host=db_conn.host,
-            port=db_conn.port,
-            dbname=db_conn.dbname,
-            user=db_conn.username,
-            password=password
-        )
-        conn.close() # Jika berhasil terhubung, tutup koneksi tes
+        datasource_pools.check(db_conn)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Gagal terhubung ke database eksternal: {e}")
 
     # Buat entri notebook baru di database dan kembalikan objek notebook lengkap
     return crud.create_notebook_from_db(db, conn=db_conn, owner_id=current_user.id)
 
-@router.post("/upload", status_code=201)
-def upload_file_and_create_notebook(
-    file: UploadFile = File(...), 
+def _read_uploaded_file(file_path: str, filename: str) -> pl.DataFrame:
+    file_format = detect_format(filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Format file tidak didukung.")
+    try:
+        return read_table(file_path, file_format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gagal membaca file untuk analisis: {e}")
+
+# Body endpoint unggahan dibaca langsung dari stream (lihat `MultipartFileStream`),
+# sehingga skemanya didokumentasikan manual untuk OpenAPI
+_FILE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+async def _open_upload(request: Request) -> MultipartFileStream:
+    # Tolak lebih awal jika Content-Length sudah melebihi batas; request tanpa
+    # Content-Length dibatasi saat body dibaca
+    reject_oversized_request(
+        request.headers.get("content-length"), settings.upload_max_bytes + MULTIPART_OVERHEAD_BYTES
+    )
+    upload = MultipartFileStream(request, "file", settings.upload_max_bytes)
+    await upload.open()
+    return upload
+
+async def _save_upload(upload: MultipartFileStream, count_rows: bool) -> UploadStats:
+    # Membuat direktori 'uploads' jika belum ada
+    upload_dir = "uploads"
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # Membuat path file yang unik untuk menghindari tumpang tindih nama
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}-{os.path.basename(upload.filename)}")
+
+    # Disimpan per potongan; hash SHA-256 dan jumlah baris dihitung sambil menulis
+    return await save_stream(
+        upload.iter_chunks(settings.upload_chunk_bytes), file_path,
+        max_bytes=settings.upload_max_bytes,
+        count_rows=count_rows
+    )
+
+@router.post("/upload", status_code=201, openapi_extra=_FILE_UPLOAD_BODY)
+async def upload_file_and_create_notebook(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: schemas.UserOut = Depends(get_current_user)
 ):
     """
     Menangani unggahan file, menyimpannya di server, membuat entri notebook 
     di database, dan mengembalikan notebook_id.
-    """
-    # Membuat direktori 'uploads' jika belum ada
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Membuat path file yang unik untuk menghindari tumpang tindih nama
-    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}-{file.filename}")
-    
-    # Menyimpan file ke path yang telah ditentukan
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Baca file yang baru diunggah untuk dianalisis
-    try:
-        df = None
-        file_extension = file.filename.split('.')[-1].lower()
-
-        if file_extension == 'csv':
-            df = pl.read_csv(file_path)
-        elif file_extension == 'xlsx':
-            df = pl.read_excel(file_path)
-        elif file_extension == 'json': # <-- Logika baru untuk JSON
-            # read_json dari Polars bisa secara otomatis meratakan struktur
-            df = pl.read_json(file_path)
-        else:
-            raise HTTPException(status_code=400, detail="Format file tidak didukung.")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gagal membaca file untuk analisis: {e}")
+    Hanya tahap penyimpanan (stream ke disk dengan batas `upload_max_bytes`)
+    yang dijalankan di dalam request; parsing dan profiling berjalan di latar
+    belakang dan progresnya bisa dipantau lewat `/notebook/{id}/ingestion`.
+    """
+    upload = await _open_upload(request)
+    file_format = detect_format(upload.filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Format file tidak didukung.")
 
-    # Hasilkan laporan kualitas data yang sebenarnya
-    health_report = generate_health_report(df)
+    store_stage = {}
+    with timed_stage(store_stage.update) as details:
+        upload_stats = await _save_upload(upload, count_rows=file_format == 'csv')
+        details["size_bytes"] = upload_stats.size_bytes
 
-    # Buat entri notebook dengan menyertakan health report
-    notebook = crud.create_notebook(
-        db=db, 
-        filename=file.filename, 
-        filepath=file_path, 
-        owner_id=current_user.id,
-        health_report=health_report # <-- Kirim laporan ke database
+    return await run_in_threadpool(
+        create_notebook_from_upload,
+        db, upload_stats.path, upload.filename, current_user.id, upload_stats, store_stage
     )
-    if not notebook:
-        raise HTTPException(status_code=500, detail="Gagal membuat notebook di database.")
-    
-    return {
-        "notebook_id": notebook.id,
-        "filename": notebook.filename,
-        "status": "File berhasil diunggah dan notebook telah dibuat.",
-        "data_health_report": health_report # <-- Kirim laporan asli ke frontend
-    }
 
 @router.get("/notebook/{notebook_id}")
 def get_notebook_details(
@@ -134,9 +169,189 @@ def get_notebook_details(
     return {
         "notebook_id": notebook.id,
         "filename": notebook.filename,
-        "data_health_report": notebook.health_report # <-- Ambil laporan dari database
+        "data_health_report": notebook.health_report, # <-- Ambil laporan dari database
+        "health_report_status": notebook.health_report_status,
+        "health_report_version": notebook.health_report_version,
+        "ingestion_status": notebook.ingestion_status,
+        # Nama tabel (mis. sheet Excel) bila file berisi lebih dari satu tabel; dipilih
+        # lewat field `table` pada request analisis
+        "tables": list(notebook.tables) if notebook.tables else None
     }
 
+@router.get("/notebook/{notebook_id}/ingestion", response_model=schemas.IngestionStatusOut)
+def get_notebook_ingestion_status(
+    notebook_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Status ingestion notebook: tahap yang sedang berjalan serta waktu dan error
+    setiap tahap (store, parse_convert, profile).
+    """
+    notebook = crud.get_notebook(db, notebook_id=notebook_id, owner_id=current_user.id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan atau Anda tidak memiliki akses.")
+
+    job = crud.get_latest_analysis_job(db, notebook_id=notebook.id, kind="ingest")
+    if job is None:
+        # Notebook yang dibuat tanpa job ingestion (mis. unggahan duplikat) langsung siap
+        return schemas.IngestionStatusOut(notebook_id=notebook.id, status=notebook.ingestion_status)
+
+    progress = job.progress or {}
+    return schemas.IngestionStatusOut(
+        notebook_id=notebook.id,
+        status=notebook.ingestion_status,
+        job_id=job.id,
+        current_stage=progress.get("stage"),
+        stages=progress.get("stages", {}),
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+@router.get("/notebook/{notebook_id}/health_report", response_model=schemas.HealthReportOut)
+def get_notebook_health_report(
+    notebook_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Mengambil health report notebook beserta status dan versinya. Frontend
+    melakukan polling sampai status berubah dari 'provisional' menjadi 'final'.
+    """
+    notebook = crud.get_notebook(db, notebook_id=notebook_id, owner_id=current_user.id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan atau Anda tidak memiliki akses.")
+
+    return {
+        "notebook_id": notebook.id,
+        "status": notebook.health_report_status,
+        "version": notebook.health_report_version,
+        "data_health_report": notebook.health_report
+    }
+
+@router.post("/notebook/{notebook_id}/append", openapi_extra=_FILE_UPLOAD_BODY)
+async def append_data_to_notebook(
+    notebook_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Menambahkan baris baru ke dataset notebook. Health report diperbarui dengan
+    menggabungkan statistik baris baru ke `health_stats` yang tersimpan, tanpa
+    menghitung ulang seluruh data; hasilnya berupa perkiraan (status 'approximate').
+    """
+    notebook = await run_in_threadpool(crud.get_notebook, db, notebook_id=notebook_id, owner_id=current_user.id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan atau Anda tidak memiliki akses.")
+    if notebook.ingestion_status != "ready":
+        raise HTTPException(status_code=409, detail="Data notebook masih diproses atau gagal diproses.")
+    if not notebook.columnar_path:
+        raise HTTPException(status_code=400, detail="Notebook ini tidak mendukung penambahan data.")
+
+    upload = await _open_upload(request)
+    upload_stats = await _save_upload(upload, count_rows=False)
+    try:
+        return await run_in_threadpool(_append_saved_file, db, notebook.id, upload_stats.path, upload.filename)
+    finally:
+        # File unggahan hanya dibutuhkan selama dibaca; datanya sudah masuk ke salinan Parquet
+        remove_dataset_files([upload_stats.path])
+
+def _append_saved_file(db: Session, notebook_id: int, file_path: str, filename: str) -> dict:
+    new_df = _read_uploaded_file(file_path, filename)
+
+    # Append ke notebook yang sama dijalankan bergantian: baris notebook dikunci sampai
+    # Parquet dan health_stats selesai diperbarui (commit di update_notebook_health_report)
+    notebook = crud.lock_notebook(db, notebook_id)
+    if notebook is None:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan atau Anda tidak memiliki akses.")
+    if notebook.ingestion_status != "ready" or not notebook.columnar_path:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Data notebook masih diproses atau gagal diproses.")
+
+    # Data tambahan harus memiliki kolom yang sama; tipe disesuaikan dengan data lama
+    schema = pl.read_parquet_schema(notebook.columnar_path)
+    missing_columns = [col for col in schema if col not in new_df.columns]
+    if missing_columns:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Kolom tidak ditemukan pada data tambahan: {', '.join(missing_columns)}")
+    try:
+        new_df = new_df.select([pl.col(col).cast(dtype) for col, dtype in schema.items()])
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Tipe data tambahan tidak cocok: {e}")
+
+    orphaned_paths = []
+    private_path = None
+    try:
+        if notebook.content_hash:
+            # Blob dipakai bersama notebook lain: data disalin dulu sebelum diubah (copy-on-write)
+            private_path = copy_columnar(notebook.columnar_path, file_path)
+            orphaned_paths = crud.detach_notebook_from_blob(db, notebook, private_path)
+
+        try:
+            append_to_columnar(notebook.columnar_path, new_df)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Gagal menambahkan data: {e}")
+
+        if health_stats_compatible(notebook.health_stats):
+            # Hanya baris baru yang dihitung, lalu digabung dengan statistik lama
+            health_stats = merge_health_stats(
+                health_stats_from_json(notebook.health_stats),
+                compute_health_stats(new_df, batch_size=settings.health_report_batch_rows)
+            )
+        else:
+            # Notebook lama tanpa statistik tersimpan (atau versi lama): hitung sekali dari seluruh data
+            health_stats = compute_health_stats(notebook.columnar_path, batch_size=settings.health_report_batch_rows)
+
+        notebook = crud.update_notebook_health_report(
+            db, notebook,
+            health_report_from_stats(health_stats, schema),
+            # Laporan dari sketch, bukan laporan eksak
+            status="approximate",
+            health_stats=health_stats_to_json(health_stats)
+        )
+    except Exception:
+        db.rollback()
+        if private_path:
+            remove_dataset_files([private_path])
+        raise
+
+    remove_dataset_files(orphaned_paths)
+    return {
+        "notebook_id": notebook.id,
+        "appended_rows": new_df.height,
+        "total_rows": health_stats["num_rows"],
+        "data_health_report": notebook.health_report,
+        "health_report_status": notebook.health_report_status,
+        "health_report_version": notebook.health_report_version
+    }
+
+@router.delete("/notebook/{notebook_id}", status_code=204)
+def delete_notebook(
+    notebook_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Menghapus notebook. File dataset ikut dihapus jika tidak ada notebook lain
+    yang memakai blob yang sama. Notebook yang ingestion-nya masih berjalan
+    tidak bisa dihapus (409).
+    """
+    notebook = crud.get_notebook(db, notebook_id=notebook_id, owner_id=current_user.id)
+    if not notebook:
+        raise HTTPException(status_code=404, detail="Notebook tidak ditemukan atau Anda tidak memiliki akses.")
+
+    # Baris dikunci agar job ingestion atau append tidak berjalan bersamaan dengan penghapusan
+    notebook = crud.lock_notebook(db, notebook.id)
+    if notebook.ingestion_status in ("pending", "processing"):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Data notebook masih diproses; tunggu hingga ingestion selesai.")
+
+    remove_dataset_files(crud.delete_notebook(db, notebook))
+
 @router.get("/notebooks", response_model=List[schemas.NotebookOut])
 def get_user_notebooks(
     db: Session = Depends(get_db),
@@ -0,0 +1,120 @@
+import os
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.analysis.columnar_store import remove_dataset_files
+from app.analysis.jobs import job_worker_pool
+from app.core.upload_stream import UploadStats
+
+
+def create_notebook_from_upload(
+    db: Session, file_path: str, filename: str, owner_id: int, upload_stats: UploadStats, store_stage: dict
+) -> dict:
+    """
+    Membuat notebook untuk file yang sudah tersimpan. File dialamatkan berdasarkan
+    hash isinya: jika isi yang sama sudah pernah diproses, salinan kolumnar dan
+    health report blob tersebut langsung dipakai. Jika belum, notebook dibuat
+    dengan status 'pending' dan tahap parse/convert serta profile dijalankan job
+    "ingest" di latar belakang.
+    """
+    # Blob dikunci sampai referensi baru di-commit; jika blob sudah dihapus,
+    # file unggahan diproses seperti biasa
+    blob = crud.lock_dataset_blob(db, upload_stats.content_hash)
+    if blob is not None:
+        notebook = crud.create_notebook(
+            db=db,
+            filename=filename,
+            filepath=blob.filepath,
+            columnar_path=blob.columnar_path,
+            tables=blob.tables,
+            owner_id=owner_id,
+            health_report=blob.health_report,
+            health_report_status=blob.health_report_status,
+            health_stats=blob.health_stats,
+            content_hash=blob.content_hash,
+            blob=blob
+        )
+        # Isi file sudah tersimpan di blob; salinan baru dihapus setelah commit
+        remove_dataset_files([file_path])
+        job = None
+    else:
+        notebook = crud.create_notebook(
+            db=db,
+            filename=filename,
+            filepath=file_path,
+            owner_id=owner_id,
+            health_report=None,
+            health_report_status="pending",
+            ingestion_status="pending"
+        )
+        job = crud.create_analysis_job(
+            db, notebook_id=notebook.id, kind="ingest",
+            payload={
+                "filename": filename,
+                "size_bytes": upload_stats.size_bytes,
+                "content_hash": upload_stats.content_hash,
+            },
+            progress={"stage": "queued", "stages": {"store": store_stage}}
+        )
+        job_worker_pool.notify()
+    if not notebook:
+        raise HTTPException(status_code=500, detail="Gagal membuat notebook di database.")
+
+    return {
+        "notebook_id": notebook.id,
+        "filename": notebook.filename,
+        "status": "File berhasil diunggah dan notebook telah dibuat.",
+        "ingestion_status": notebook.ingestion_status,
+        "ingestion_job_id": job.id if job else None,
+        "data_health_report": notebook.health_report, # <-- None selama ingestion masih berjalan
+        "health_report_status": notebook.health_report_status,
+        "health_report_version": notebook.health_report_version,
+        "upload": {**upload_stats.to_dict(), "deduplicated": job is None}
+    }
+
+
+def create_notebook_from_upload_session(db: Session, upload_session: models.UploadSession, owner_id: int) -> dict:
+    """
+    Membuat notebook untuk sesi unggahan yang semua potongannya sudah diterima.
+    Potongan digabung oleh job "ingest" (tahap store) di latar belakang, sehingga
+    request finalisasi tidak menunggu file berukuran GB ditulis ulang. Deduplikasi
+    blob dilakukan job tersebut setelah hash file utuh diketahui.
+    """
+    filename = upload_session.filename
+    notebook = crud.create_notebook(
+        db=db,
+        filename=filename,
+        filepath=os.path.join("uploads", f"{uuid.uuid4()}-{filename}"),
+        owner_id=owner_id,
+        health_report=None,
+        health_report_status="pending",
+        ingestion_status="pending"
+    )
+    if not notebook:
+        raise HTTPException(status_code=500, detail="Gagal membuat notebook di database.")
+    job = crud.create_analysis_job(
+        db, notebook_id=notebook.id, kind="ingest",
+        payload={
+            "filename": filename,
+            "size_bytes": upload_session.total_size,
+            "upload_session_id": upload_session.id,
+        },
+        progress={"stage": "queued", "stages": {}}
+    )
+    crud.set_upload_session_notebook(db, upload_session.id, notebook.id)
+    job_worker_pool.notify()
+
+    return {
+        "notebook_id": notebook.id,
+        "filename": notebook.filename,
+        "status": "Semua potongan diterima; file sedang digabung dan diproses.",
+        "ingestion_status": notebook.ingestion_status,
+        "ingestion_job_id": job.id,
+        "data_health_report": None,
+        "health_report_status": notebook.health_report_status,
+        "health_report_version": notebook.health_report_version,
+        "upload_session_id": upload_session.id
+    }
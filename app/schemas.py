@@ -1,7 +1,8 @@
 # In telnovia-analytics-backend/app/schemas.py
 from pydantic import BaseModel, EmailStr
 from .models import RoleEnum # Impor RoleEnum
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, List, Dict, Literal
+from datetime import datetime
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -34,20 +35,109 @@ class NotebookOut(NotebookBase):
     team_id: int
     # health_report bisa kompleks, jadi Dict adalah pendekatan umum yang baik
     health_report: Optional[Dict[str, Any]] = None
+    health_report_status: str = "final"
+    health_report_version: int = 1
+    ingestion_status: str = "ready"
 
     class Config:
         from_attributes = True
 
+class HealthReportOut(BaseModel):
+    notebook_id: int
+    # 'provisional' (dari sampel), 'final' (eksak), atau 'approximate' (dari sketch, setelah append)
+    status: str
+    version: int
+    data_health_report: Optional[Dict[str, Any]] = None
+
+class IngestionStatusOut(BaseModel):
+    notebook_id: int
+    # 'pending', 'processing', 'ready', atau 'failed'
+    status: str
+    job_id: Optional[int] = None
+    current_stage: Optional[str] = None
+    # Per tahap (store, parse_convert, profile): status, waktu mulai, durasi, error
+    stages: Dict[str, Any] = {}
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: int
+    # SHA-256 (hex) file utuh, opsional; diverifikasi saat finalisasi
+    sha256: Optional[str] = None
+
+class UploadSessionOut(BaseModel):
+    id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    status: str
+    # Indeks potongan yang sudah diterima, agar klien bisa melanjutkan unggahan
+    received_chunks: List[int] = []
+    notebook_id: Optional[int] = None
+    created_at: datetime
+    expires_at: datetime
+
+class UploadChunkOut(BaseModel):
+    index: int
+    size_bytes: int
+    sha256: str
+
 class QueryRequest(BaseModel):
     query: str
     notebookId: Optional[str] = None # Menjadi opsional
+    # 'markdown' (default), 'json' (baris sebagai objek), atau 'arrow' (Arrow IPC base64)
+    response_format: Literal["markdown", "json", "arrow"] = "markdown"
+    # Untuk analisis kausal: jalankan juga refuter dan interval bootstrap (lebih lambat)
+    robustness: bool = False
+    # Nama tabel (mis. sheet Excel) dari `tables` notebook; default tabel pertama
+    table: Optional[str] = None
+
+class ResultColumn(BaseModel):
+    name: str
+    dtype: str
+
+class QueryResult(BaseModel):
+    columns: List[ResultColumn]
+    total_rows: int
+    truncated: bool
+    rows: Optional[List[Dict[str, Any]]] = None
+    arrow_ipc: Optional[str] = None
 
 class QueryResponse(BaseModel):
     reply: str
+    # Hanya diisi jika response_format bukan 'markdown' dan hasilnya berupa tabel
+    result: Optional[QueryResult] = None
     
     class Config:
         from_attributes = True # Dulu orm_mode = True
 
+class AnalysisJobOut(BaseModel):
+    id: int
+    notebook_id: int
+    kind: str
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class AnalysisJobResult(BaseModel):
+    id: int
+    status: str
+    reply: Optional[str] = None
+    result: Optional[QueryResult] = None
+    error: Optional[str] = None
+
 # Skema baru untuk slide individual
 class SlideBase(BaseModel):
     id: str
@@ -1,35 +1,209 @@
 # In telnovia-analytics-backend/app/upload/router.py
 
-from fastapi import APIRouter, File, UploadFile, Depends
-from sqlalchemy.orm import Session
+import math
+import os
 import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.auth.oauth2 import get_current_user
-from app import schemas
+from app import crud, models, schemas
+from app.analysis.readers import detect_format
+from app.config import settings
+from app.core.upload_stream import reject_oversized_request, save_stream
+from app.notebooks.service import create_notebook_from_upload_session
+from app.upload.sessions import part_path, remove_upload_session_files, session_dir
 
 router = APIRouter(
     prefix="/api/v1",
     tags=['Upload']
 )
 
-@router.post("/upload")
-def upload_file(
-    file: UploadFile = File(...), 
+def _expected_chunk_size(upload_session: models.UploadSession, index: int) -> int:
+    # Semua potongan berukuran chunk_size kecuali potongan terakhir
+    if index == upload_session.total_chunks - 1:
+        return upload_session.total_size - upload_session.chunk_size * (upload_session.total_chunks - 1)
+    return upload_session.chunk_size
+
+
+def _session_out(upload_session: models.UploadSession, chunks: list) -> schemas.UploadSessionOut:
+    return schemas.UploadSessionOut(
+        id=upload_session.id,
+        filename=upload_session.filename,
+        total_size=upload_session.total_size,
+        chunk_size=upload_session.chunk_size,
+        total_chunks=upload_session.total_chunks,
+        status=upload_session.status,
+        received_chunks=[chunk.index for chunk in chunks],
+        notebook_id=upload_session.notebook_id,
+        created_at=upload_session.created_at,
+        expires_at=upload_session.expires_at
+    )
+
+
+def _get_session(db: Session, session_id: str, owner_id: int) -> models.UploadSession:
+    upload_session = crud.get_upload_session(db, session_id=session_id, owner_id=owner_id)
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Sesi unggahan tidak ditemukan.")
+    return upload_session
+
+
+def _get_open_session(db: Session, session_id: str, owner_id: int) -> models.UploadSession:
+    upload_session = _get_session(db, session_id, owner_id)
+    expires_at = upload_session.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Sesi unggahan sudah kedaluwarsa.")
+    if upload_session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Sesi unggahan berstatus '{upload_session.status}'.")
+    return upload_session
+
+
+@router.post("/uploads", response_model=schemas.UploadSessionOut, status_code=201)
+def create_upload_session(
+    session_data: schemas.UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Membuat sesi unggahan resumable. Klien lalu mengirim potongan bernomor
+    (0 .. total_chunks - 1) lewat PUT, boleh paralel, dan menyelesaikannya
+    dengan `POST /uploads/{id}/complete`.
+    """
+    filename = os.path.basename(session_data.filename)
+    if detect_format(filename) is None:
+        raise HTTPException(status_code=400, detail="Format file tidak didukung.")
+    if session_data.total_size <= 0:
+        raise HTTPException(status_code=400, detail="Ukuran file harus lebih dari 0.")
+    if session_data.total_size > settings.upload_session_max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Ukuran file melebihi batas {settings.upload_session_max_bytes // (1024 * 1024)} MB."
+        )
+    if not 0 < session_data.chunk_size <= settings.upload_session_max_chunk_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ukuran potongan harus antara 1 byte dan {settings.upload_session_max_chunk_bytes} byte."
+        )
+    if session_data.sha256 is not None and (
+        len(session_data.sha256) != 64 or any(c not in "0123456789abcdef" for c in session_data.sha256.lower())
+    ):
+        raise HTTPException(status_code=400, detail="Format SHA-256 tidak valid.")
+
+    session_id = str(uuid.uuid4())
+    os.makedirs(session_dir(session_id), exist_ok=True)
+    upload_session = crud.create_upload_session(
+        db,
+        session_id=session_id,
+        owner_id=current_user.id,
+        session_data=session_data,
+        filename=filename,
+        total_chunks=math.ceil(session_data.total_size / session_data.chunk_size),
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.upload_session_ttl_hours)
+    )
+    return _session_out(upload_session, [])
+
+
+@router.get("/uploads/{session_id}", response_model=schemas.UploadSessionOut)
+def get_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Status sesi unggahan beserta potongan yang sudah diterima, dipakai klien
+    untuk melanjutkan unggahan yang terputus.
+    """
+    upload_session = _get_session(db, session_id, current_user.id)
+    return _session_out(upload_session, crud.get_upload_chunks(db, session_id))
+
+
+@router.put("/uploads/{session_id}/chunks/{index}", response_model=schemas.UploadChunkOut)
+async def upload_chunk(
+    session_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="SHA-256 (hex) isi potongan"),
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Menerima satu potongan sebagai body request mentah. Potongan ditulis ke disk
+    secara streaming dan hanya disimpan jika ukuran dan SHA-256-nya cocok.
+    Potongan yang sama boleh dikirim ulang.
+    """
+    upload_session = await run_in_threadpool(_get_open_session, db, session_id, current_user.id)
+    if not 0 <= index < upload_session.total_chunks:
+        raise HTTPException(status_code=400, detail=f"Indeks potongan harus antara 0 dan {upload_session.total_chunks - 1}.")
+
+    expected_size = _expected_chunk_size(upload_session, index)
+    reject_oversized_request(request.headers.get("content-length"), expected_size)
+
+    # Ditulis ke file sementara agar potongan lama yang valid tidak rusak bila pengiriman ulang gagal
+    chunk_path = part_path(session_id, index)
+    tmp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+    stats = await save_stream(request.stream(), tmp_path, max_bytes=expected_size)
+    if stats.size_bytes != expected_size:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail=f"Ukuran potongan {index} harus {expected_size} byte.")
+    if stats.content_hash != x_chunk_sha256.lower():
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail=f"Checksum potongan {index} tidak cocok.")
+    os.replace(tmp_path, chunk_path)
+
+    await run_in_threadpool(crud.save_upload_chunk, db, session_id, index, stats.size_bytes, stats.content_hash)
+    return schemas.UploadChunkOut(index=index, size_bytes=stats.size_bytes, sha256=stats.content_hash)
+
+
+@router.post("/uploads/{session_id}/complete", status_code=201)
+def complete_upload_session(
+    session_id: str,
     db: Session = Depends(get_db),
     current_user: schemas.UserOut = Depends(get_current_user)
 ):
     """
-    Menangani unggahan file, membuat entri notebook, 
-    dan mengembalikan notebook_id.
+    Menyelesaikan sesi unggahan dan membuat notebook (lihat `/api/v1/upload`).
+    Penggabungan potongan, parsing, dan profiling berjalan di latar belakang;
+    progresnya bisa dipantau lewat `/notebook/{id}/ingestion`. Jika file hasil
+    penggabungan tidak cocok dengan checksum, sesi dibuka kembali.
     """
-    # Di sini kita akan menambahkan logika untuk menyimpan file dan data
-    # Untuk sekarang, kita hanya buat notebook ID palsu
-    notebook_id = str(uuid.uuid4())
+    upload_session = _get_open_session(db, session_id, current_user.id)
+    received = {chunk.index for chunk in crud.get_upload_chunks(db, session_id)}
+    missing = [i for i in range(upload_session.total_chunks) if i not in received]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Potongan belum lengkap, {len(missing)} belum diterima (mis. {missing[:10]})."
+        )
+
+    # Hanya satu permintaan finalisasi yang boleh berjalan untuk setiap sesi
+    if not crud.transition_upload_session(db, session_id, "open", "finalizing"):
+        raise HTTPException(status_code=409, detail="Sesi unggahan sedang atau sudah difinalisasi.")
+
+    try:
+        return create_notebook_from_upload_session(db, upload_session, current_user.id)
+    except Exception:
+        db.rollback()
+        crud.reopen_upload_session(db, session_id)
+        raise
+
 
-    return {
-        "notebook_id": notebook_id,
-        "filename": file.filename,
-        "status": "File berhasil diunggah.",
-        "data_health_report": {} # Placeholder untuk laporan
-    }
\ No newline at end of file
+@router.delete("/uploads/{session_id}", status_code=204)
+def abort_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserOut = Depends(get_current_user)
+):
+    """
+    Membatalkan sesi unggahan dan menghapus potongan yang sudah diterima.
+    """
+    upload_session = _get_session(db, session_id, current_user.id)
+    if upload_session.status == "finalizing":
+        raise HTTPException(status_code=409, detail="Sesi unggahan sedang difinalisasi.")
+    crud.delete_upload_session(db, upload_session)
+    remove_upload_session_files(session_id)
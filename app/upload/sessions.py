@@ -0,0 +1,62 @@
+import os
+import shutil
+from datetime import datetime, timezone
+
+from app import crud, models
+from app.analysis.readers import detect_format
+from app.core.upload_stream import UploadStats, assemble_chunks
+from app.database import SessionLocal
+
+# Potongan setiap sesi disimpan di uploads/sessions/{session_id}/ sampai digabung
+UPLOAD_SESSION_DIR = os.path.join("uploads", "sessions")
+
+
+def session_dir(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, session_id)
+
+
+def part_path(session_id: str, index: int) -> str:
+    return os.path.join(session_dir(session_id), f"{index:06d}.part")
+
+
+def remove_upload_session_files(session_id: str) -> None:
+    shutil.rmtree(session_dir(session_id), ignore_errors=True)
+
+
+def assemble_upload_session(upload_session: models.UploadSession, dest_path: str) -> UploadStats:
+    """
+    Menggabungkan semua potongan sesi menjadi satu file di `dest_path` dan
+    memverifikasi ukuran serta SHA-256 file utuh (jika dikirim klien).
+    """
+    upload_stats = assemble_chunks(
+        [part_path(upload_session.id, i) for i in range(upload_session.total_chunks)],
+        dest_path,
+        count_rows=detect_format(upload_session.filename) == 'csv'
+    )
+    if upload_stats.size_bytes != upload_session.total_size or (
+        upload_session.expected_sha256 and upload_stats.content_hash != upload_session.expected_sha256
+    ):
+        os.remove(dest_path)
+        raise ValueError("Checksum file hasil penggabungan tidak cocok.")
+    return upload_stats
+
+
+def reap_expired_upload_sessions() -> int:
+    """
+    Menghapus sesi unggahan yang sudah kedaluwarsa beserta potongannya di disk.
+    Sesi yang masih digabung oleh job ingestion dilewati. Mengembalikan jumlah
+    sesi yang dihapus.
+    """
+    db = SessionLocal()
+    try:
+        reaped = 0
+        for upload_session in crud.get_expired_upload_sessions(db, datetime.now(timezone.utc)):
+            notebook = upload_session.notebook
+            if upload_session.status == "finalizing" and notebook is not None and notebook.ingestion_status in ("pending", "processing"):
+                continue
+            crud.delete_upload_session(db, upload_session)
+            remove_upload_session_files(upload_session.id)
+            reaped += 1
+        return reaped
+    finally:
+        db.close()
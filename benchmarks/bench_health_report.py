@@ -0,0 +1,82 @@
+"""
+Benchmark `generate_health_report`: implementasi batch dibandingkan dengan
+implementasi lama (loop per kolom) pada dataset 10, 100, dan 1000 kolom.
+
+Jalankan dari root repo:
+    python -m benchmarks.bench_health_report --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import polars as pl
+
+from app.analysis.data_quality import generate_health_report
+
+
+def legacy_health_report(df: pl.DataFrame) -> dict:
+    # Salinan implementasi lama (satu kolom per iterasi) sebagai pembanding
+    report = {"columns": []}
+    num_rows = len(df)
+    for col_name in df.columns:
+        col_series = df[col_name]
+        missing_count = col_series.is_null().sum()
+        if col_series.dtype in [pl.Utf8, pl.Object]:
+            col_series.n_unique()
+        col_series.n_unique()
+        outliers_count = 0
+        if col_series.dtype.is_numeric() and not col_series.is_null().all():
+            q1 = col_series.quantile(0.25)
+            q3 = col_series.quantile(0.75)
+            if q1 is not None and q3 is not None:
+                iqr = q3 - q1
+                outliers_count = df.filter(
+                    (col_series < q1 - 1.5 * iqr) | (col_series > q3 + 1.5 * iqr)
+                ).height
+        report["columns"].append({
+            "name": col_name,
+            "missing_values": {"count": missing_count, "percentage": missing_count / num_rows * 100},
+            "anomaly_report": {"count": outliers_count},
+        })
+    return report
+
+
+def make_dataset(num_rows: int, num_columns: int, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(num_columns):
+        if i % 4 == 3:
+            data[f"cat_{i}"] = rng.choice(["a", "b", "c", "d"], size=num_rows)
+        else:
+            values = rng.normal(size=num_rows)
+            values[rng.random(num_rows) < 0.05] = np.nan
+            data[f"num_{i}"] = values
+    return pl.DataFrame(data).fill_nan(None)
+
+
+def best_of(fn, df: pl.DataFrame, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'legacy (s)':>12} {'batched (s)':>12} {'speedup':>8}")
+    for num_columns in args.columns:
+        df = make_dataset(args.rows, num_columns)
+        legacy = best_of(legacy_health_report, df, args.repeats)
+        batched = best_of(generate_health_report, df, args.repeats)
+        print(f"{num_columns:>8} {legacy:>12.3f} {batched:>12.3f} {legacy / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
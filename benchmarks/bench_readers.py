@@ -0,0 +1,168 @@
+"""
+Benchmark pembaca file ingestion dibandingkan dengan pembaca lama:
+
+- Excel multi-sheet: `read_excel_sheets` vs `pl.read_excel(engine='openpyxl')`
+  (sheet pertama saja, seperti implementasi lama)
+- JSON: NDJSON yang di-stream ke Parquet vs `pl.read_json` pada dokumen JSON utuh
+- CSV gzip/zstd: stream ke Parquet vs dekompresi ke file CSV sementara lalu `pl.read_csv`
+
+Setiap pengukuran dijalankan di proses terpisah agar puncak memori (max RSS)
+bisa dibandingkan.
+
+Jalankan dari root repo:
+    python -m benchmarks.bench_readers --rows 200000 --sheets 4
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+
+from app.analysis.readers import (
+    EXCEL_ENGINE,
+    read_excel_sheets,
+    stream_compressed_csv_to_parquet,
+    stream_ndjson_to_parquet,
+)
+
+
+def make_dataset(num_rows: int, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pl.DataFrame({
+        "id": np.arange(num_rows),
+        "amount": rng.normal(100, 15, size=num_rows).round(2),
+        "quantity": rng.integers(0, 50, size=num_rows),
+        "category": rng.choice(["alpha", "beta", "gamma", "delta"], size=num_rows),
+        "region": rng.choice(["north", "south", "east", "west"], size=num_rows),
+    })
+
+
+def legacy_excel(path: str, workdir: str) -> None:
+    pl.read_excel(path, engine="openpyxl")
+
+
+def new_excel(path: str, workdir: str) -> None:
+    read_excel_sheets(path)
+
+
+def legacy_json(path: str, workdir: str) -> None:
+    pl.read_json(path).write_parquet(os.path.join(workdir, "legacy_json.parquet"))
+
+
+def new_ndjson(path: str, workdir: str) -> None:
+    stream_ndjson_to_parquet(path, os.path.join(workdir, "new_ndjson.parquet"))
+
+
+def legacy_csv_gz(path: str, workdir: str) -> None:
+    csv_path = os.path.join(workdir, "legacy_decompressed.csv")
+    with gzip.open(path, "rb") as src, open(csv_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    pl.read_csv(csv_path).write_parquet(os.path.join(workdir, "legacy_csv_gz.parquet"))
+
+
+def new_csv_gz(path: str, workdir: str) -> None:
+    stream_compressed_csv_to_parquet(path, os.path.join(workdir, "new_csv_gz.parquet"), "csv.gz")
+
+
+def legacy_csv_zst(path: str, workdir: str) -> None:
+    csv_path = os.path.join(workdir, "legacy_decompressed_zst.csv")
+    with pa.CompressedInputStream(pa.OSFile(path, "rb"), "zstd") as src, open(csv_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    pl.read_csv(csv_path).write_parquet(os.path.join(workdir, "legacy_csv_zst.parquet"))
+
+
+def new_csv_zst(path: str, workdir: str) -> None:
+    stream_compressed_csv_to_parquet(path, os.path.join(workdir, "new_csv_zst.parquet"), "csv.zst")
+
+
+def peak_rss_mb() -> float:
+    # VmHWM (Linux) dihitung ulang setelah exec, tidak seperti ru_maxrss yang
+    # ikut mewarisi puncak memori proses induk
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _measure(fn, path: str, workdir: str, queue) -> None:
+    start = time.perf_counter()
+    fn(path, workdir)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, peak_rss_mb()))
+
+
+def measure(fn, path: str, workdir: str) -> tuple[float, float]:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(fn, path, workdir, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def write_excel_input(df: pl.DataFrame, num_sheets: int, workdir: str) -> str:
+    import xlsxwriter
+
+    path = os.path.join(workdir, "data.xlsx")
+    with xlsxwriter.Workbook(path) as workbook:
+        for i in range(num_sheets):
+            df.write_excel(workbook, worksheet=f"sheet{i}")
+    return path
+
+
+def write_inputs(df: pl.DataFrame, workdir: str) -> dict:
+    paths = {}
+    paths["json"] = os.path.join(workdir, "data.json")
+    df.write_json(paths["json"])
+    paths["ndjson"] = os.path.join(workdir, "data.ndjson")
+    df.write_ndjson(paths["ndjson"])
+
+    csv_path = os.path.join(workdir, "data.csv")
+    df.write_csv(csv_path)
+    paths["csv.gz"] = csv_path + ".gz"
+    with open(csv_path, "rb") as src, gzip.open(paths["csv.gz"], "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    paths["csv.zst"] = csv_path + ".zst"
+    with open(csv_path, "rb") as src, pa.CompressedOutputStream(paths["csv.zst"], "zstd") as dst:
+        shutil.copyfileobj(src, dst)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--excel-rows", type=int, default=50_000)
+    parser.add_argument("--sheets", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_readers_")
+    try:
+        paths = write_inputs(make_dataset(args.rows), workdir)
+        paths["xlsx"] = write_excel_input(make_dataset(args.excel_rows), args.sheets, workdir)
+
+        cases = [
+            (f"xlsx ({args.sheets} sheet, {EXCEL_ENGINE})", paths["xlsx"], legacy_excel, new_excel),
+            ("json -> ndjson", None, legacy_json, new_ndjson),
+            ("csv.gz", paths["csv.gz"], legacy_csv_gz, new_csv_gz),
+            ("csv.zst", paths["csv.zst"], legacy_csv_zst, new_csv_zst),
+        ]
+        print(f"{'input':<28} {'legacy (s)':>11} {'new (s)':>9} {'legacy RSS (MB)':>16} {'new RSS (MB)':>13}")
+        for name, path, legacy_fn, new_fn in cases:
+            legacy_path, new_path = (paths["json"], paths["ndjson"]) if path is None else (path, path)
+            legacy_time, legacy_rss = measure(legacy_fn, legacy_path, workdir)
+            new_time, new_rss = measure(new_fn, new_path, workdir)
+            print(f"{name:<28} {legacy_time:>11.3f} {new_time:>9.3f} {legacy_rss:>16.0f} {new_rss:>13.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
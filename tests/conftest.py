@@ -0,0 +1,17 @@
+import os
+
+# Settings wajib untuk app.config; nilai dummy cukup karena test tidak memakai
+# database maupun OpenAI
+for name, value in {
+    "DATABASE_HOSTNAME": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test",
+    "DATABASE_USERNAME": "test",
+    "SECRET_KEY": "test",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ENCRYPTION_KEY": "Gq7Zc8p6o9yN0mJ4rV1wX2tB5sK3hL8dE6fA9uC0iQ4=",
+    "OPENAI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,28 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from app.analysis.causal_service import estimate_linear_effect, estimate_with_dowhy
+
+
+def _confounded_frame(binary_treatment: bool, seed: int = 0, n: int = 2_000) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    w1 = rng.normal(size=n)
+    w2 = rng.uniform(-1, 1, size=n)
+    if binary_treatment:
+        treatment = (w1 + rng.normal(size=n) > 0).astype(np.int64)
+    else:
+        treatment = 0.8 * w1 - 0.5 * w2 + rng.normal(size=n)
+    outcome = 2.5 * treatment + 1.5 * w1 - 3.0 * w2 + rng.normal(size=n)
+    return pl.DataFrame({"t": treatment, "y": outcome, "w1": w1, "w2": w2})
+
+
+@pytest.mark.parametrize("binary_treatment", [True, False], ids=["binary", "continuous"])
+def test_fast_linear_estimate_matches_dowhy(binary_treatment):
+    df = _confounded_frame(binary_treatment)
+
+    fast = estimate_linear_effect(df, "t", "y", ["w1", "w2"])
+    dowhy_value = estimate_with_dowhy(df, "t", "y", ["w1", "w2"])
+
+    assert fast["value"] == pytest.approx(dowhy_value, rel=1e-10, abs=1e-10)
+    assert fast["ci_lower"] < fast["value"] < fast["ci_upper"]
@@ -0,0 +1,85 @@
+import numpy as np
+import polars as pl
+
+from app.analysis.data_quality import (
+    compute_health_stats,
+    generate_health_report,
+    generate_streaming_health_report,
+    health_report_from_stats,
+    health_stats_compatible,
+    health_stats_from_json,
+    health_stats_to_json,
+    merge_health_stats,
+)
+
+
+def _append_report(base: pl.DataFrame, appended: pl.DataFrame) -> dict:
+    # Alur endpoint append: statistik lama dari JSON digabung dengan statistik batch baru
+    stats = health_stats_from_json(health_stats_to_json(compute_health_stats(base)))
+    merged = merge_health_stats(stats, compute_health_stats(appended))
+    return health_report_from_stats(merged, pl.concat([base, appended]).schema)
+
+
+def _column(report: dict, name: str) -> dict:
+    return next(column for column in report["columns"] if column["name"] == name)
+
+
+def test_append_constant_column_has_no_outliers():
+    base = pl.DataFrame({"k": np.full(200_000, 7, dtype=np.int64)})
+    appended = pl.DataFrame({"k": np.full(100_000, 7, dtype=np.int64)})
+
+    column = _column(_append_report(base, appended), "k")
+
+    assert column["anomaly_report"]["detected"] is False
+    assert column["anomaly_report"]["count"] == 0
+    assert not any("z-score" in warning for warning in column["warnings"])
+
+
+def test_append_low_cardinality_column_matches_exact_report():
+    # q1 == q3 == 0: hanya nilai 1 dan 2 yang berada di luar batas IQR
+    rng = np.random.default_rng(0)
+    values = rng.choice([0, 1, 2], p=[0.9, 0.07, 0.03], size=300_000)
+    base = pl.DataFrame({"level": values[:200_000]})
+    appended = pl.DataFrame({"level": values[200_000:]})
+
+    column = _column(_append_report(base, appended), "level")
+    exact = _column(generate_health_report(pl.concat([base, appended])), "level")
+
+    assert exact["anomaly_report"]["count"] == np.count_nonzero(values > 0)
+    assert abs(column["anomaly_report"]["count"] - exact["anomaly_report"]["count"]) < 0.01 * len(values)
+
+
+def test_stats_from_other_hash_scheme_are_recomputed():
+    stored = health_stats_to_json(compute_health_stats(pl.DataFrame({"name": ["a", "b"]})))
+    assert health_stats_compatible(stored)
+
+    stored["columns"][0]["hll"]["hash_scheme"] = "splitmix64+polars-0.0.0-x86_64"
+    assert not health_stats_compatible(stored)
+
+
+def test_streaming_report_estimates_duplicate_rows(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pl.DataFrame({"a": rng.integers(0, 10**9, 100_000), "b": rng.choice(["x", "y"], 100_000)})
+    df = pl.concat([df, df.head(10_000)])
+    path = tmp_path / "data.parquet"
+    df.write_parquet(path)
+
+    exact = generate_health_report(df)["duplicate_rows"]
+    estimate = generate_streaming_health_report(str(path), batch_size=20_000)["duplicate_rows"]
+
+    assert estimate["approximate"] is True
+    lower, upper = estimate["confidence_interval"]
+    assert lower <= exact["count"] <= upper
+
+
+def test_append_report_estimates_duplicate_rows():
+    rng = np.random.default_rng(0)
+    base = pl.DataFrame({"a": rng.integers(0, 10**9, 50_000), "b": rng.choice(["x", "y"], 50_000)})
+    appended = base.head(5_000)
+
+    exact = generate_health_report(pl.concat([base, appended]))["duplicate_rows"]
+    estimate = _append_report(base, appended)["duplicate_rows"]
+
+    assert estimate["approximate"] is True
+    lower, upper = estimate["confidence_interval"]
+    assert lower <= exact["count"] <= upper
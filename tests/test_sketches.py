@@ -0,0 +1,31 @@
+from datetime import date
+
+import polars as pl
+import pytest
+
+from app.analysis.sketches import HASH_SCHEME, HyperLogLog, hash_series
+
+
+def test_hash_series_is_pinned():
+    # Register HLL tersimpan di database: hash numerik tidak boleh berubah tanpa mengubah HASH_SCHEME
+    assert hash_series(pl.Series([42])).tolist() == [13679457532755275413]
+    assert hash_series(pl.Series([1.5])).tolist() == [15481881892811333770]
+    assert hash_series(pl.Series([date(2024, 1, 1)])).tolist() == [5162469244300811797]
+    assert hash_series(pl.Series([None], dtype=pl.Int64)).tolist() == [11400714819323198485]
+
+
+def test_text_hash_depends_only_on_value():
+    # Hash teks bergantung pada versi Polars, jadi versinya tercatat di skema
+    assert pl.__version__ in HASH_SCHEME
+    first = hash_series(pl.Series(["abc", "x", "abc"]))
+    assert first[0] == first[2]
+    assert hash_series(pl.Series(["x"], dtype=pl.Categorical)).tolist() == [first[1]]
+    assert hash_series(pl.Series(["zz", "abc"]).slice(1)).tolist() == [first[0]]
+
+
+def test_merge_rejects_different_hash_scheme():
+    sketch = HyperLogLog(precision=12)
+    legacy = HyperLogLog.from_dict({"precision": 12, "registers": sketch.to_dict()["registers"]})
+
+    with pytest.raises(ValueError):
+        sketch.merge(legacy)
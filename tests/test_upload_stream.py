@@ -0,0 +1,55 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.upload_stream import MultipartFileStream
+
+
+def _request(chunks: list[bytes], boundary: str = "B") -> Request:
+    # Request tanpa Content-Length, body dikirim per potongan (transfer chunked)
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())],
+    }
+    return Request(scope, receive)
+
+
+def _read(upload: MultipartFileStream, chunk_size: int = 4) -> tuple[str, bytes]:
+    async def run():
+        filename = await upload.open()
+        return filename, b"".join([chunk async for chunk in upload.iter_chunks(chunk_size)])
+    return asyncio.run(run())
+
+
+def test_reads_file_field_split_across_chunks():
+    content = b"a,b\r\n1,2\r\n--not-a-boundary\r\n3,4\n"
+    body = (
+        b'--B\r\nContent-Disposition: form-data; name="note"\r\n\r\nhalo\r\n'
+        b'--B\r\nContent-Disposition: form-data; name="file"; filename="data.csv"\r\n'
+        b"Content-Type: text/csv\r\n\r\n" + content + b"\r\n--B--\r\n"
+    )
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    filename, data = _read(MultipartFileStream(_request(chunks), "file", max_bytes=1024))
+
+    assert filename == "data.csv"
+    assert hashlib.sha256(data).digest() == hashlib.sha256(content).digest()
+
+
+def test_rejects_oversized_body_without_content_length():
+    header = b'--B\r\nContent-Disposition: form-data; name="file"; filename="big.csv"\r\n\r\n'
+    upload = MultipartFileStream(_request([header] + [b"x" * 32 * 1024] * 10), "file", max_bytes=1024)
+
+    with pytest.raises(HTTPException) as exc_info:
+        _read(upload, chunk_size=1024 * 1024)
+    assert exc_info.value.status_code == 413